@@ -8,7 +8,10 @@ moved to open-estimate.
 import csv
 import os
 import numpy as np
+from openest.generate import diagnostic
+from openest.generate.curvegen import CurveGenerator
 from generate import caller
+from . import curvegen_known
 
 """
 The "Good Money" condition:
@@ -46,6 +49,53 @@ def make_get_coeff_goodmoney(weatherbundle, covariator, curvegen, baselinemins,
     return coeff_getter
 
 
+class BaselineIncomeCurveGenerator(CurveGenerator):
+    """Produces the curves of `curvegen` with loggdppc held at each region's baseline.
+
+    These are the curves without income adaptation that the "Good
+    Money" condition compares against. For polynomials and cubic
+    splines without beta limits, the constant and baseline-income
+    terms of the coefficients are computed for all regions at once, so
+    each curve only adds the terms for the other covariates. Otherwise,
+    each curve is produced by `curvegen`, with loggdppc replaced.
+
+    Parameters
+    ----------
+    curvegen : CSVVCurveGenerator
+    baselineloggdppcs : dict of str -> float
+        Baseline log GDP per capita, by region.
+    """
+    def __init__(self, curvegen, baselineloggdppcs):
+        super(BaselineIncomeCurveGenerator, self).__init__(curvegen.indepunits, curvegen.depenunit)
+        self.curvegen = curvegen
+        self.baselineloggdppcs = baselineloggdppcs
+
+        self.baselinecoeffs = None # N x K matrix, if batched
+        if is_batchable(curvegen) and not curvegen.betalimits:
+            self.region_indices = {region: ii for ii, region in enumerate(baselineloggdppcs)}
+            self.othercovars = sorted(set(covar for predname in curvegen.prednames for covar in curvegen.predcovars[predname] if covar != 'loggdppc'))
+            self.othergammas = np.zeros((len(curvegen.prednames), len(self.othercovars)))
+            for ii, predname in enumerate(curvegen.prednames):
+                for covar, gamma in zip(curvegen.predcovars[predname], curvegen.predgammas[predname]):
+                    if covar != 'loggdppc':
+                        self.othergammas[ii, self.othercovars.index(covar)] += gamma
+
+            zeros = {covar: 0 for covar in self.othercovars}
+            self.baselinecoeffs = curvegen.get_coefficient_matrix([dict(zeros, loggdppc=baselineloggdppcs[region]) for region in baselineloggdppcs])
+
+    def get_curve(self, region, year, covariates, **kwargs):
+        if self.baselinecoeffs is None:
+            covariates = dict(covariates)
+            covariates['loggdppc'] = self.baselineloggdppcs[region]
+            return self.curvegen.get_curve(region, year, covariates, recorddiag=False)
+
+        coeffs = self.baselinecoeffs[self.region_indices[region]] + np.dot(self.othergammas, [covariates[covar] for covar in self.othercovars])
+        return self.curvegen.get_smartcurve(coeffs.tolist())
+
+    def format_call(self, lang, *args):
+        return self.curvegen.format_call(lang, *args)
+
+
 def get_curve_minima(regions, curvegen, covariator, mint, maxt, analytic):
     # Determine minimum value of curve between mint and maxt
     print("Determining minimum temperatures.")
@@ -59,6 +109,38 @@ def get_curve_maxima(regions, curvegen, covariator, mint, maxt, analytic):
 
 
 def get_curve_extrema(regions, curvegen, covariator, mint, maxt, analytic, direction, extpathkey):
+    """Determine the baseline curve and its extremum for each region.
+
+    If `curvegen` is a polynomial or cubic spline curve generator,
+    all baseline curves are constructed from a single coefficient
+    matrix, and the brute-force search (when writing `extpathkey`) is
+    performed for all regions at once. If `analytic` is None, the
+    analytic extrema are also found in vectorized form, within
+    [`mint`, `maxt`].
+
+    Parameters
+    ----------
+    regions : seq of str
+    curvegen : CurveGenerator
+    covariator : Covariator
+    mint, maxt : float or dict of str -> float
+        Temperature window to search for the extrema.
+    analytic : function(curve) -> float, or None
+        Analytic extremum finder, applied to each baseline curve.
+    direction : str
+        'boatpose' for minima or 'downdog' for maxima.
+    extpathkey : str
+        Key in `caller.callinfo` for the brute-vs-analytic output file.
+
+    Returns
+    -------
+    baselinecurves : dict of str -> curve
+    baselineexts : dict of str -> float
+    """
+    if is_batchable(curvegen):
+        return get_curve_extrema_batched(regions, curvegen, covariator, mint, maxt, analytic, direction, extpathkey)
+    assert analytic is not None, "An analytic extremum finder is required for " + str(curvegen.__class__)
+
     baselinecurves = {}
     baselineexts = {}
 
@@ -101,3 +183,183 @@ def get_curve_extrema(regions, curvegen, covariator, mint, maxt, analytic, direc
             baselineexts[region] = exttemp2
 
     return baselinecurves, baselineexts
+
+
+def is_batchable(curvegen):
+    """Can the baseline curves for `curvegen` be produced from a single coefficient matrix?"""
+    if not isinstance(curvegen, (curvegen_known.PolynomialCurveGenerator, curvegen_known.CubicSplineCurveGenerator)):
+        return False
+    return all(np.ndim(curvegen.predgammas[predname]) == 1 for predname in curvegen.prednames)
+
+
+def get_curve_extrema_batched(regions, curvegen, covariator, mint, maxt, analytic, direction, extpathkey):
+    """Vectorized version of `get_curve_extrema`, for polynomials and cubic splines."""
+    if direction not in ['boatpose', 'downdog']:
+        raise ValueError("'direction' must be 'boatpose' or 'downdog'")
+
+    regions, coeffs = get_baseline_coefficients(regions, curvegen, covariator)
+
+    baselinecurves = {}
+    for ii, region in enumerate(regions):
+        baselinecurves[region] = curvegen.get_smartcurve(coeffs[ii].tolist())
+        if diagnostic.is_recording():
+            for jj, predname in enumerate(curvegen.prednames):
+                for yr in range(2005, 2015): # as recorded by get_curve for 2005
+                    diagnostic.record(region, yr, curvegen.diagprefix + predname, coeffs[ii, jj])
+
+    if analytic is None:
+        assert not isinstance(mint, dict), "Vectorized analytic extrema require a single temperature window."
+        exttemps2 = get_analytic_extrema(curvegen, coeffs, mint, maxt, direction)
+    else:
+        exttemps2 = [analytic(baselinecurves[region]) for region in regions]
+    baselineexts = dict(zip(regions, exttemps2))
+
+    if caller.callinfo and extpathkey in caller.callinfo:
+        exttemps = get_brute_extrema(regions, curvegen, coeffs, mint, maxt, direction)
+        with open(caller.callinfo[extpathkey], 'w') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['region', 'brute', 'analytic'])
+            for region, exttemp, exttemp2 in zip(regions, exttemps, exttemps2):
+                if np.abs(exttemp - exttemp2) > 1:
+                    print("WARNING: %s has unclear exttemp: %f, %f" % (region, exttemp, exttemp2))
+                writer.writerow([region, exttemp, exttemp2])
+        os.chmod(caller.callinfo[extpathkey], 0o664)
+
+    return baselinecurves, baselineexts
+
+
+def get_baseline_coefficients(regions, curvegen, covariator):
+    """Return the regions with baseline covariates, and their N x K coefficient matrix."""
+    covarnames = set(covar for predname in curvegen.prednames for covar in curvegen.predcovars[predname])
+
+    available = []
+    allcovars = []
+    for region in regions:
+        try:
+            covars = covariator.get_current(region)
+        except KeyError:  # If region isn't available (e.g. for diagnostic runs)...
+            continue
+        if not covarnames.issubset(covars):
+            continue
+        available.append(region)
+        allcovars.append(covars)
+
+    return available, curvegen.get_coefficient_matrix(allcovars)
+
+
+def get_basis(curvegen, temps):
+    """Evaluate each term of the curve at `temps`, as a len(temps) x K matrix."""
+    basis = np.zeros((len(temps), len(curvegen.prednames)))
+    for ii in range(len(curvegen.prednames)):
+        unit = np.zeros(len(curvegen.prednames))
+        unit[ii] = 1
+        basis[:, ii] = curvegen.get_smartcurve(unit.tolist()).univariate(temps)
+    return basis
+
+
+def get_brute_extrema(regions, curvegen, coeffs, mint, maxt, direction):
+    """Find the extremum of every curve on a 1-degree grid, for all regions at once."""
+    if len(regions) == 0:
+        return np.zeros(0)
+
+    if isinstance(mint, dict):
+        lows = np.array([np.floor(mint[region]) for region in regions])
+        highs = np.array([np.ceil(maxt[region]) for region in regions])
+        temps = np.arange(np.min(lows), np.max(highs) + 1)
+        outside = (temps[None, :] < lows[:, None]) | (temps[None, :] > highs[:, None])
+    else:
+        temps = np.arange(mint, maxt+1)
+        outside = np.zeros((len(regions), len(temps)), dtype=bool)
+
+    values = np.dot(coeffs, get_basis(curvegen, temps).T)
+    if direction == 'boatpose':
+        return temps[np.argmin(np.where(outside, np.inf, values), axis=1)]
+    else:
+        return temps[np.argmax(np.where(outside, -np.inf, values), axis=1)]
+
+
+def get_analytic_extrema(curvegen, coeffs, mint, maxt, direction):
+    """Find the extremum of every curve within [mint, maxt], for all regions at once."""
+    if maxt <= mint:
+        return np.full(len(coeffs), float(mint))
+
+    if isinstance(curvegen, curvegen_known.PolynomialCurveGenerator):
+        polys = np.hstack((np.zeros((len(coeffs), 1)), coeffs)) # add the zero intercept
+        return get_polynomial_extrema(polys, mint, maxt, direction)[0]
+
+    # A cubic spline is a cubic polynomial between each pair of knots
+    breaks = [mint] + [knot for knot in curvegen.knots if mint < knot < maxt] + [maxt]
+    exttemps, extvalues = None, None
+    for low, high in zip(breaks[:-1], breaks[1:]):
+        points = np.linspace(low, high, 4)
+        termpolys = np.polyfit(points, get_basis(curvegen, points), 3)[::-1] # 4 x K, by increasing power
+        segtemps, segvalues = get_polynomial_extrema(np.dot(coeffs, termpolys.T), low, high, direction)
+        if exttemps is None:
+            exttemps, extvalues = segtemps, segvalues
+        else:
+            better = segvalues < extvalues if direction == 'boatpose' else segvalues > extvalues
+            exttemps = np.where(better, segtemps, exttemps)
+            extvalues = np.where(better, segvalues, extvalues)
+
+    return exttemps
+
+
+def get_polynomial_extrema(polys, mint, maxt, direction):
+    """Find the extremum of each polynomial within [mint, maxt].
+
+    Candidates are the real roots of each derivative within the
+    window, followed by the window ends; the roots are found together
+    as the eigenvalues of a stack of companion matrices.
+
+    Parameters
+    ----------
+    polys : np.array
+        N x (D+1) matrix of polynomial coefficients, by increasing power.
+    mint, maxt : float
+        Window to search.
+    direction : str
+        'boatpose' for minima or 'downdog' for maxima.
+
+    Returns
+    -------
+    exttemps : np.array
+        N locations of the extrema.
+    extvalues : np.array
+        N values of the polynomials at `exttemps`.
+    """
+    numrows, degree = polys.shape[0], polys.shape[1] - 1
+    candidates = [np.full(numrows, float(mint)), np.full(numrows, float(maxt))]
+
+    if degree >= 2:
+        derivs = polys[:, 1:] * np.arange(1, degree + 1) # by increasing power, of degree D-1
+        roots = np.full((numrows, degree - 1), np.nan)
+
+        finite = np.all(np.isfinite(derivs), axis=1)
+        regular = finite & (derivs[:, -1] != 0)
+        if np.any(regular):
+            companion = np.zeros((np.sum(regular), degree - 1, degree - 1))
+            companion[:, np.arange(1, degree - 1), np.arange(degree - 2)] = 1
+            companion[:, :, -1] = -derivs[regular, :-1] / derivs[regular, -1:]
+            roots[regular] = get_real(np.linalg.eigvals(companion))
+        for row in np.nonzero(finite & ~regular)[0]:
+            rowroots = get_real(np.roots(derivs[row, ::-1])) # drops the leading zeros
+            roots[row, :len(rowroots)] = rowroots
+
+        with np.errstate(invalid='ignore'):
+            roots[(roots < mint) | (roots > maxt)] = np.nan
+        candidates = [roots[:, jj] for jj in range(degree - 1)] + candidates
+
+    candidates = np.column_stack(candidates)
+    values = np.zeros(candidates.shape)
+    for jj in range(degree, -1, -1):
+        values = values * candidates + polys[:, jj:jj+1]
+
+    sign = 1 if direction == 'boatpose' else -1
+    index = np.argmin(np.where(np.isnan(candidates), np.inf, sign * values), axis=1)
+    rows = np.arange(numrows)
+    return candidates[rows, index], values[rows, index]
+
+
+def get_real(roots):
+    """Return the real parts of `roots`, with NaN for any complex roots."""
+    return np.where(np.abs(roots.imag) <= 1e-8 * np.maximum(1, np.abs(roots.real)), roots.real, np.nan)
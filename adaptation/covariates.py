@@ -52,6 +52,10 @@ class Covariator(object):
     conf : dict or None, optional
         Configuration dict.
     """
+    # True if `get_update` records `lastyear`, so that it is current even
+    # when updates come through another covariator's `get_update`
+    lastyear_in_update = False
+
     def __init__(self, maxbaseline, config=None):
         if config is None:
             config = {}
@@ -191,6 +195,8 @@ class EconomicCovariator(Covariator):
     conf : dict or None, optional
         Configuration dict.
     """
+    lastyear_in_update = True
+
     def __init__(self, economicmodel, maxbaseline, country_level=False, config=None):
         super(EconomicCovariator, self).__init__(maxbaseline, config=config)
 
@@ -203,6 +209,11 @@ class EconomicCovariator(Covariator):
         self.econ_predictors = economicmodel.baseline_prepared(maxbaseline, self.numeconyears, lambda values: averages.interpret(config, standard_economic_config, values), country_level_gdppc=country_level)
         self.economicmodel = economicmodel
 
+        if self.country_level:
+            # Regions in a country may share one loggdppc averager (see SSPEconomicModel.baseline_prepared).
+            # Each averager is updated once per year, keeping its value after each year for regions not yet updated.
+            self.shared_loggdppcs = {} # {id(averager): {year or None for baseline: loggdppc}}
+
         self.covariates_scalar = configs.get_covariate_rate(config, 'income')
         if self.covariates_scalar != 1:
             self.baseline_loggdppc = {region: self.econ_predictors[region]['loggdppc'].get() for region in self.econ_predictors}
@@ -231,6 +242,8 @@ class EconomicCovariator(Covariator):
         if econpreds is None:
             print(("ERROR: Missing econpreds for %s." % region))
             loggdppc = self.econ_predictors['mean']['loggdppc']
+        elif self.country_level and id(econpreds['loggdppc']) in self.shared_loggdppcs:
+            loggdppc = self.shared_loggdppcs[id(econpreds['loggdppc'])][self.lastyear.get(region, None)]
         else:
             loggdppc = econpreds['loggdppc'].get()
 
@@ -280,9 +293,12 @@ class EconomicCovariator(Covariator):
         self.lastyear[region] = year
 
         if region in self.econ_predictors:
-            loggdppc = self.economicmodel.get_loggdppc_year(query_region, year)
-            if loggdppc is not None and year > self.startupdateyear:
-                self.econ_predictors[region]['loggdppc'].update(loggdppc)
+            if self.country_level:
+                self.update_shared_loggdppc(query_region, year, self.econ_predictors[region]['loggdppc'])
+            else:
+                loggdppc = self.economicmodel.get_loggdppc_year(query_region, year)
+                if loggdppc is not None and year > self.startupdateyear:
+                    self.econ_predictors[region]['loggdppc'].update(loggdppc)
 
             popop = self.economicmodel.get_popop_year(query_region, year)
             if popop is not None and year > self.startupdateyear:
@@ -293,6 +309,26 @@ class EconomicCovariator(Covariator):
 
         return dict(loggdppc=loggdppc, logpopop=np.log(popop), year=self.get_yearcovar(query_region))
 
+    def update_shared_loggdppc(self, country, year, averager):
+        """Update a country-level loggdppc averager, if no other region in the country has for this year.
+
+        Parameters
+        ----------
+        country : str
+        year : int
+        averager : averages object
+            The averager for `country`, possibly shared by many regions.
+        """
+        history = self.shared_loggdppcs.get(id(averager))
+        if history is None:
+            history = self.shared_loggdppcs[id(averager)] = {None: averager.get()}
+
+        if year not in history:
+            loggdppc = self.economicmodel.get_loggdppc_year(country, year)
+            if loggdppc is not None and year > self.startupdateyear:
+                averager.update(loggdppc)
+            history[year] = averager.get()
+
 class BinnedEconomicCovariator(EconomicCovariator):
     """Provides income as a series of indicator values for the income bin.
 
@@ -1179,6 +1215,11 @@ class ClipCovariator(TranslateCovariator):
 class CountryAggregatedCovariator(Covariator):
     """Spatially average the covariates across all regions within a country.
 
+    The averages are cached if the source records `lastyear` in every
+    update (see `Covariator.lastyear_in_update`), and recomputed once
+    a region in the country moves to a new year. Otherwise, they are
+    recomputed on every call.
+
     Parameters
     ----------
     source
@@ -1186,6 +1227,7 @@ class CountryAggregatedCovariator(Covariator):
     """
     def __init__(self, source, regions):
         self.source = source
+        self.cache = {} # {country: (source years, averages)}
         bycountry = {}
         for region in regions:
             # Should replace much of this with a DefaultDict...
@@ -1206,8 +1248,18 @@ class CountryAggregatedCovariator(Covariator):
         -------
         dict
         """
+        # Reuse the averages until a region in the country is updated
+        lastyear = self.source.lastyear if getattr(self.source, 'lastyear_in_update', False) else None
+        if lastyear is not None:
+            years = tuple(lastyear.get(region, None) for region in self.bycountry[country])
+            if country in self.cache and self.cache[country][0] == years:
+                return dict(self.cache[country][1])
+
         values = [self.source.get_current(region) for region in self.bycountry[country]]
-        return {key: np.mean([value[key] for value in values]) for key in values[0]}
+        averaged = {key: np.mean([value[key] for value in values]) for key in values[0]}
+        if lastyear is not None:
+            self.cache[country] = (years, averaged)
+        return dict(averaged)
 
 class CountryDeviationCovariator(CountryAggregatedCovariator):
     """Report the deviation between a region-specific covariate and its country average.
@@ -34,6 +34,7 @@ import bottleneck as bn
 from openest.generate.curvegen import *
 from openest.generate import checks, fast_dataset, formatting, smart_curve, formattools
 from openest.models.curve import FlatCurve
+from generate import telemetry
 
 region_curves = {}
 
@@ -149,6 +150,41 @@ class CSVVCurveGenerator(CurveGenerator):
 
         return coefficients
 
+    def get_coefficient_matrix(self, covariates):
+        """Calculate the beta coefficients for many sets of covariates at once.
+
+        Only supports the typical case, where each
+        self.predgammas[predname] is a vector of gammas (not
+        sum-by-time).
+
+        Parameters
+        ----------
+        covariates : sequence of dict
+            N dictionaries, each as passed to `get_coefficients`.
+
+        Returns
+        -------
+        np.array
+            N x len(self.prednames) matrix of coefficients, with
+            columns in the order of self.prednames.
+        """
+        coeffs = np.zeros((len(covariates), len(self.prednames)))
+        for ii, predname in enumerate(self.prednames):
+            if np.ndim(self.predgammas[predname]) > 1 or np.ndim(self.constant.get(predname, 0)) > 0:
+                raise NotImplementedError("Coefficient matrices are not available for sum-by-time predictors.")
+            if len(self.predgammas[predname]) == 0:
+                if predname not in self.constant:
+                    print("ERROR: Cannot find the uninteracted value for %s; is it in the CSVV?" % predname)
+                    raise KeyError(predname)
+                coeffs[:, ii] = self.constant[predname]
+            else:
+                covarmatrix = np.array([[covars[covar] for covar in self.predcovars[predname]] for covars in covariates], dtype=float).reshape(len(covariates), len(self.predcovars[predname]))
+                coeffs[:, ii] = self.constant.get(predname, 0) + np.dot(covarmatrix, self.predgammas[predname])
+                if predname in self.betalimits:
+                    coeffs[:, ii] = np.minimum(np.maximum(self.betalimits[predname][0], coeffs[:, ii]), self.betalimits[predname][1])
+
+        return coeffs
+
     def get_marginals(self, covar):
         marginals = {} # {predname: sum}
         for predname in set(self.prednames):
@@ -233,17 +269,27 @@ class FarmerCurveGenerator(DelayedCurveGenerator):
 
             return self.last_curves[region]
 
+        if telemetry.enabled:
+            started = telemetry.start()
         if self.farmer == 'full':
             covariates = self.covariator.offer_update(region, year, kwargs['weather'])
-            curve = self.curvegen.get_curve(region, year, covariates)
         elif self.farmer == 'noadapt':
-            curve = self.last_curves[region]
+            covariates = None
         elif self.farmer == 'incadapt':
             covariates = self.covariator.offer_update(region, year, None)
-            curve = self.curvegen.get_curve(region, year, covariates)
         else:
             raise ValueError("Unknown farmer type " + str(self.farmer))
 
+        if telemetry.enabled:
+            telemetry.stop('covariate-update', started)
+            started = telemetry.start()
+        if self.farmer == 'noadapt':
+            curve = self.last_curves[region]
+        else:
+            curve = self.curvegen.get_curve(region, year, covariates)
+        if telemetry.enabled:
+            telemetry.stop('curve-evaluation', started)
+
         if self.save_curve:
             region_curves[region] = curve
 
@@ -522,3 +568,50 @@ class SumByTimeMixin:
             else:
                 self.predcovars[predname] = []
             self.predgammas[predname] = np.array(self.predgammas[predname])
+
+        self.fill_suffixes_matrix(prednames, len(coeffsuffixes))
+
+    def fill_suffixes_matrix(self, prednames, numtimes):
+        """Stack the constants and gammas of all prednames, so `get_coefficients` is a single matrix-vector product.
+
+        Parameters
+        ----------
+        prednames : seq of str
+            Predictor names (up to suffix), as passed to `fill_suffixes_marginals`
+        numtimes : int
+            Number of timesteps (suffixes)
+        """
+        self.stacked_prednames = list(set(prednames))
+        self.stacked_covars = sorted(set(covar for predname in self.stacked_prednames for covar in self.predcovars[predname]))
+        self.stacked_constants = np.zeros((len(self.stacked_prednames), numtimes)) # P x T
+        self.stacked_gammas = np.zeros((len(self.stacked_prednames), numtimes, len(self.stacked_covars))) # P x T x L
+        for pp, predname in enumerate(self.stacked_prednames):
+            self.stacked_constants[pp, :] = self.constant[predname]
+            for kk, covar in enumerate(self.predcovars[predname]):
+                self.stacked_gammas[pp, :, self.stacked_covars.index(covar)] = self.predgammas[predname][:, kk]
+
+    def get_coefficients(self, covariates, debug=False):
+        """Calculate the T beta coefficients for each predictor, for all predictors at once.
+
+        See `CSVVCurveGenerator.get_coefficients`.
+        """
+        try:
+            covarvalues = np.array([covariates[covar] for covar in self.stacked_covars], dtype=float).ravel()
+        except KeyError:
+            print("Available covariates:")
+            print(covariates)
+            print("Requested covariates:")
+            print(self.stacked_covars)
+            raise
+
+        allcoeffs = self.stacked_constants + np.dot(self.stacked_gammas, covarvalues) # P x T
+        coefficients = {} # {predname: T [beta_t]}
+        for pp, predname in enumerate(self.stacked_prednames):
+            coefficients[predname] = allcoeffs[pp]
+            if predname in self.betalimits and not bn.anynan(coefficients[predname]):
+                coefficients[predname] = np.minimum(np.maximum(self.betalimits[predname][0], coefficients[predname]), self.betalimits[predname][1])
+
+            if debug:
+                print((predname, coefficients[predname], self.constant.get(predname, 0), self.predgammas[predname], covarvalues))
+
+        return coefficients
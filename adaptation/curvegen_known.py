@@ -12,7 +12,7 @@ import numpy as np
 import bottleneck as bn 
 from . import csvvfile, curvegen
 from openest.generate import diagnostic, formatting, selfdocumented
-from openest.generate.smart_curve import ZeroInterceptPolynomialCurve, CubicSplineCurve, SumByTimePolynomialCurve
+from openest.generate.smart_curve import SmartCurve, ZeroInterceptPolynomialCurve, CubicSplineCurve, SumByTimePolynomialCurve
 from openest.models.curve import StepCurve
 from openest.generate.curvegen import CurveGenerator
 
@@ -382,3 +382,90 @@ class SumByTimePolynomialCurveGenerator(curvegen.SumByTimeMixin, SmartCSVVCurveG
         ddpoly = self.polycurvegen.get_partial_derivative_curvegen(covariate, covarunit)
         return SumByTimePolynomialCurveGenerator(ddpoly.csvv, ddpoly, self.coeffsuffixes,
                                                  diagprefix=ddpoly.diagprefix)
+
+class SumByTimeSmartCSVVCurveGenerator(curvegen.SumByTimeMixin, SmartCSVVCurveGenerator):
+    """Apply a range of weather to any SmartCSVVCurveGenerator, which uses different coefficients by timestep
+
+    This generalizes SumByTimePolynomialCurveGenerator to other
+    sub-specifications (e.g., cubic splines), as long as their curves
+    are linear in their coefficients. The coefficients for all
+    timesteps are calculated together, as T x K gamma matrices (see
+    `SumByTimeMixin`), and the resulting curve evaluates each of the
+    K terms once over the stacked weather (see `SumByTimeTermsCurve`).
+
+    The CSVV should contain prednames entries of the form
+    <predname>-<suffix>, as for SumByTimePolynomialCurveGenerator.
+
+    Parameters
+    ----------
+    csvv : csvv dictionary
+        Source for all parameter calculations.
+    smartcurvegen : SmartCSVVCurveGenerator
+        CurveGenerator template for meta-data and the curve terms.
+    coeffsuffixes : seq of str or 0
+        The suffixes used with each predname, with an entry for each timestep.
+    diagprefix : str
+        prefix used for reporting beta coefficients in a diagnostics run.
+    """
+    def __init__(self, csvv, smartcurvegen, coeffsuffixes, diagprefix='coeff-'):
+        super(SumByTimeSmartCSVVCurveGenerator, self).__init__(smartcurvegen.prednames, smartcurvegen.indepunits, smartcurvegen.depenunit,
+                                                               csvv, diagprefix=diagprefix)
+        assert isinstance(smartcurvegen, SmartCSVVCurveGenerator)
+        self.csvv = csvv
+        self.smartcurvegen = smartcurvegen
+        self.coeffsuffixes = coeffsuffixes
+        assert not smartcurvegen.betalimits, "Cannot handle betalimits in a sum-by-time setup."
+
+        self.weathernames = getattr(smartcurvegen, 'weathernames', None)
+
+        self.fill_suffixes_marginals(self.csvv, self.smartcurvegen.prednames, self.coeffsuffixes)
+
+        # The curve for each term alone, shared by all curves
+        self.termcurves = []
+        for kk in range(len(self.prednames)):
+            unit = [0.] * len(self.prednames)
+            unit[kk] = 1.
+            self.termcurves.append(smartcurvegen.get_smartcurve(unit))
+
+    def get_smartcurve(self, yy):
+        yy = np.array(yy, dtype=float)
+        if len(yy.shape) == 1: # Only 1 timestep; expand
+            yy = np.expand_dims(yy, axis=1)
+        return SumByTimeTermsCurve(yy, self.termcurves)
+
+    def format_call(self, lang, *args):
+        raise NotImplementedError()
+
+    def get_partial_derivative_curvegen(self, covariate, covarunit):
+        ddcurvegen = self.smartcurvegen.get_partial_derivative_curvegen(covariate, covarunit)
+        return SumByTimeSmartCSVVCurveGenerator(ddcurvegen.csvv, ddcurvegen, self.coeffsuffixes,
+                                                diagprefix=ddcurvegen.diagprefix)
+
+class SumByTimeTermsCurve(SmartCurve):
+    """Sum over timesteps of a curve that is linear in its coefficients.
+
+    Each term curve is applied once to the weather, giving that term
+    for every timestep, and the terms are combined with the K x T
+    coefficient matrix. Timesteps beyond T (or beyond the weather) are
+    dropped.
+
+    Parameters
+    ----------
+    yy : np.array
+        K x T matrix of coefficients.
+    termcurves : seq of SmartCurve
+        K curves, each producing one term (with a coefficient of 1).
+    """
+    def __init__(self, yy, termcurves):
+        super(SumByTimeTermsCurve, self).__init__()
+        assert yy.shape[0] == len(termcurves)
+        self.yy = yy
+        self.termcurves = termcurves
+
+    def __call__(self, ds):
+        result = 0
+        for kk, termcurve in enumerate(self.termcurves):
+            terms = np.asarray(termcurve(ds))
+            numtimes = min(self.yy.shape[1], terms.shape[0])
+            result = result + np.tensordot(self.yy[kk, :numtimes], terms[:numtimes], axes=(0, 0))
+        return result
@@ -61,12 +61,23 @@ class SSPEconomicModel(object):
         self.densities = {}
         self.endbaseline = config.get('endbaseline', 2015)
 
+        # Dense (years x regions) arrays, filled by `materialize`
+        self.regions = None # [hierid]
+        self.region_index = {} # {hierid: column}
+        self.years = None # np.array of years, by row
+        self.loggdppcs = None
+        self.populations = None
+        self.popops = None
+
     def reset(self):
         self.income_model.reset()
 
     def baseline_prepared(self, maxbaseline, numeconyears, func, country_level_gdppc=False):
         """
         Return a dictionary {region: {loggdppc: loggdppc, popop: popop}
+
+        If `country_level_gdppc`, all regions in a country share the same
+        loggdppc object.
         """
         # Prepare population future
         for region, year, value in population.each_future_population(self.model, self.scenario, self.dependencies):
@@ -82,30 +93,122 @@ class SSPEconomicModel(object):
         self.densities = popdensity.load_popop()
         mean_density = np.mean(list(self.densities.values()))
         
+        if self.regions is None:
+            self.materialize(list(pop_baseline.keys()))
+
         econ_predictors = {} # {region: {loggdppc: loggdppc, popop: popop}
+        country_loggdppcs = {} # {country: loggdppc}, shared by all regions in the country
 
         # Iterate through pop_baseline, since it has all regions
         for region in list(pop_baseline.keys()):
             query_region = str(region.split(".")[0]) if country_level_gdppc else region
-            
-            # Get the income timeseries
-            gdppcs = self.income_model.get_timeseries(query_region)
-            if maxbaseline < self.income_model.get_startyear():
-                baseline_gdppcs = [gdppcs[0]]
+
+            if query_region in country_loggdppcs:
+                loggdppc = country_loggdppcs[query_region]
             else:
-                baseline_gdppcs = gdppcs[:maxbaseline - self.income_model.get_startyear()]
+                # Get the income timeseries
+                if query_region in self.region_index:
+                    loggdppcs = self.loggdppcs[:, self.region_index[query_region]]
+                else:
+                    loggdppcs = np.log(self.income_model.get_timeseries(query_region))
+                if maxbaseline < self.income_model.get_startyear():
+                    baseline_loggdppcs = [loggdppcs[0]]
+                else:
+                    baseline_loggdppcs = loggdppcs[:maxbaseline - self.income_model.get_startyear()]
+                loggdppc = func(baseline_loggdppcs)
+                if country_level_gdppc:
+                    country_loggdppcs[query_region] = loggdppc
+
             # Get the popop value
             popop = self.densities.get(region, mean_density)
             # Pass it into the func
-            econ_predictors[region] = dict(loggdppc=func(np.log(baseline_gdppcs)), popop=func([popop]))
+            econ_predictors[region] = dict(loggdppc=loggdppc, popop=func([popop]))
         
         return econ_predictors
 
+    def materialize(self, regions):
+        """Fill the dense (years x regions) arrays of log GDP p.c., population, and population density.
+
+        Must be called after the population futures and densities are loaded (by `baseline_prepared`).
+
+        Parameters
+        ----------
+        regions : seq of str
+        """
+        startyear = self.income_model.get_startyear()
+        timeseries = [self.income_model.get_timeseries(region) for region in regions]
+        popyears = [year for region in self.pop_future_years for year in self.pop_future_years[region]]
+        endyear = max([startyear + len(series) - 1 for series in timeseries] + popyears)
+
+        self.regions = list(regions)
+        self.region_index = {region: ii for ii, region in enumerate(self.regions)}
+        self.years = np.arange(startyear, endyear + 1)
+
+        self.loggdppcs = np.full((len(self.years), len(self.regions)), np.nan)
+        for ii, series in enumerate(timeseries):
+            self.loggdppcs[:len(series), ii] = np.log(series)
+
+        self.populations = np.full((len(self.years), len(self.regions)), np.nan)
+        for region in self.pop_future_years:
+            if region in self.region_index:
+                for year, value in self.pop_future_years[region].items():
+                    if startyear <= year <= endyear:
+                        self.populations[year - startyear, self.region_index[region]] = value
+
+        # Population densities scale with population, relative to 2010
+        self.popops = np.full((len(self.years), len(self.regions)), np.nan)
+        for region in self.region_index:
+            if region not in self.densities:
+                continue
+            ii = self.region_index[region]
+            if region not in self.pop_future_years:
+                self.popops[:, ii] = self.densities[region]
+            elif self.pop_future_years[region].get(2010, 0) > 0:
+                self.popops[:, ii] = self.populations[:, ii] * self.densities[region] / self.pop_future_years[region][2010]
+
+    def get_year_row(self, year):
+        """Return the row of the dense arrays for `year`, or None if it is not covered."""
+        if self.years is None or year < self.years[0] or year > self.years[-1]:
+            return None
+        return year - self.years[0]
+
+    def get_loggdppcs(self, year):
+        """Return the log GDP p.c. for all regions (in the order of `self.regions`) in `year`."""
+        row = self.get_year_row(year)
+        if row is None:
+            return np.array([self.get_loggdppc_year(region, year) for region in self.regions])
+        return self.loggdppcs[row]
+
+    def get_populations(self, year):
+        """Return the population for all regions (in the order of `self.regions`) in `year`, or NaN if unknown."""
+        row = self.get_year_row(year)
+        if row is None:
+            return np.full(len(self.regions), np.nan)
+        return self.populations[row]
+
+    def get_popops(self, year):
+        """Return the population density for all regions (in the order of `self.regions`) in `year`, or NaN if unknown."""
+        row = self.get_year_row(year)
+        if row is None:
+            return np.array([np.nan if self.get_popop_year(region, year) is None else self.get_popop_year(region, year) for region in self.regions])
+        return self.popops[row]
+
     def get_loggdppc_year(self, region, year):
+        row = self.get_year_row(year)
+        if row is not None and region in self.region_index:
+            loggdppc = self.loggdppcs[row, self.region_index[region]]
+            if not np.isnan(loggdppc):
+                return loggdppc
+
         gdppc = self.income_model.get_value(region, year)
         return np.log(gdppc)
 
     def get_popop_year(self, region, year):
+        row = self.get_year_row(year)
+        if row is not None and region in self.region_index:
+            popop = self.popops[row, self.region_index[region]]
+            return None if np.isnan(popop) else popop
+
         if region not in self.pop_future_years:
             if region in self.densities:
                 return self.densities[region]
@@ -122,6 +225,10 @@ class SSPEconomicModel(object):
         return None
 
     def get_population_year(self, region, year):
+        row = self.get_year_row(year)
+        if row is not None and region in self.region_index:
+            return self.populations[row, self.region_index[region]]
+
         if region not in self.pop_future_years:
             return np.nan
         if year not in self.pop_future_years[region]:
@@ -0,0 +1,4 @@
+"""Synthetic-data benchmarks for the generate and aggregate steps.
+
+See docs/benchmarks.md for usage.
+"""
@@ -0,0 +1,237 @@
+"""Time the generate and aggregate steps on synthetic data.
+
+Usage:
+  python -m benchmarks.run [--scales small,medium] [--benchmarks generate,make_levels] [--repeat 3] [--output FILE] [--compare OLD]
+
+Each scale constructs a synthetic shared directory (see
+benchmarks/synthetic.py) and times each benchmark on it `repeat`
+times. The results are written as JSON, along with the commit and
+machine, so that runs on the same machine can be compared across
+commits with `--compare`.
+"""
+
+import os, sys, copy, json, time, shutil, platform, tempfile, argparse, subprocess
+from collections import OrderedDict
+import numpy as np
+from impactlab_tools.utils import files, paralog
+from . import synthetic
+
+SCALES = OrderedDict([('small', dict(numregions=10, endyear=2030, order=2)),
+                      ('medium', dict(numregions=100, endyear=2060, order=2)),
+                      ('large', dict(numregions=1000, endyear=2100, order=4))])
+
+def get_config(context):
+    """Return the generate configuration for the synthetic data."""
+    return {'mode': 'median', 'timerate': 'day', 'climate': context['info']['variables'],
+            'only-rcp': 'rcp85', 'only-models': [synthetic.gcm], 'do_farmers': False,
+            'econcovar': {'class': 'mean', 'length': 15}, 'climcovar': {'class': 'mean', 'length': 15},
+            'models': [{'csvvs': context['info']['csvvpath'],
+                        'specification': {'description': "Synthetic polynomial response",
+                                          'depenunit': 'widgets', 'indepunit': 'C',
+                                          'functionalform': 'polynomial', 'variable': 'tas',
+                                          'covariates': ['climtas', 'loggdppc'], 'clipping': False,
+                                          'calculation': [{'YearlyAverageDay': {'model': 'default'}}, 'Rebase']}}]}
+
+def get_weatherbundle(context):
+    from interpret import container
+    scenario, model, weatherbundle = next(container.get_bundle_iterator(context['config']))
+    return weatherbundle
+
+def get_specconf(context):
+    from interpret import container
+    model, csvvpath, module, specconf = next(container.get_modules_csvv(context['config']))
+    return csvvpath, module, specconf
+
+def prepare_calculation(context, weatherbundle, economicmodel):
+    from generate import caller, pvalses
+    csvvpath, module, specconf = get_specconf(context)
+    pvals = pvalses.ConstantPvals(.5)
+    return caller.call_prepare_interp(csvvpath, module, weatherbundle, economicmodel, pvals['synthetic'],
+                                      specconf=specconf, config=context['config'], standard=False)
+
+def new_targetdir(context, name):
+    context['runs'] = context.get('runs', 0) + 1
+    targetdir = os.path.join(context['outdir'], name, str(context['runs']))
+    os.makedirs(targetdir)
+    return targetdir
+
+## Benchmarks: each performs any setup and returns the function to time
+
+def bench_discovery(context):
+    """Discover the weather and load its years and regions."""
+    def run():
+        weatherbundle = get_weatherbundle(context)
+        weatherbundle.get_years()
+    return run
+
+def bench_covariate_baseline(context):
+    """Read the CSVV and compute the covariate baselines."""
+    weatherbundle = get_weatherbundle(context)
+    economicmodel = synthetic.SyntheticEconomicModel(context['basedir'])
+    return lambda: prepare_calculation(context, weatherbundle, economicmodel)
+
+def bench_generate(context):
+    """Apply the calculation to every year and region, and write the result."""
+    from generate import effectset
+    weatherbundle = get_weatherbundle(context)
+    economicmodel = synthetic.SyntheticEconomicModel(context['basedir'])
+    calculation, dependencies, baseline_get_predictors = prepare_calculation(context, weatherbundle, economicmodel)
+    targetdir = context['lastresult'] = new_targetdir(context, 'generate')
+    return lambda: effectset.generate(targetdir, 'synthetic', weatherbundle, calculation, "Synthetic benchmark.",
+                                      dependencies + weatherbundle.dependencies, context['config'])
+
+def get_result(context):
+    """Return the target directory of a generated result, producing it if needed."""
+    if 'resultdir' not in context:
+        bench_generate(context)()
+        context['resultdir'] = context['lastresult']
+    return context['resultdir']
+
+def get_halfweight(context):
+    from datastore import spacetime
+    economicmodel = synthetic.SyntheticEconomicModel(context['basedir'])
+    return spacetime.SpaceTimeSpatialOnlyData({region: economicmodel.get_population_year(region, 2015) for region in context['info']['regions']})
+
+def bench_make_levels(context):
+    """Scale the result by population."""
+    from generate import aggregate
+    resultdir = get_result(context)
+    halfweight = get_halfweight(context)
+    def run():
+        aggregate.cached_weights.clear()
+        aggregate.make_levels(resultdir, 'synthetic.nc4', 'synthetic-levels.nc4', halfweight, (synthetic.econ_model, synthetic.econ_scenario), config={})
+    return run
+
+def bench_make_aggregates(context):
+    """Aggregate the result to states, countries, FUND regions, and the globe."""
+    from generate import aggregate
+    resultdir = get_result(context)
+    halfweight = get_halfweight(context)
+    def run():
+        aggregate.cached_weights.clear()
+        aggregate.make_aggregates(resultdir, 'synthetic.nc4', 'synthetic-aggregated.nc4', halfweight, (synthetic.econ_model, synthetic.econ_scenario), config={})
+    return run
+
+def make_bench_parallel(**options):
+    """Produce results and historical results for (threads - 1) Monte Carlo batches, under `options`."""
+    def bench_parallel(context):
+        from generate import pvalses
+        from interpret import configs, parallel_container
+        config = copy.deepcopy(context['config'])
+        config.update(mode='testparallelpe', threads=context['threads'], **options)
+        config['mc-n'] = context['threads'] - 1
+        configs.global_statman = paralog.StatusManager('generate', "benchmarks.run", context['outdir'], 60*60)
+        def run():
+            driverdir = os.path.join(new_targetdir(context, 'parallel'), 'pedriver')
+            weatherbundle = get_weatherbundle(context)
+            economicmodel = synthetic.SyntheticEconomicModel(context['basedir'])
+            pvals = pvalses.PlaceholderPvals(config, ['pedriver'])
+            parallel_container.produce(driverdir, weatherbundle, economicmodel, pvals, config)
+        return run
+    return bench_parallel
+
+BENCHMARKS = OrderedDict([('discovery', bench_discovery),
+                          ('covariate-baseline', bench_covariate_baseline),
+                          ('generate', bench_generate),
+                          ('make_levels', bench_make_levels),
+                          ('make_aggregates', bench_make_aggregates),
+                          ('parallel-lockstep', make_bench_parallel()),
+                          ('parallel-pipelined', make_bench_parallel(**{'pipeline-depth': 2}))])
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def get_machine():
+    return dict(node=platform.node(), processor=platform.processor(), machine=platform.machine(),
+                cpus=os.cpu_count(), python=platform.python_version())
+
+def run_scale(scale, params, benchmarks, repeat, threads, datadir=None):
+    """Time each benchmark on a synthetic shared directory for one scale."""
+    basedir = os.path.join(datadir, scale) if datadir else tempfile.mkdtemp(prefix='benchmark-' + scale + '-')
+    outdir = tempfile.mkdtemp(prefix='benchmark-outputs-')
+    try:
+        started = time.perf_counter()
+        if datadir and os.path.exists(os.path.join(basedir, 'social', 'parameters', 'synthetic', 'synthetic.csvv')):
+            info = dict(regions=synthetic.get_regions(params['numregions']), csvvpath=os.path.join(basedir, 'social', 'parameters', 'synthetic', 'synthetic.csvv'),
+                        variables=['tas'] + ['tas-poly-%d' % power for power in range(2, params['order'] + 1)])
+        else:
+            info = synthetic.make_shareddir(basedir, **params)
+        print("Synthetic data for %s: %.1f s" % (scale, time.perf_counter() - started))
+
+        files.use_config({'shareddir': basedir})
+        context = dict(basedir=basedir, outdir=outdir, info=info, threads=threads)
+        context['config'] = get_config(context)
+
+        results = []
+        for name in benchmarks:
+            run = BENCHMARKS[name](context)
+            walls = []
+            cpus = []
+            for ii in range(repeat):
+                wall0, cpu0 = time.perf_counter(), time.process_time()
+                run()
+                walls.append(time.perf_counter() - wall0)
+                cpus.append(time.process_time() - cpu0)
+                if ii < repeat - 1:
+                    run = BENCHMARKS[name](context) # fresh state for each repetition
+            print("%s/%s: %.3f s (min of %d)" % (scale, name, min(walls), repeat))
+            results.append(dict(benchmark=name, scale=scale, wall=walls, cpu=cpus,
+                                min=min(walls), median=float(np.median(walls))))
+        return results
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+        if not datadir:
+            shutil.rmtree(basedir, ignore_errors=True)
+
+def compare(results, oldpath):
+    """Print the ratio of each minimum time to that in a previous results file."""
+    with open(oldpath, 'r') as fp:
+        old = json.load(fp)
+    oldmins = {(result['scale'], result['benchmark']): result['min'] for result in old['results']}
+    print("Compared to %s (%s):" % (oldpath, old.get('commit')))
+    for result in results:
+        key = (result['scale'], result['benchmark'])
+        if key in oldmins:
+            print("  %s/%s: %.3f s vs. %.3f s (x%.2f)" % (key[0], key[1], result['min'], oldmins[key], result['min'] / oldmins[key]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time generate and aggregate steps on synthetic data.")
+    parser.add_argument('--scales', default='small,medium', help="Comma-separated scales: " + ', '.join(SCALES))
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help="Comma-separated benchmarks: " + ', '.join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=3, help="Threads for the parallel benchmarks (1 driver + workers)")
+    parser.add_argument('--datadir', help="Keep synthetic data here, and reuse it in later runs")
+    parser.add_argument('--output', help="JSON results file (default: benchmarks-<commit>-<time>.json)")
+    parser.add_argument('--compare', help="A previous JSON results file to compare against")
+    args = parser.parse_args(argv)
+
+    scales = args.scales.split(',')
+    benchmarks = args.benchmarks.split(',')
+    for scale in scales:
+        assert scale in SCALES, "Unknown scale %s." % scale
+    for name in benchmarks:
+        assert name in BENCHMARKS, "Unknown benchmark %s." % name
+
+    commit = get_commit()
+    results = []
+    for scale in scales:
+        results.extend(run_scale(scale, SCALES[scale], benchmarks, args.repeat, args.threads, args.datadir))
+
+    output = args.output
+    if output is None:
+        output = "benchmarks-%s-%s.json" % ((commit or 'unknown')[:8], time.strftime('%Y%m%d-%H%M%S'))
+    with open(output, 'w') as fp:
+        json.dump(dict(commit=commit, machine=get_machine(), time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       repeat=args.repeat, threads=args.threads, scales={scale: SCALES[scale] for scale in scales},
+                       results=results), fp, indent=1)
+    print("Results written to " + output)
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
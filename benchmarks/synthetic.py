@@ -0,0 +1,291 @@
+"""Construct a synthetic shared directory for benchmarking.
+
+The layout follows the real shared directory, so that the usual
+discovery code finds the synthetic data:
+
+ - `regions/hierarchy.csv` and `regions/macro-regions.csv`: A region
+   hierarchy of countries (`AAA`, `AAB`, ...), each with two states and
+   a number of impact regions (e.g., `AAA.1.3`).
+ - `climate/BCSD/hierid/popwt/daily/<variable>/<scenario>/<gcm>/<year>/1.0.nc4`:
+   Daily weather for `historical` (1981 - 2005) and `rcp85` (2006 - `endyear`).
+   Variables named `<base>-poly-<N>` are the N-th power of `<base>`.
+ - `social/synthetic/gdppc.csv`, `population.csv`, `popop.csv`:
+   Socioeconomic projections, by region and year, read by
+   `SyntheticEconomicModel`.
+ - `social/parameters/synthetic/synthetic.csvv`: A polynomial
+   temperature response, interacted with `climtas` and `loggdppc`.
+"""
+
+import os, csv
+import numpy as np
+import xarray as xr
+from helpers import header
+
+gcm = 'SYNTH'
+econ_model = 'synthetic'
+econ_scenario = 'SSP2'
+version = '1.0'
+
+def get_countries(numregions, regions_per_country=10):
+    """Return a list of ISO3-like country codes sufficient for `numregions`."""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    numcountries = int(np.ceil(numregions / float(regions_per_country)))
+    return ['A' + letters[ii // 26 % 26] + letters[ii % 26] for ii in range(numcountries)]
+
+def get_regions(numregions, regions_per_country=10):
+    """Return the impact region keys, in hierarchy order."""
+    regions = []
+    for iso3 in get_countries(numregions, regions_per_country):
+        for ii in range(regions_per_country):
+            regions.append("%s.%d.%d" % (iso3, ii % 2 + 1, ii + 1))
+            if len(regions) == numregions:
+                return regions
+    return regions
+
+def write_header(fp, oneline, variables):
+    header.write(fp, oneline, 'SYNTHETIC.' + version, [], variables,
+                 description="Synthetic data generated by benchmarks.synthetic.")
+
+def make_regions(basedir, regions):
+    """Write the region hierarchy and the FUND region mapping."""
+    regiondir = os.path.join(basedir, 'regions')
+    os.makedirs(regiondir, exist_ok=True)
+
+    with open(os.path.join(regiondir, 'hierarchy.csv'), 'w') as fp:
+        write_header(fp, "Region hierarchy", {'region-key': ("Unique key for the given region.", 'unique'),
+                                              'parent-key': ("Key of the region containing this one.", 'categorical'),
+                                              'is_terminal': ("Are there no higher-resolution children?", 'bool'),
+                                              'agglomid': ("Order of the impact region.", 'int')})
+        writer = csv.writer(fp)
+        writer.writerow(['region-key', 'parent-key', 'name', 'is_terminal', 'agglomid'])
+        seen = set()
+        for ii, region in enumerate(regions):
+            iso3, state = region.split('.')[:2]
+            if iso3 not in seen:
+                writer.writerow([iso3, 'World', iso3, False, ''])
+                seen.add(iso3)
+            if iso3 + '.' + state not in seen:
+                writer.writerow([iso3 + '.' + state, iso3, state, False, ''])
+                seen.add(iso3 + '.' + state)
+            writer.writerow([region, iso3 + '.' + state, region, True, ii + 1])
+
+    with open(os.path.join(regiondir, 'macro-regions.csv'), 'w') as fp:
+        write_header(fp, "Macro-region definitions", {'region-key': ("ISO3 country code", 'str'),
+                                                      'FUND': ("FUND region", 'str')})
+        writer = csv.writer(fp)
+        writer.writerow(['region-key', 'FUND'])
+        countries = sorted(set(region.split('.')[0] for region in regions))
+        for ii, iso3 in enumerate(countries):
+            writer.writerow([iso3, 'REG%d' % (ii % 4 + 1)])
+
+def make_weather(basedir, regions, endyear, variables, rng):
+    """Write a daily weather file for each variable, scenario, and year."""
+    # Regional climatology and warming rates, shared by all variables
+    climatology = rng.uniform(0, 25, len(regions))
+    amplitude = rng.uniform(2, 15, len(regions))
+    warming = rng.uniform(.01, .05, len(regions))
+    days = np.arange(365)
+
+    for year in range(1981, endyear + 1):
+        scenario = 'historical' if year < 2006 else 'rcp85'
+        seasonal = -np.cos(2 * np.pi * days / 365.)[:, None] * amplitude[None, :]
+        bases = {}
+        for variable in variables:
+            base = variable.split('-poly-')[0]
+            if base not in bases:
+                noise = rng.normal(0, 3, (365, len(regions)))
+                bases[base] = climatology[None, :] + seasonal + warming[None, :] * (year - 1981) + noise
+            if '-poly-' in variable:
+                values = bases[base] ** int(variable.split('-poly-')[1])
+            else:
+                values = bases[base]
+
+            ds = xr.Dataset({variable: (('time', 'hierid'), values.astype(np.float32), {'units': 'C'})},
+                            coords={'time': year * 1000 + days + 1., 'hierid': np.array(regions)},
+                            attrs={'version': version, 'variable': variable, 'scenario': scenario, 'model': gcm,
+                                   'year': str(year), 'units': 'C'})
+            yeardir = os.path.join(basedir, 'climate/BCSD/hierid/popwt/daily', variable, scenario, gcm, str(year))
+            os.makedirs(yeardir, exist_ok=True)
+            ds.to_netcdf(os.path.join(yeardir, version + '.nc4'), format='NETCDF4')
+
+def make_socioeconomics(basedir, regions, endyear, rng):
+    """Write GDP per capita, population, and population density by region."""
+    socialdir = os.path.join(basedir, 'social', 'synthetic')
+    os.makedirs(socialdir, exist_ok=True)
+
+    years = np.arange(2000, endyear + 1)
+    gdppc0 = np.exp(rng.uniform(7, 11, len(regions)))
+    growth = rng.uniform(0, .04, len(regions))
+    pop0 = rng.uniform(1e4, 1e6, len(regions))
+    popgrowth = rng.uniform(-.005, .02, len(regions))
+
+    with open(os.path.join(socialdir, 'gdppc.csv'), 'w') as gdpfp, open(os.path.join(socialdir, 'population.csv'), 'w') as popfp:
+        write_header(gdpfp, "GDP per capita", {'gdppc': ("GDP per capita", 'PPP 2005 USD')})
+        write_header(popfp, "Population", {'population': ("Population", 'people')})
+        gdpwriter = csv.writer(gdpfp)
+        popwriter = csv.writer(popfp)
+        gdpwriter.writerow(['region', 'year', 'gdppc'])
+        popwriter.writerow(['region', 'year', 'population'])
+        for ii, region in enumerate(regions):
+            for year in years:
+                gdpwriter.writerow([region, year, gdppc0[ii] * (1 + growth[ii]) ** (year - 2000)])
+                popwriter.writerow([region, year, pop0[ii] * (1 + popgrowth[ii]) ** (year - 2000)])
+
+    with open(os.path.join(socialdir, 'popop.csv'), 'w') as fp:
+        write_header(fp, "Population-weighted population density", {'popop': ("Population density", 'people/km^2')})
+        writer = csv.writer(fp)
+        writer.writerow(['region', 'popop'])
+        for region, popop in zip(regions, rng.uniform(10, 1000, len(regions))):
+            writer.writerow([region, popop])
+
+def make_csvv(basedir, order):
+    """Write a polynomial CSVV, with each power interacted with climtas and loggdppc."""
+    csvvdir = os.path.join(basedir, 'social', 'parameters', 'synthetic')
+    os.makedirs(csvvdir, exist_ok=True)
+
+    prednames = []
+    covarnames = []
+    gamma = []
+    for power in range(1, order + 1):
+        predname = 'tas' if power == 1 else 'tas-poly-%d' % power
+        for covarname in ['1', 'climtas', 'loggdppc']:
+            prednames.append(predname)
+            covarnames.append(covarname)
+            gamma.append((1e-2 if covarname == '1' else 1e-4) * (-1) ** power / 10 ** (power - 1))
+
+    vcv = np.diag((np.abs(gamma) / 10.) ** 2)
+
+    filepath = os.path.join(csvvdir, 'synthetic.csvv')
+    with open(filepath, 'w') as fp:
+        fp.write("---\n")
+        fp.write("oneline: Synthetic polynomial temperature response\n")
+        fp.write("version: SYNTHETIC.%s\n" % version)
+        fp.write("dependencies: []\n")
+        fp.write("description: Synthetic data generated by benchmarks.synthetic.\n")
+        fp.write("csvv-version: girdin-2017-01-10\n")
+        fp.write("variables:\n")
+        fp.write("  tas: Daily average temperature [C]\n")
+        for power in range(2, order + 1):
+            fp.write("  tas-poly-%d: Daily average temperature to the power %d [C^%d]\n" % (power, power, power))
+        fp.write("  climtas: Long-run average temperature [C]\n")
+        fp.write("  loggdppc: Log GDP per capita [log USD2005]\n")
+        fp.write("  outcome: Synthetic outcome [widgets]\n")
+        fp.write("...\n")
+        fp.write("observations\n1000\n")
+        fp.write("prednames\n" + ','.join(prednames) + "\n")
+        fp.write("covarnames\n" + ','.join(covarnames) + "\n")
+        fp.write("gamma\n" + ','.join(map(repr, gamma)) + "\n")
+        fp.write("gammavcv\n")
+        for row in vcv:
+            fp.write(','.join(map(repr, row)) + "\n")
+        fp.write("residvcv\n1\n")
+
+    return filepath
+
+def make_shareddir(basedir, numregions=10, endyear=2030, order=2, seed=0):
+    """Write a complete synthetic shared directory into `basedir`.
+
+    Parameters
+    ----------
+    basedir : str
+        Directory to populate; created if needed.
+    numregions : int
+        Number of impact regions.
+    endyear : int
+        Last year of weather and socioeconomic data (at least 2016, so
+        that covariates are updated).
+    order : int
+        Order of the temperature polynomial; weather files are written
+        for `tas` and each power up to `order`.
+    seed : int
+        Seed for the random data.
+
+    Returns
+    -------
+    dict
+        `regions` and `csvvpath`.
+    """
+    assert endyear > 2015, "Synthetic data must extend past the 2015 baseline."
+    assert order > 1, "Polynomials must have at least two terms."
+
+    rng = np.random.default_rng(seed)
+    regions = get_regions(numregions)
+    variables = ['tas'] + ['tas-poly-%d' % power for power in range(2, order + 1)]
+
+    make_regions(basedir, regions)
+    make_weather(basedir, regions, endyear, variables, rng)
+    make_socioeconomics(basedir, regions, endyear, rng)
+    csvvpath = make_csvv(basedir, order)
+
+    return dict(regions=regions, csvvpath=csvvpath, variables=variables)
+
+def read_table(filepath, valuecol, yearly=True):
+    """Read a synthetic socioeconomic file into {region: {year: value}} (or {region: value})."""
+    values = {}
+    with open(filepath, 'r') as fp:
+        reader = csv.reader(header.deparse(fp, []))
+        headrow = next(reader)
+        for row in reader:
+            region = row[headrow.index('region')]
+            value = float(row[headrow.index(valuecol)])
+            if yearly:
+                values.setdefault(region, {})[int(row[headrow.index('year')])] = value
+            else:
+                values[region] = value
+    return values
+
+class SyntheticEconomicModel(object):
+    """Provides the socioeconomic interface of `adaptation.econmodel.SSPEconomicModel`.
+
+    The SSP providers read the full set of SSP projections from the
+    shared directory, so this reads the synthetic projections written by
+    `make_socioeconomics` instead, computing baselines in the same way.
+    """
+    def __init__(self, basedir, config=None):
+        if config is None:
+            config = {}
+        self.model = econ_model
+        self.scenario = econ_scenario
+        self.dependencies = []
+        self.endbaseline = config.get('endbaseline', 2015)
+
+        socialdir = os.path.join(basedir, 'social', 'synthetic')
+        self.gdppcs = read_table(os.path.join(socialdir, 'gdppc.csv'), 'gdppc')
+        self.pop_future_years = read_table(os.path.join(socialdir, 'population.csv'), 'population')
+        self.densities = read_table(os.path.join(socialdir, 'popop.csv'), 'popop', yearly=False)
+
+    def reset(self):
+        pass
+
+    def baseline_prepared(self, maxbaseline, numeconyears, func, country_level_gdppc=False):
+        """
+        Return a dictionary {region: {loggdppc: loggdppc, popop: popop}
+        """
+        mean_density = np.mean(list(self.densities.values()))
+
+        econ_predictors = {}
+        for region in self.gdppcs:
+            query_region = region.split(".")[0] if country_level_gdppc else region
+            gdppcs = self.gdppcs.get(query_region, self.gdppcs[region])
+            baseline_gdppcs = [gdppcs[year] for year in sorted(gdppcs) if year < maxbaseline]
+            popop = self.densities.get(region, mean_density)
+            econ_predictors[region] = dict(loggdppc=func(np.log(baseline_gdppcs)), popop=func([popop]))
+
+        return econ_predictors
+
+    def get_loggdppc_year(self, region, year):
+        if region not in self.gdppcs or year not in self.gdppcs[region]:
+            return None
+        return np.log(self.gdppcs[region][year])
+
+    def get_popop_year(self, region, year):
+        if region not in self.pop_future_years or region not in self.densities:
+            return self.densities.get(region)
+        if year in self.pop_future_years[region]:
+            return self.pop_future_years[region][year] * self.densities[region] / self.pop_future_years[region][2010]
+        return None
+
+    def get_population_year(self, region, year):
+        if region not in self.pop_future_years or year not in self.pop_future_years[region]:
+            return np.nan
+        return self.pop_future_years[region][year]
@@ -3,9 +3,42 @@ from pathlib import Path
 import click
 from yaml import safe_load
 from impactlab_tools.utils.files import get_file_config
-from interpret.configs import merge_import_config
-from generate.generate import main as ggmain
-from generate.aggregate import main as gamain
+from interpret.configs import merge_import_config, validate as validate_config
+
+# The generate and aggregate systems load the full numerical stack
+# (xarray, netCDF4, openest, ...), so they are imported only when a
+# subcommand needs them.
+
+def ggmain(*args, **kwargs):
+    """Run generate.generate.main, importing it on first use"""
+    from generate.generate import main
+    return main(*args, **kwargs)
+
+
+def gamain(*args, **kwargs):
+    """Run generate.aggregate.main, importing it on first use"""
+    from generate.aggregate import main
+    return main(*args, **kwargs)
+
+
+def load_config(confpath, conf=()):
+    """Read the configuration file, merging imports and KEY=VALUE options"""
+    confpath = Path(confpath)
+    file_configs = get_file_config(confpath)
+    # Interpret "import" in configs here while we have file path info.
+    file_configs = merge_import_config(file_configs, confpath.parent)
+
+    # Parse CLI config values as yaml str before merging.
+    arg_configs = {}
+    for k, v in (arg.strip().split("=") for arg in conf):
+        arg_configs[k] = safe_load(v)
+    file_configs.update(arg_configs)
+
+    # For legacy purposes
+    if not file_configs.get("config_name"):
+        file_configs["config_name"] = str(confpath.stem)
+
+    return file_configs
 
 
 # This is your main entry point
@@ -18,6 +51,7 @@ def impactcalculations_cli():
 @click.argument("confpath", type=click.Path())
 def aggregate(confpath):
     """Run the impact projection aggregation system with configuration file"""
+    confpath = Path(confpath)
     file_configs = get_file_config(confpath)
     # Interpret "import" in configs here while we have file path info.
     file_configs = merge_import_config(file_configs, confpath.parent)
@@ -37,21 +71,7 @@ def aggregate(confpath):
 )
 def generate(confpath, conf):
     """Run the impact projection generate system with configuration file"""
-    confpath = Path(confpath)
-    file_configs = get_file_config(confpath)
-    # Interpret "import" in configs here while we have file path info.
-    file_configs = merge_import_config(file_configs, confpath.parent)
-
-    # Parse CLI config values as yaml str before merging.
-    arg_configs = {}
-    for k, v in (arg.strip().split("=") for arg in conf):
-        arg_configs[k] = safe_load(v)
-    file_configs.update(arg_configs)
-
-    # For legacy purposes
-    if not file_configs.get("config_name"):
-        file_configs["config_name"] = str(confpath.stem)
-
+    file_configs = load_config(confpath, conf)
     ggmain(file_configs)
 
 
@@ -61,14 +81,7 @@ def generate(confpath, conf):
 @click.argument("confpath", type=click.Path())
 def diagnostic(confpath):
     """Run the impact projection diagnostic system with configuration path"""
-    confpath = Path(confpath)
-    file_configs = get_file_config(confpath)
-    # Interpret "import" in configs here while we have file path info.
-    file_configs = merge_import_config(file_configs, confpath.parent)
-
-    # For legacy purposes
-    if not file_configs.get("config_name"):
-        file_configs["config_name"] = str(confpath.stem)
+    file_configs = load_config(confpath)
 
     diagnostic_configs = {
         "filter-region": "USA.14.608",
@@ -79,3 +92,25 @@ def diagnostic(confpath):
 
     file_configs.update(diagnostic_configs)
     ggmain(file_configs)
+
+
+@impactcalculations_cli.command(
+    help="Check a generate configuration file without running it"
+)
+@click.argument("confpath", type=click.Path())
+@click.option(
+    "-c",
+    "--conf",
+    nargs=1,
+    multiple=True,
+    help="Additional KEY=VALUE configuration option.",
+)
+def validate(confpath, conf):
+    """Report problems in a generate configuration, exiting with an error if any are found"""
+    file_configs = load_config(confpath, conf)
+    problems = validate_config(file_configs)
+    for problem in problems:
+        click.echo("Error: " + problem, err=True)
+    if problems:
+        raise SystemExit(1)
+    click.echo("Configuration OK.")
@@ -1,6 +1,7 @@
 """Classes for exposing weather data available at a daily or monthly timestep."""
 
-import os
+import os, threading
+from collections import OrderedDict
 import numpy as np
 import xarray as xr
 import pandas as pd
@@ -42,9 +43,13 @@ class DailyWeatherReader(YearlySplitWeatherReader):
     def read_year(self, year):
         return self.prepare_ds(self.file_for_year(year))
 
+    def get_load_variables(self):
+        """Return the variables to read from each file, or None for all."""
+        return list(self.variable) + [self.regionvar]
+
     def prepare_ds(self, filename):
         try:
-            ds = netcdfs.load_netcdf(filename)
+            ds = netcdfs.load_netcdf(filename, variables=self.get_load_variables())
             if 'time' in ds.coords:
                 ds = ds.rename({'time': 'yyyyddd', self.regionvar: 'region'})
                 ds['time'] = (('yyyyddd'), pd.date_range('%d-01-01' % (ds.yyyyddd[0] // 1000), periods=365))
@@ -68,6 +73,44 @@ class DailyWeatherReader(YearlySplitWeatherReader):
 
         return None
 
+class ConsolidatedDailyWeatherReader(DailyWeatherReader):
+    """Exposes some of the variables in daily files that hold several variables.
+
+    Consolidated files (e.g., all powers of a polynomial, as built by
+    `generate.polygen`) are read by several readers, one per
+    variable. The most recently prepared files are shared between
+    these readers, so each year is opened and read once, loading the
+    variables of all readers constructed for the same files.
+    """
+
+    shared_files = OrderedDict() # {filename: ds}, in LRU order
+    shared_files_limit = 4
+    shared_lock = threading.Lock()
+    requested = {} # {template: set of variables}, for all readers of each template
+
+    def __init__(self, template, year1, regionvar, *variables):
+        super(ConsolidatedDailyWeatherReader, self).__init__(template, year1, regionvar, *variables)
+        with ConsolidatedDailyWeatherReader.shared_lock:
+            ConsolidatedDailyWeatherReader.requested.setdefault(template, set()).update(variables)
+
+    def get_load_variables(self):
+        """Return the variables of all readers sharing the file."""
+        return sorted(ConsolidatedDailyWeatherReader.requested[self.template]) + [self.regionvar]
+
+    def prepare_ds(self, filename):
+        with ConsolidatedDailyWeatherReader.shared_lock:
+            ds = ConsolidatedDailyWeatherReader.shared_files.get(filename)
+            if ds is not None and all(variable in ds for variable in self.variable):
+                ConsolidatedDailyWeatherReader.shared_files.move_to_end(filename)
+            else:
+                # Not yet loaded, or loaded before this reader was constructed
+                ds = super(ConsolidatedDailyWeatherReader, self).prepare_ds(filename)
+                ConsolidatedDailyWeatherReader.shared_files[filename] = ds
+                if len(ConsolidatedDailyWeatherReader.shared_files) > ConsolidatedDailyWeatherReader.shared_files_limit:
+                    ConsolidatedDailyWeatherReader.shared_files.popitem(last=False)
+
+        return ds[list(self.variable)]
+
 class MonthlyDimensionedWeatherReader(YearlySplitWeatherReader):
     def __init__(self, template, year1, regionvar, variable, dim, dimvariable=None):
         super(MonthlyDimensionedWeatherReader, self).__init__(template, year1, variable)
@@ -102,7 +145,7 @@ class MonthlyDimensionedWeatherReader(YearlySplitWeatherReader):
         years = self.get_years()
         yy = 0
         for filename in self.file_iterator():
-            ds = netcdfs.load_netcdf(filename)
+            ds = netcdfs.load_netcdf(filename, variables=[self.variable, self.regionvar])
             if 'month' in ds.coords:
                 ds = ds.rename({'month': 'time', self.regionvar: 'region'})
             else:
@@ -114,7 +157,7 @@ class MonthlyDimensionedWeatherReader(YearlySplitWeatherReader):
 
     def read_year(self, year):
         """Read variable for ``year`` from file"""
-        ds = netcdfs.load_netcdf(self.file_for_year(year))
+        ds = netcdfs.load_netcdf(self.file_for_year(year), variables=[self.variable, self.regionvar])
         if 'month' in ds.coords:
             ds = ds.rename({'month': 'time', self.regionvar: 'region'})
         else:
@@ -162,20 +205,35 @@ class YearlyBinnedWeatherReader(YearlySplitWeatherReader):
         return ds
 
 class GDDKDDReader(ConversionWeatherReader):
+    """Converts daily minimum and maximum temperatures into growing and killing degree-days.
+
+    Parameters
+    ----------
+    reader : WeatherReader
+        Reader providing `tminvar` and `tmaxvar`, as time x region.
+    tminvar, tmaxvar : str
+        Names of the daily minimum and maximum temperature variables.
+    lower, upper : float
+        GDD lower and upper limits; KDD are accumulated above `upper`.
+    """
     def __init__(self, reader, tminvar, tmaxvar, lower, upper):
         self.tminvar = tminvar
         self.tmaxvar = tmaxvar
+        self.gddname = 'gdd-%d-%d' % (lower, upper)
+        self.kddname = 'kdd-%d' % upper
         super(GDDKDDReader, self).__init__(reader, lambda x: x, lambda ds: self.convert(ds, lower, upper))
-         
+
+    def get_dimension(self):
+        return [self.gddname, self.kddname]
+
     def convert(self, ds, lower, upper):
-        allgdd = np.zeros((len(ds.time), len(ds.region)))
-        allkdd = np.zeros((len(ds.time), len(ds.region)))
-        for ii in range(len(ds.region)):
-            allgdd[:, ii], allkdd[:, ii] = gddkdd.get_gddkdd(ds[self.tminvar][:, ii],
-                                                             ds[self.tmaxvar][:, ii], lower, upper)
-
-        gddname = 'gdd-%d-%d' % (lower, upper)
-        kddname = 'kdd-%d' % upper
-        return fast_dataset.FastDataset({gddname: (('time', 'region'), allgdd),
-                                         kddname: (('time', 'region'), allkdd)},
-                                        {'time': ds.time, 'region': ds.region}, attrs=ds.attrs)
+        # The degree-day kernel is elementwise, so evaluate all regions and days at once
+        tasmin = np.asarray(ds[self.tminvar].values, dtype=float)
+        tasmax = np.asarray(ds[self.tmaxvar].values, dtype=float)
+        allgdd, allkdd = gddkdd.get_gddkdd(tasmin.ravel(), tasmax.ravel(), lower, upper)
+        allgdd = np.reshape(allgdd, tasmin.shape)
+        allkdd = np.reshape(allkdd, tasmin.shape)
+
+        return FastDataset({self.gddname: (('time', 'region'), allgdd),
+                            self.kddname: (('time', 'region'), allkdd)},
+                           {'time': ds.time, 'region': ds.region}, attrs=ds.attrs)
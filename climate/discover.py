@@ -10,7 +10,8 @@ from openest.generate import fast_dataset
 from interpret import configs
 from datastore import population
 from .reader import *
-from .dailyreader import DailyWeatherReader, YearlyBinnedWeatherReader, MonthlyBinnedWeatherReader, MonthlyDimensionedWeatherReader, GDDKDDReader
+from . import netcdfs
+from .dailyreader import DailyWeatherReader, ConsolidatedDailyWeatherReader, YearlyBinnedWeatherReader, MonthlyBinnedWeatherReader, MonthlyDimensionedWeatherReader, GDDKDDReader
 from .yearlyreader import YearlyWeatherReader, YearlyDayLikeWeatherReader
 from . import pattern_matching
 
@@ -51,9 +52,9 @@ def standard_variable(name, mytimerate, **config):
         if mytimerate == 'day':
             return iterator
         elif mytimerate == 'month':
-            return discover_day2month(iterator, lambda arr, dim: np.sum(arr, axis=dim))
+            return discover_day2month(iterator, accumulate_sum)
         elif mytimerate == 'year':
-            return discover_day2year(iterator, lambda arr, dim: np.sum(arr, axis=dim))
+            return discover_day2year(iterator, accumulate_sum)
 
     if '.' in name:
         chunks = re_dotsplit.split(name)
@@ -72,9 +73,9 @@ def standard_variable(name, mytimerate, **config):
             if mytimerate == 'day':
                 return var
             elif mytimerate == 'month':
-                return discover_day2month(var, lambda arr, dim: np.sum(arr, axis=dim))
+                return discover_day2month(var, accumulate_sum)
             elif mytimerate == 'year':
-                return discover_day2year(var, lambda arr, dim: np.sum(arr, axis=dim))
+                return discover_day2year(var, accumulate_sum)
 
             return var
 
@@ -96,12 +97,18 @@ def standard_variable(name, mytimerate, **config):
         polyedvars = ['tas', 'tasmax']
 
         if name in polyedvars:
+            polysdir = get_consolidated_polys_dir(name, name, version)
+            if polysdir:
+                return discover_versioned(polysdir, name, readerclass=ConsolidatedDailyWeatherReader, **config)
             return discover_versioned(files.sharedpath("climate/BCSD/hierid/popwt/daily/" + name), name, version=version, **config)
         for ii in range(2, 10):
-            if name in ["%s-poly-%d" % (var, ii) for var in polyedvars]:
-                return discover_versioned(files.sharedpath("climate/BCSD/hierid/popwt/daily/" + name), name, version=version, **config)
-            if name in ["%s%d" % (var, ii) for var in polyedvars]:
-                return discover_versioned(files.sharedpath("climate/BCSD/hierid/popwt/daily/%s-poly-%s" % (name[:-1], name[-1])), '%s-poly-%s' % (name[:-1], name[-1]), version=version, **config)
+            for var in polyedvars:
+                if name in ["%s-poly-%d" % (var, ii), "%s%d" % (var, ii)]:
+                    polyname = "%s-poly-%d" % (var, ii)
+                    polysdir = get_consolidated_polys_dir(var, polyname, version)
+                    if polysdir:
+                        return discover_versioned(polysdir, polyname, readerclass=ConsolidatedDailyWeatherReader, **config)
+                    return discover_versioned(files.sharedpath("climate/BCSD/hierid/popwt/daily/" + polyname), polyname, version=version, **config)
         if name == 'prmm':
             if config.get('show-source', False):
                 print((files.sharedpath('climate/BCSD/aggregation/cmip5/IR_level/*/pr')))
@@ -127,7 +134,7 @@ def standard_variable(name, mytimerate, **config):
         # any 'tas*' variable except particular cases are retrieved at the daily level and averaged at the monthly level. 
         # particular cases must be logically addressed by the code above this comment, e.g. 'tasbin'.
         if name[0:3]=='tas':
-            return discover_day2month(standard_variable(name, 'day', **config),  lambda arr, dim: np.mean(arr, axis=dim))
+            return discover_day2month(standard_variable(name, 'day', **config),  accumulate_mean)
 
         if name == 'edd':
             if config.get('show-source', False):
@@ -163,31 +170,31 @@ def standard_variable(name, mytimerate, **config):
                 return discover_versioned_yearly(files.sharedpath("climate/BCSD/hierid/popwt/annual/%s-poly-%s" % (name[:-1], name[-1])), '%s-poly-%s' % (name[:-1], name[-1]), version=version, **config)
 
         if name in polyedvars_daily:
-            return discover_day2year(standard_variable(name, 'day', **config), lambda arr, dim: np.sum(arr, axis=dim))
+            return discover_day2year(standard_variable(name, 'day', **config), accumulate_sum)
 
         for ii in range(2, 10):
             if name in ["%s-poly-%d" % (var, ii) for var in polyedvars_daily]:
-                return discover_day2year(standard_variable(name, 'day', **config), lambda arr, dim: np.sum(arr, axis=dim))
+                return discover_day2year(standard_variable(name, 'day', **config), accumulate_sum)
             if name in ["%s%d" % (var, ii) for var in polyedvars_daily]:
-                return discover_day2year(standard_variable(name, 'day', **config), lambda arr, dim: np.sum(arr, axis=dim))
+                return discover_day2year(standard_variable(name, 'day', **config), accumulate_sum)
 
             # If "mean" appended to front of daily variable name, do mean instead of sum...
             m = {"mean%s-poly-%d" % (v, ii): "%s-poly-%d" % (v, ii) for v in polyedvars_daily}
             if name in m:
                 return discover_rename(
-                    discover_day2year(standard_variable(m[name], 'day', **config), lambda arr, dim: np.mean(arr, axis=dim)),
+                    discover_day2year(standard_variable(m[name], 'day', **config), accumulate_mean),
                     {m[name]: name}
                     )
             m = {"mean%s%d" % (v, ii): "%s%d" % (v, ii) for v in polyedvars_daily}
             if name in m:
                 return discover_rename(
-                    discover_day2year(standard_variable(m[name], 'day', **config), lambda arr, dim: np.mean(arr, axis=dim)),
+                    discover_day2year(standard_variable(m[name], 'day', **config), accumulate_mean),
                     {m[name]: name}
                     )
 
         if name == 'meantas':
             return discover_rename(
-                discover_day2year(standard_variable('tas', 'day', **config), lambda arr, dim: np.mean(arr, axis=dim)), {'tas': 'meantas'})
+                discover_day2year(standard_variable('tas', 'day', **config), accumulate_mean), {'tas': 'meantas'})
         if name == 'areatas-aggregated':
             if config.get('show-source', False):
                 print((files.sharedpath("outputs/temps/*/*/areatas-aggregated.nc4")))
@@ -476,7 +483,41 @@ def precheck_pastfuture(scenario, model, pasttemplate, futuretemplate, regionid,
 
     return True
         
-def discover_versioned(basedir, variable, version=None, reorder=True, **config):
+def get_consolidated_polys_dir(variable, ncvar, version=None):
+    """Return the directory of consolidated powers of `variable`, built by
+    generate.polygen, or None if it does not exist, its files do not
+    contain `ncvar`, or a specific version was requested."""
+    if version is not None:
+        return None
+    polysdir = files.sharedpath("climate/BCSD/hierid/popwt/daily/%s-polys" % variable)
+    if not os.path.exists(polysdir):
+        return None
+    if ncvar not in get_consolidated_variables(polysdir):
+        print("WARNING: %s does not contain %s; reading it separately." % (polysdir, ncvar))
+        return None
+    return polysdir
+
+def get_consolidated_variables(polysdir):
+    """Return the variables in the first consolidated file under `polysdir`."""
+    for root, dirs, filenames in os.walk(polysdir):
+        dirs.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1] == '.nc4':
+                return netcdfs.readvariables(os.path.join(root, filename))
+    return []
+
+def lazy_reader(reorder, readerclass, template, year1, regionvar, *variables):
+    """Return a LazyWeatherReader for `readerclass(template, year1, regionvar, *variables)`,
+    wrapped in a RegionReorderWeatherReader if `reorder`."""
+    def factory():
+        reader = readerclass(template, year1, regionvar, *variables)
+        if reorder:
+            return RegionReorderWeatherReader(reader)
+        return reader
+
+    return LazyWeatherReader(factory, variables)
+
+def discover_versioned(basedir, variable, version=None, reorder=True, readerclass=DailyWeatherReader, **config):
     if config.get('show-source', False):
         print(basedir)
     
@@ -484,12 +525,8 @@ def discover_versioned(basedir, variable, version=None, reorder=True, **config):
         if not precheck_pastfuture(scenario, model, pasttemplate, futuretemplate, 'hierid', variable):
             continue
 
-        if reorder:
-            pastreader = RegionReorderWeatherReader(DailyWeatherReader(pasttemplate, config.get('startyear', 1981), 'hierid', variable))
-            futurereader = RegionReorderWeatherReader(DailyWeatherReader(futuretemplate, 2006, 'hierid', variable))
-        else:
-            pastreader = DailyWeatherReader(pasttemplate, config.get('startyear', 1981), 'hierid', variable)
-            futurereader = DailyWeatherReader(futuretemplate, 2006, 'hierid', variable)
+        pastreader = lazy_reader(reorder, readerclass, pasttemplate, config.get('startyear', 1981), 'hierid', variable)
+        futurereader = lazy_reader(reorder, readerclass, futuretemplate, 2006, 'hierid', variable)
 
         yield scenario, model, pastreader, futurereader
 
@@ -503,12 +540,8 @@ def discover_versioned_iterated(basedir, prefix, count, version=None, reorder=Tr
         if not precheck_pastfuture(scenario, model, pasttemplate, futuretemplate, 'hierid', *variables):
             continue
 
-        if reorder:
-            pastreader = RegionReorderWeatherReader(DailyWeatherReader(pasttemplate, config.get('startyear', 1981), 'hierid', *variables))
-            futurereader = RegionReorderWeatherReader(DailyWeatherReader(futuretemplate, 2006, 'hierid', *variables))
-        else:
-            pastreader = DailyWeatherReader(pasttemplate, config.get('startyear', 1981), 'hierid', *variables)
-            futurereader = DailyWeatherReader(futuretemplate, 2006, 'hierid', *variables)
+        pastreader = lazy_reader(reorder, DailyWeatherReader, pasttemplate, config.get('startyear', 1981), 'hierid', *variables)
+        futurereader = lazy_reader(reorder, DailyWeatherReader, futuretemplate, 2006, 'hierid', *variables)
 
         yield scenario, model, pastreader, futurereader
 
@@ -523,12 +556,8 @@ def discover_versioned_binned(basedir, variable, dim, version=None, reorder=True
 
 def discover_versioned_yearly(basedir, variable, version=None, reorder=True, **config):
     for scenario, model, pasttemplate, futuretemplate in discover_versioned_models(basedir, version, **config):
-        if reorder:
-            pastreader = RegionReorderWeatherReader(YearlyDayLikeWeatherReader(pasttemplate, config.get('startyear', 1981), 'hierid', variable))
-            futurereader = RegionReorderWeatherReader(YearlyDayLikeWeatherReader(futuretemplate, 2006, 'hierid', variable))
-        else:
-            pastreader = YearlyDayLikeWeatherReader(pasttemplate, config.get('startyear', 1981), 'hierid', variable)
-            futurereader = YearlyDayLikeWeatherReader(futuretemplate, 2006, 'hierid', variable)
+        pastreader = lazy_reader(reorder, YearlyDayLikeWeatherReader, pasttemplate, config.get('startyear', 1981), 'hierid', variable)
+        futurereader = lazy_reader(reorder, YearlyDayLikeWeatherReader, futuretemplate, 2006, 'hierid', variable)
 
         yield scenario, model, pastreader, futurereader
 
@@ -549,14 +578,37 @@ def discover_makehist(discover_iterator):
         yield scenario, model, RenameReader(pastreader, lambda x: x + '.histclim'), HistoricalCycleReader(pastreader, futurereader)
 
 def discover_makegddkdd(discover_iterator, lower, upper):
+    """Convert readers of daily minimum and maximum temperatures (or of a
+    single temperature, used as both) into growing and killing degree-days."""
     for scenario, model, pastreader, futurereader in discover_iterator:
-        yield scenario, model, GDDKDDReader(pastreader, lower, upper), GDDKDDReader(futurereader, lower, upper)
+        dimension = list(pastreader.get_dimension())
+        assert len(dimension) in [1, 2], "gddkdd requires a minimum and maximum temperature variable, or a single temperature."
+        tminvar, tmaxvar = dimension[0], dimension[-1]
+        yield scenario, model, GDDKDDReader(pastreader, tminvar, tmaxvar, lower, upper), GDDKDDReader(futurereader, tminvar, tmaxvar, lower, upper)
 
 def discover_rename(discover_iterator, name_dict):
     """name_dict can be a {new: old} dictionary, a string (if other discover produces only 1 var), or a function."""
     for scenario, model, pastreader, futurereader in discover_iterator:
         yield scenario, model, RenameReader(pastreader, name_dict), RenameReader(futurereader, name_dict)
 
+# First day of each month, for 365-day and 366-day years
+MONTH_STARTS_NOLEAP = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+MONTH_STARTS_LEAP = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+def accumulate_sum(arr, dim):
+    return np.sum(arr, axis=dim)
+
+def accumulate_mean(arr, dim):
+    return np.mean(arr, axis=dim)
+
+def get_month_starts(ndays):
+    """Return the index of the first day of each month in a year of `ndays` days."""
+    if ndays == 365:
+        return MONTH_STARTS_NOLEAP
+    if ndays == 366:
+        return MONTH_STARTS_LEAP
+    return np.array([int(mm * 30.4167) for mm in range(12)])
+
 def discover_day2month(discover_iterator, accumfunc):
     #time_conversion = lambda days: np.unique(np.floor((days % 1000) / 30.4167)) # Should just give 0 - 11
     time_conversion = lambda days: np.arange(12)
@@ -576,22 +628,26 @@ def discover_day2month(discover_iterator, accumfunc):
 
     return discover_convert(discover_iterator, time_conversion, ds_conversion)
 
-def data_vars_time_conversion(name, ds, varset, accumfunc):
+def get_vardef(name, ds, varset):
+    """Return the (dims, values) definition or coordinate for `name` in `ds`."""
     if isinstance(ds, fast_dataset.FastDataset):
         if varset == 'vars':
-            vardef = ds.original_data_vars[name]
+            return ds.original_data_vars[name]
         elif varset == 'coords':
-            vardef = ds.original_coords[name]
+            return ds.original_coords[name]
         else:
             assert False, "Unknown varset."
     else:
         if varset == 'vars':
-            vardef = (ds.variables[name].dims, ds.variables[name].values)
+            return (ds.variables[name].dims, ds.variables[name].values)
         elif varset == 'coords':
-            vardef = ds.coords[name]
+            return ds.coords[name]
         else:
             assert False, "Unknown varset."
 
+def data_vars_time_conversion(name, ds, varset, accumfunc):
+    vardef = get_vardef(name, ds, varset)
+
     if isinstance(vardef, tuple):
         try:
             dimnum = vardef[0].index('time')
@@ -600,12 +656,24 @@ def data_vars_time_conversion(name, ds, varset, accumfunc):
             print(ex)
             return vardef
 
+        ndays = vardef[1].shape[dimnum]
+        starts = get_month_starts(ndays)
+        if accumfunc is accumulate_sum or accumfunc is accumulate_mean:
+            # Reduce all months at once
+            result = np.add.reduceat(vardef[1], starts, axis=dimnum, dtype=float)
+            if accumfunc is accumulate_mean:
+                countshape = [1] * len(vardef[0])
+                countshape[dimnum] = 12
+                result /= np.diff(np.append(starts, ndays)).reshape(countshape)
+            return (vardef[0], result)
+
+        ends = np.append(starts[1:], ndays)
         myshape = list(vardef[1].shape)
         myshape[dimnum] = 12
         result = np.zeros(tuple(myshape))
         for mm in range(12):
             beforeindex = [slice(None)] * len(vardef[0])
-            beforeindex[dimnum] = slice(int(mm * 30.4167), int((mm+1) * 30.4167))
+            beforeindex[dimnum] = slice(starts[mm], ends[mm])
             afterindex = [slice(None)] * len(vardef[0])
             afterindex[dimnum] = mm
             result[tuple(afterindex)] = accumfunc(vardef[1][tuple(beforeindex)], dimnum)
@@ -630,8 +698,7 @@ def discover_day2year(discover_iterator, accumfunc):
 
         newvars = {}
         for name in vars_only:
-            newvars[name] = data_vars_time_conversion_year(name, ds, 'vars', accumfunc)
-            newvars['daily' + name] = data_vars_time_conversion_year(name, ds, 'vars', lambda arr, dim: np.mean(arr, axis=dim))
+            newvars[name], newvars['daily' + name] = data_vars_time_conversion_year_mean(name, ds, accumfunc)
         ds = fast_dataset.FastDataset(newvars,
                                       coords={name: data_vars_time_conversion_year(name, ds, 'coords', accumfunc) for name in used_coords},
                                       attrs=ds.attrs)
@@ -650,23 +717,12 @@ def discover_map(name, unit, func, *iterators):
 
     for scenario, model in pastfutures:
         if len(pastfutures[(scenario, model)]) == len(iterators):
-            yield scenario, model, MapReader(name, unit, func, *[pastfuture[0] for pastfuture in pastfutures[(scenario, model)]]), MapReader(name, unit, func, *[pastfuture[1] for pastfuture in pastfutures[(scenario, model)]])
+            pastreaders = [pastfuture[0] for pastfuture in pastfutures[(scenario, model)]]
+            futurereaders = [pastfuture[1] for pastfuture in pastfutures[(scenario, model)]]
+            yield scenario, model, LazyWeatherReader(lambda pastreaders=pastreaders: MapReader(name, unit, func, *pastreaders), [name]), LazyWeatherReader(lambda futurereaders=futurereaders: MapReader(name, unit, func, *futurereaders), [name])
 
 def data_vars_time_conversion_year(name, ds, varset, accumfunc):
-    if isinstance(ds, fast_dataset.FastDataset):
-        if varset == 'vars':
-            vardef = ds.original_data_vars[name]
-        elif varset == 'coords':
-            vardef = ds.original_coords[name]
-        else:
-            assert False, "Unknown varset."
-    else:
-        if varset == 'vars':
-            vardef = (ds.variables[name].dims, ds.variables[name].values)
-        elif varset == 'coords':
-            vardef = ds.coords[name]
-        else:
-            assert False, "Unknown varset."
+    vardef = get_vardef(name, ds, varset)
 
     if isinstance(vardef, tuple):
         try:
@@ -691,6 +747,20 @@ def data_vars_time_conversion_year(name, ds, varset, accumfunc):
 
     return np.array([ds['time.year'][0]])
 
+def data_vars_time_conversion_year_mean(name, ds, accumfunc):
+    """Return both the `accumfunc` and mean yearly definitions of a variable, summing the data once."""
+    vardef = get_vardef(name, ds, 'vars')
+
+    if isinstance(vardef, tuple) and 'time' in vardef[0] and (accumfunc is accumulate_sum or accumfunc is accumulate_mean):
+        dimnum = vardef[0].index('time')
+        total = np.sum(vardef[1], axis=dimnum, keepdims=True, dtype=float)
+        mean = total / vardef[1].shape[dimnum]
+        if accumfunc is accumulate_sum:
+            return (vardef[0], total), (vardef[0], mean)
+        return (vardef[0], mean), (vardef[0], mean)
+
+    return data_vars_time_conversion_year(name, ds, 'vars', accumfunc), data_vars_time_conversion_year(name, ds, 'vars', accumulate_mean)
+
 def discover_fakerepeat(iterator):
     for scenario, model, pastreader, futurereader in iterator:
         yield scenario, model, FakeRepeaterReader(pastreader), FakeRepeaterReader(futurereader)
@@ -0,0 +1,146 @@
+"""Persistent cache of climate discovery results.
+
+Discovering weather data requires probing for yearly files, globbing
+for versions, and opening NetCDFs for their version, units, and
+regions. On a networked filesystem, this can take minutes before any
+calculation starts. When a manifest is enabled (with the
+`discovery-manifest` configuration option), these results are stored
+in a JSON file and reused by later runs.
+
+Each entry records the modification times of the files or directories
+it was computed from, and is recomputed if any of those have changed.
+"""
+
+import os, json, atexit, hashlib, tempfile, threading
+import numpy as np
+
+active = None # The enabled DiscoveryManifest, if any
+
+class DiscoveryManifest(object):
+    """Cache of discovery results, stored as JSON at `path`."""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.entries = {} # {key: {'mtimes': {path: mtime}, 'value': value}}
+        self.blobs = {} # {checksum: value}, for values shared across entries
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as fp:
+                    content = json.load(fp)
+                self.entries = content.get('entries', {})
+                self.blobs = content.get('blobs', {})
+            except Exception as ex:
+                print("WARNING: Cannot read discovery manifest %s; rebuilding." % path)
+                print(ex)
+
+    def get(self, key, dependencies, compute):
+        """Return the cached value for `key`, or compute and store it.
+
+        Parameters
+        ----------
+        key : str
+        dependencies : list of str
+            Paths whose modification times invalidate the entry.
+        compute : function
+            Called with no arguments to produce a JSON-serializable value.
+        """
+        mtimes = get_mtimes(dependencies)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and mtimes is not None and entry['mtimes'] == mtimes:
+                return entry['value']
+
+        value = compute()
+        if mtimes is not None:
+            with self.lock:
+                self.entries[key] = {'mtimes': mtimes, 'value': value}
+                self.dirty = True
+        return value
+
+    def get_blob(self, checksum):
+        return self.blobs[checksum]
+
+    def add_blob(self, value):
+        checksum = hashlib.sha1(json.dumps(value).encode()).hexdigest()
+        with self.lock:
+            if checksum not in self.blobs:
+                self.blobs[checksum] = value
+                self.dirty = True
+        return checksum
+
+    def save(self):
+        """Write the manifest, if changed, replacing the file atomically."""
+        with self.lock:
+            if not self.dirty:
+                return
+            content = json.dumps({'entries': self.entries, 'blobs': self.blobs})
+            self.dirty = False
+
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmppath = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fp:
+            fp.write(content)
+        os.replace(tmppath, self.path)
+
+def get_mtimes(paths):
+    """Return {path: mtime}, or None if any path is missing."""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            return None
+    return mtimes
+
+def enable(path):
+    """Use the manifest at `path` for discovery in this process."""
+    global active
+    if active is not None and active.path == path:
+        return active
+
+    if active is not None:
+        active.save()
+    active = DiscoveryManifest(path)
+    atexit.register(active.save)
+    return active
+
+def disable():
+    global active
+    if active is not None:
+        active.save()
+    active = None
+
+def cached(key, dependencies, compute):
+    """Return `compute()`, through the active manifest if one is enabled."""
+    if active is None:
+        return compute()
+    return active.get(key, dependencies, compute)
+
+def cached_array(key, dependencies, compute):
+    """Like `cached`, for numpy arrays (or None); arrays are stored once per unique content."""
+    if active is None:
+        return compute()
+
+    computed = [] # the value, if computed here
+
+    def compute_encoded():
+        value = compute()
+        computed.append(value)
+        if value is None:
+            return None
+        if np.ma.isMaskedArray(value) or value.dtype.kind not in 'iufUO':
+            return {'uncacheable': True}
+        return {'dtype': value.dtype.str if value.dtype.kind != 'O' else 'O',
+                'checksum': active.add_blob(value.tolist())}
+
+    encoded = active.get(key, dependencies, compute_encoded)
+    if computed:
+        return computed[0]
+    if encoded is None:
+        return None
+    if encoded.get('uncacheable'):
+        return compute()
+    return np.array(active.get_blob(encoded['checksum']), dtype=encoded['dtype'])
@@ -5,11 +5,12 @@ import logging
 import numpy as np
 from netCDF4 import Dataset
 from xarray import open_dataset
+from . import manifest
 
 logger = logging.getLogger(__name__)
 
 
-def load_netcdf(filename_or_obj, **kwargs):
+def load_netcdf(filename_or_obj, variables=None, **kwargs):
     """Open, load NetCDF file, close file - with thread global thread lock.
 
     This is a thin wrapper around ``xarray.open_dataset``, behaving like
@@ -20,6 +21,11 @@ def load_netcdf(filename_or_obj, **kwargs):
     Parameters
     ----------
     filename_or_obj
+    variables : sequence of str, optional
+        Names of the variables to read. If given, other data variables
+        are never read from disk; coordinates are always read. Names
+        not in the file (e.g., a dimension without a coordinate
+        variable) are ignored.
     kwargs :
         Passed to ``xarray.open_dataset``.
 
@@ -42,6 +48,9 @@ def load_netcdf(filename_or_obj, **kwargs):
         pass # this seems to happen erratically
 
     with open_dataset(filename_or_obj, **kwargs) as ds:
+        if variables is not None:
+            # Variables are read lazily, so only the selected ones are loaded
+            ds = ds[[name for name in variables if name in ds.variables]]
         return ds.load()
 
 
@@ -66,7 +75,10 @@ def readmeta(filepath, variable):
     Return version, units.
     """
     assert os.path.exists(filepath), filepath + " does not exist."
+    return tuple(manifest.cached('readmeta|%s|%s' % (filepath, variable), [filepath],
+                                 lambda: readmeta_uncached(filepath, variable)))
 
+def readmeta_uncached(filepath, variable):
     rootgrp = Dataset(filepath, 'r', format='NETCDF4')
     assert variable in rootgrp.variables, "%s does not contain %s." % (filepath, variable)
 
@@ -83,10 +95,28 @@ def readmeta(filepath, variable):
 
     return version, units
 
+def readvariables(filepath):
+    """
+    Return the names of the variables in a file.
+    """
+    return manifest.cached('readvariables|%s' % filepath, [filepath],
+                           lambda: readvariables_uncached(filepath))
+
+def readvariables_uncached(filepath):
+    rootgrp = Dataset(filepath, 'r', format='NETCDF4')
+    variables = list(rootgrp.variables.keys())
+    rootgrp.close()
+
+    return variables
+
 def readncdf_single(filepath, variable, allow_missing=False):
     """
     Just return the variable
     """
+    return manifest.cached_array('readncdf_single|%s|%s|%s' % (filepath, variable, allow_missing), [filepath],
+                                 lambda: readncdf_single_uncached(filepath, variable, allow_missing))
+
+def readncdf_single_uncached(filepath, variable, allow_missing=False):
     rootgrp = Dataset(filepath, 'r', format='NETCDF4')
     if allow_missing and variable not in rootgrp.variables:
         data = None
@@ -10,11 +10,11 @@ WeatherReader classes if the file and directory structures have been
 used before. Otherwise, that logic is encapsulated here.
 """
 
-import os, glob
+import os, glob, threading
 import numpy as np
 import xarray as xr
 import pandas as pd
-from . import netcdfs
+from . import netcdfs, manifest
 from datastore import irregions
 
 class WeatherReader(object):
@@ -44,6 +44,85 @@ class WeatherReader(object):
         """
         raise NotImplementedError
 
+    def load(self):
+        """Complete any deferred construction (see `LazyWeatherReader`)."""
+        pass
+
+class LazyWeatherReader(WeatherReader):
+    """Defers the construction of another weather reader until it is used.
+
+    Constructing file-based readers reads the metadata of a file (and
+    the regions, for a RegionReorderWeatherReader), so the discover
+    iterators yield this proxy, and the reader is constructed by
+    `load`, called when a bundle is loaded or an attribute is first
+    needed.
+
+    Parameters
+    ----------
+    factory : function() -> WeatherReader
+    dimension : list of str
+        The value of `get_dimension()`, known without constructing the reader.
+    """
+
+    def __init__(self, factory, dimension):
+        self.factory = factory
+        self.dimension = dimension
+        self.reader = None
+        self.loadlock = threading.Lock()
+
+    def __repr__(self):
+        return "LazyWeatherReader(%s)" % (self.reader if self.reader is not None else self.dimension)
+
+    def load(self):
+        with self.loadlock:
+            if self.reader is None:
+                self.reader = self.factory()
+        self.reader.load()
+        return self.reader
+
+    def __getattr__(self, name):
+        # Only called for attributes not set by this proxy
+        if name in ['factory', 'dimension', 'reader', 'loadlock']:
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def get_times(self):
+        return self.load().get_times()
+
+    def get_regions(self):
+        return self.load().get_regions()
+
+    def get_dimension(self):
+        return self.dimension
+
+    def read_iterator(self):
+        return self.load().read_iterator()
+
+class WrapperWeatherReader(WeatherReader):
+    """Base for readers that wrap another reader and share its metadata.
+
+    The metadata are taken from the wrapped reader when requested, so
+    wrapping a LazyWeatherReader does not construct it.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    @property
+    def version(self):
+        return self.reader.version
+
+    @property
+    def units(self):
+        return self.reader.units
+
+    @property
+    def time_units(self):
+        return self.reader.time_units
+
+    def load(self):
+        self.reader.load()
+
 class YearlySplitWeatherReader(WeatherReader):
     """Exposes weather data, split into yearly files."""
 
@@ -66,22 +145,25 @@ class YearlySplitWeatherReader(WeatherReader):
     def get_years(self):
         "Returns list of years."
 
-        years = []
+        def probe():
+            years = []
 
-        # Look for available yearly files
-        year = self.year1
-        while os.path.exists(self.find_templated(year)):
-            years.append(year)
-            year += 1
+            # Look for available yearly files
+            year = self.year1
+            while os.path.exists(self.find_templated(year)):
+                years.append(year)
+                year += 1
 
-        return years
+            return years
+
+        # Adding a yearly file or directory changes the mtime of its parent
+        basedir = os.path.dirname(self.template.split('%')[0])
+        return manifest.cached('years|%s|%d' % (self.template, self.year1), [basedir], probe)
 
     def file_iterator(self):
         # Yield data in yearly chunks
-        year = self.year1
-        while os.path.exists(self.find_templated(year)):
+        for year in self.get_years():
             yield self.find_templated(year)
-            year += 1
 
     def read_iterator_to(self, maxyear):
         for ds in self.read_iterator():
@@ -108,7 +190,8 @@ class YearlySplitWeatherReader(WeatherReader):
         if "%v" not in template:
             return template % (year)
 
-        options = glob.glob(template.replace("%v", "*") % (year))
+        pattern = template.replace("%v", "*") % (year)
+        options = manifest.cached('glob|' + pattern, [os.path.dirname(pattern)], lambda: glob.glob(pattern))
         if len(options) == 0:
             return template.replace("%v", "unknown") % (year)
 
@@ -120,12 +203,11 @@ class YearlySplitWeatherReader(WeatherReader):
     def precheck(template, year1, variables):
         return None
 
-class ConversionWeatherReader(WeatherReader):
+class ConversionWeatherReader(WrapperWeatherReader):
     """Wraps another weather reader, applying conversion to its weather."""
 
     def __init__(self, reader, time_conversion, ds_conversion):
-        super(ConversionWeatherReader, self).__init__(reader.version, reader.units, reader.time_units)
-        self.reader = reader
+        super(ConversionWeatherReader, self).__init__(reader)
         self.time_conversion = time_conversion
         self.ds_conversion = ds_conversion
 
@@ -248,11 +330,10 @@ class RegionReorderWeatherReader(WeatherReader):
 
         return newds
 
-class RenameReader(WeatherReader):
+class RenameReader(WrapperWeatherReader):
     """Wraps another weatherReader, renaming all variables."""
     def __init__(self, reader, renamer):
-        super(RenameReader, self).__init__(reader.version, reader.units, reader.time_units)
-        self.reader = reader
+        super(RenameReader, self).__init__(reader)
         self.renamer = renamer
         if isinstance(self.renamer, str):
             assert len(self.reader.get_dimension()) == 1
@@ -298,14 +379,17 @@ class RenameReader(WeatherReader):
 
         return self.reader.read_year(year).rename(renames)
 
-class HistoricalCycleReader(WeatherReader):
+class HistoricalCycleReader(WrapperWeatherReader):
     """Wraps another weather reader, iterating through history repeatedly, pretending to be a future reader."""
 
     def __init__(self, reader, futurereader):
-        super(HistoricalCycleReader, self).__init__(reader.version, reader.units, reader.time_units)
-        self.reader = reader
+        super(HistoricalCycleReader, self).__init__(reader)
         self.futurereader = futurereader
 
+    def load(self):
+        self.reader.load()
+        self.futurereader.load()
+
     def get_times(self):
         """Returns a list of all times available."""
         return self.futurereader.get_times()
@@ -354,6 +438,10 @@ class MapReader(WeatherReader):
         for reader in readers[1:]:
             assert reader.get_times() == readers[0].get_times()
 
+    def load(self):
+        for reader in self.readers:
+            reader.load()
+
     def get_times(self):
         """Returns a list of all times available."""
         return self.readers[0].get_times()
@@ -388,10 +476,9 @@ class MapReader(WeatherReader):
 
         return ds0.rename({origvar: self.name})
 
-class FakeRepeaterReader(WeatherReader):
+class FakeRepeaterReader(WrapperWeatherReader):
     def __init__(self, reader, source_fakeweather=None):
-        super(FakeRepeaterReader, self).__init__(reader.version, reader.units, reader.time_units)
-        self.reader = reader
+        super(FakeRepeaterReader, self).__init__(reader)
         if source_fakeweather is None:
             self.source_fakeweather = self
         else:
@@ -17,8 +17,8 @@ class YearlyWeatherReader(WeatherReader):
 
         version, units = netcdfs.readmeta(filepath, variables[0])
 
-        regionvar = kwargs.get('regionvar', 'hierid')
-        self.regions = netcdfs.readncdf_single(filepath, regionvar, allow_missing=True) # Is None if organized by SHAPENUM
+        self.regionvar = kwargs.get('regionvar', 'hierid')
+        self.regions = netcdfs.readncdf_single(filepath, self.regionvar, allow_missing=True) # Is None if organized by SHAPENUM
         super(YearlyWeatherReader, self).__init__(version, units, 'year')
 
     def get_times(self):
@@ -35,7 +35,7 @@ class YearlyWeatherReader(WeatherReader):
         return self.variables
 
     def read_iterator(self):
-        ds = netcdfs.load_netcdf(self.filepath)
+        ds = netcdfs.load_netcdf(self.filepath, variables=list(self.variables) + [self.timevar, self.regionvar])
         years = self.get_times()
 
         for ii in range(len(years)):
@@ -91,7 +91,7 @@ class YearlyDayLikeWeatherReader(YearlySplitWeatherReader):
         return self.prepare_ds(self.file_for_year(year), year)
 
     def prepare_ds(self, filename, year):
-        ds = netcdfs.load_netcdf(filename)
+        ds = netcdfs.load_netcdf(filename, variables=list(self.variable) + [self.regionvar])
         ds = ds.rename({self.regionvar: 'region'})
         ds['time'] = np.array([year])
         ds.set_coords(['time'])
@@ -11,7 +11,7 @@ pvals[basename])` (and that's how you know that's which module it is).
 
 import importlib
 from datastore import library
-from . import server, effectset
+from . import server, effectset, telemetry
 from adaptation import csvvfile
 from openest.generate.stdlib import *
 
@@ -77,19 +77,23 @@ def call_prepare_interp(csvv, module, weatherbundle, economicmodel, pvals, farme
 
     mod = importlib.import_module(module)
     if isinstance(csvv, str):
-        csvv = csvvfile.read(csvv)
+        with telemetry.stage('csvv-read'):
+            csvv = csvvfile.read(csvv)
 
     if not standard:
         standardfunc = lambda x: x # Just pass through
     else:
         standardfunc = standardize
 
+    # Preparing the calculation computes the covariate baselines
     if 'prepare_raw' in dir(mod):
-        calculation, dependencies = mod.prepare_raw(csvv, weatherbundle, economicmodel, pvals, **kwargs)
+        with telemetry.stage('covariate-baseline'):
+            calculation, dependencies = mod.prepare_raw(csvv, weatherbundle, economicmodel, pvals, **kwargs)
         return standardfunc(calculation), dependencies
 
     if 'prepare_interp_raw' in dir(mod):
-        calculation, dependencies, baseline_get_predictors = mod.prepare_interp_raw(csvv, weatherbundle, economicmodel, pvals, farmer, **kwargs)
+        with telemetry.stage('covariate-baseline'):
+            calculation, dependencies, baseline_get_predictors = mod.prepare_interp_raw(csvv, weatherbundle, economicmodel, pvals, farmer, **kwargs)
         return standardfunc(calculation), dependencies, baseline_get_predictors
 
     raise ValueError("Could not find known prepare form.")
@@ -0,0 +1,90 @@
+"""Buffered, columnar output for diagnostic records.
+
+The diagnostic modes (`writepolys`, `writesplines`) record a row of
+predictors for every region and year. Rather than opening the output
+file for each row, a `BufferedColumnarSink` collects the rows into
+per-column buffers and writes them out in large blocks.
+
+Two formats are supported:
+ - `csv` (default): Blocks of rows are appended to the CSV file, after
+   its header (written once, if the file does not exist yet).
+ - `npz`: Each column is collected into a numpy array and all columns
+   are saved together, as a `.npz` file, when the sink is closed.
+"""
+
+import os, csv
+import numpy as np
+
+class BufferedColumnarSink(object):
+    """Collects rows into columns, and writes them in blocks.
+
+    Parameters
+    ----------
+    filepath : str
+        Output file. Under the `npz` format, the extension is replaced with `.npz`.
+    columns : sequence of str
+        Column names, written as the CSV header row.
+    write_header : function(filepath), optional
+        Called to write any metadata before the header row, when the
+        CSV file does not exist yet.
+    blocksize : int
+        Number of rows to collect before writing.
+    format : str
+        `csv` or `npz`.
+    """
+    def __init__(self, filepath, columns, write_header=None, blocksize=10000, format='csv'):
+        assert format in ['csv', 'npz'], "Unknown diagnostic format %s." % format
+        assert blocksize > 0
+
+        if format == 'npz':
+            filepath = os.path.splitext(filepath)[0] + '.npz'
+        self.filepath = filepath
+        self.columns = list(columns)
+        self.write_header = write_header
+        self.blocksize = blocksize
+        self.format = format
+
+        self.buffers = [[] for column in self.columns] # rows not yet written, by column
+        self.blocks = [[] for column in self.columns] # under npz, arrays of written rows, by column
+        self.count = 0 # rows in self.buffers
+        self.started = False
+
+    def append(self, *values):
+        """Add a row, with a value for each column."""
+        assert len(values) == len(self.columns), "Expected %d values; got %d." % (len(self.columns), len(values))
+        for buffer, value in zip(self.buffers, values):
+            buffer.append(value)
+        self.count += 1
+        if self.count >= self.blocksize:
+            self.flush()
+
+    def flush(self):
+        """Write out all collected rows."""
+        if self.format == 'csv':
+            if not self.started:
+                if not os.path.exists(self.filepath):
+                    if self.write_header is not None:
+                        self.write_header(self.filepath)
+                    with open(self.filepath, 'a') as fp:
+                        csv.writer(fp).writerow(self.columns)
+                self.started = True
+
+            if self.count > 0:
+                with open(self.filepath, 'a') as fp:
+                    csv.writer(fp).writerows(zip(*self.buffers))
+        else:
+            for block, buffer in zip(self.blocks, self.buffers):
+                if buffer:
+                    block.append(np.array(buffer))
+
+        self.buffers = [[] for column in self.columns]
+        self.count = 0
+
+    def close(self):
+        """Write out all remaining rows; under `npz`, save the file."""
+        self.flush()
+        if self.format == 'npz':
+            arrays = {column: np.concatenate(block) if block else np.array([]) for column, block in zip(self.columns, self.blocks)}
+            with open(self.filepath, 'wb') as fp:
+                np.savez(fp, **arrays)
+            self.blocks = [[] for column in self.columns]
@@ -1,4 +1,4 @@
-import re, yaml, os, time
+import re, yaml, os, time, contextlib
 import numpy as np
 import xarray as xr
 from netCDF4 import Dataset
@@ -6,7 +6,7 @@ import helpers.header as headre
 from openest.generate import retrieve, diagnostic, fast_dataset
 from adaptation import curvegen
 from interpret import configs
-from . import server, nc4writer, parallel_weather
+from . import server, nc4writer, parallel_weather, telemetry
 
 
 def simultaneous_application(weatherbundle, calculation, regions=None, push_callback=None):
@@ -49,11 +49,13 @@ def simultaneous_application(weatherbundle, calculation, regions=None, push_call
     region_indices = {region: weatherbundle.regions.index(region) for region in regions}
 
     print("Processing years...")
-    for year, ds in weatherbundle.yearbundles():
+    for year, ds in telemetry.timed_iterator('weather-read', weatherbundle.yearbundles()):
         if ds.region.shape[0] < len(applications):
             print("WARNING: fewer regions in weather than expected; dropping from end.")
 
         print("Push", year)
+        if telemetry.enabled:
+            started = telemetry.start()
         for region, subds in fast_dataset.region_groupby(ds, year, regions, region_indices):
             for yearresult in applications[region].push(subds):
                 yield (region, yearresult[0], yearresult[1:])
@@ -61,6 +63,8 @@ def simultaneous_application(weatherbundle, calculation, regions=None, push_call
             if push_callback is not None:
                 push_callback(region, year, applications[region])
                 diagnostic.finish(region, year, group='input')
+        if telemetry.enabled:
+            telemetry.stop('apply', started, maxrss=telemetry.get_maxrss())
                 
     for region in applications:
         for yearresult in applications[region].done():
@@ -74,7 +78,7 @@ def generate(targetdir, basename, weatherbundle, calculation, description, calcu
     See the subprocesses prepare_ncdf_data and write_ncdf for most
     parameter definitions. The only additional parameter handled by
     this function is `filter_region`; it also works differently for
-    the 'profile' or 'diagnostic' modes.
+    the 'diagnostic' mode.
 
     Parameters
     ----------
@@ -82,9 +86,6 @@ def generate(targetdir, basename, weatherbundle, calculation, description, calcu
         One or more regions to perform calculations for. If None, uses all
         regions available in ``weatherbundle.regions``.
     """
-    if 'mode' in config and config['mode'] == 'profile':
-        return small_print(weatherbundle, calculation, regions=10000)
-
     if 'mode' in config and config['mode'] == 'diagnostic':
         return small_print(weatherbundle, calculation, regions=[config['region']])
 
@@ -97,11 +98,10 @@ def generate(targetdir, basename, weatherbundle, calculation, description, calcu
     my_regions = configs.get_regions(weatherbundle.regions, filter_region)
     columndata = prepare_ncdf_data(weatherbundle, calculation, my_regions, push_callback=push_callback, diagnosefile=diagnosefile, deltamethod_vcv=deltamethod_vcv)
 
-    if parallel_weather.is_parallel(weatherbundle):
-        weatherbundle.driver.lock.acquire()
-    write_ncdf(targetdir, basename, columndata, weatherbundle, calculation, description, calculation_dependencies, my_regions, subset=subset, deltamethod_vcv=deltamethod_vcv)
-    if parallel_weather.is_parallel(weatherbundle):
-        weatherbundle.driver.lock.release()
+    # Serialize writes between workers, without holding the driver's lock (which the pipeline waits on)
+    writelock = weatherbundle.driver.writelock if parallel_weather.is_parallel(weatherbundle) else contextlib.nullcontext()
+    with writelock, telemetry.stage('write'):
+        write_ncdf(targetdir, basename, columndata, weatherbundle, calculation, description, calculation_dependencies, my_regions, subset=subset, deltamethod_vcv=deltamethod_vcv)
 
 def prepare_ncdf_data(weatherbundle, calculation, my_regions, push_callback=None, diagnosefile=False, deltamethod_vcv=False):
     """Compute impact projection
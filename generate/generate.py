@@ -2,15 +2,14 @@
 Manages rcps and econ and climate models, and generate.effectset.simultaneous_application handles the regions and years.
 """
 
-import os, shutil, csv, yaml, tempfile, warnings
+import os, shutil, yaml, tempfile, warnings
 from collections import OrderedDict
 import numpy as np
 from . import loadmodels
-from . import weather, pvalses, timing
+from . import weather, pvalses, timing, telemetry, sampling, diagsink, jobqueue
 from interpret import configs
-from openest.generate import diagnostic
 from impactlab_tools.utils import files, paralog
-import cProfile, pstats, io, metacsv
+import metacsv
 
 def main(config, config_name=None, statman=None):
     """Main generate func, given run config dict and run ID str for logging
@@ -55,15 +54,40 @@ def main(config, config_name=None, statman=None):
 
     targetdir = None # The current targetdir
 
+    # Shared queue of target directories, replacing random order and claiming
+    jobs = None
+    if config.get('job-queue'):
+        if config.get('mode') in ['median', 'montecarlo']:
+            jobs = jobqueue.JobQueue(files.configpath(config['job-queue']), lease_timeout=config.get('job-lease', 30) * 60,
+                                     max_attempts=config.get('job-attempts', 3))
+        else:
+            print("WARNING: job-queue is only used in median and montecarlo modes.")
+
     ### Mode-specific iterators, yielding target directories to process
 
     def iterate_median():
+        if jobs is not None:
+            for batchdir, exogen in jobs.iterate(['median'], loadmodels.random_order(mod.get_bundle_iterator(config), config)):
+                pvals = pvalses.ConstantPvals(.5)
+                yield (batchdir, pvals) + tuple(exogen)
+            return
+
         for clim_scenario, clim_model, weatherbundle, econ_scenario, econ_model, economicmodel in loadmodels.random_order(mod.get_bundle_iterator(config), config):
             pvals = pvalses.ConstantPvals(.5)
             yield 'median', pvals, clim_scenario, clim_model, weatherbundle, econ_scenario, econ_model, economicmodel
 
     def iterate_montecarlo():
         mc_batch_iter = configs.get_batch_iter(config)
+        if jobs is not None:
+            assert isinstance(mc_batch_iter, list), "job-queue requires mc-n or only-batch-number."
+            for batchdir, exogen in jobs.iterate(['batch' + str(batch) for batch in mc_batch_iter], loadmodels.random_order(mod.get_bundle_iterator(config), config)):
+                clim_scenario, clim_model, weatherbundle, econ_scenario, econ_model, economicmodel = exogen
+                # Use "pvals" seeds from config, if available.
+                relative_location = [batchdir, clim_scenario, clim_model, econ_scenario, econ_model]
+                pvals = pvalses.get_montecarlo_pvals(config, relative_location)
+                yield batchdir, pvals, clim_scenario, clim_model, weatherbundle, econ_scenario, econ_model, economicmodel
+            return
+
         for batch in mc_batch_iter:
             for clim_scenario, clim_model, weatherbundle, econ_scenario, econ_model, economicmodel in loadmodels.random_order(mod.get_bundle_iterator(config), config):
                 # Use "pvals" seeds from config, if available.
@@ -102,6 +126,19 @@ def main(config, config_name=None, statman=None):
 
     ### Callback functions, for recording internal data
 
+    sinks = {} # {filepath: BufferedColumnarSink}, for the current targetdir
+
+    def get_sink(filepath, columns, write_header):
+        if filepath not in sinks:
+            sinks[filepath] = diagsink.BufferedColumnarSink(filepath, columns, write_header, blocksize=config.get('diagnostic-buffer', 10000),
+                                                            format=config.get('diagnostic-format', 'csv'))
+        return sinks[filepath]
+
+    def close_sinks():
+        for sink in sinks.values():
+            sink.close()
+        sinks.clear()
+
     def splinepush_callback(region, year, application, get_predictors, model):
         if 'mortality' in config['module']:
             covars = ['climtas', 'loggdppc', 'logpopop']
@@ -112,18 +149,12 @@ def main(config, config_name=None, statman=None):
         if module[-4:] == '.yml':
             module = os.path.basename(module)[:-4]
 
-        filepath = os.path.join(targetdir, module + "-allpreds.csv")
-        if not os.path.exists(filepath):
+        def write_header(filepath):
             metacsv.to_header(filepath, attrs=OrderedDict([('oneline', "Yearly covariates by region and year"), ('version', module + config['outputdir'][config['outputdir'].rindex('-'):]), ('author', "James R."), ('contact', "jrising@berkeley.edu"), ('dependencies', [model + '.nc4'])]), variables=OrderedDict([('region', "Hierarchy region index"), ('year', "Year of the result"), ('model', "Specification (determined by the CSVV)"), ('climtas', "Average surface temperature [C]"), ('loggdppc', "Log GDP per capita [none]"), ('logpopop', "Log population-weighted population density [none]")]))
-            with open(filepath, 'a') as fp:
-                writer = csv.writer(fp)
-                writer.writerow(['region', 'year', 'model'] + covars)
-
-        with open(filepath, 'a') as fp:
-            writer = csv.writer(fp)
-            predictors = get_predictors(region)
 
-            writer.writerow([region, year, model] + [predictors[covar] for covar in covars])
+        sink = get_sink(os.path.join(targetdir, module + "-allpreds.csv"), ['region', 'year', 'model'] + covars, write_header)
+        predictors = get_predictors(region)
+        sink.append(region, year, model, *[predictors[covar] for covar in covars])
 
     def polypush_callback(region, year, application, get_predictors, model):
         if 'mortality' in config['module']:
@@ -140,8 +171,7 @@ def main(config, config_name=None, statman=None):
         if '.yml' in module:
             module = os.path.basename(module)[:-4]
 
-        filepath = os.path.join(targetdir, module + "-allpreds.csv")
-        if not os.path.exists(filepath):
+        def write_header(filepath):
             vardefs = yaml.safe_load(open(files.configpath("social/variables.yml"), 'r'))
             variables = [('region', "Hierarchy region index"), ('year', "Year of the result"), ('model', "Specification (determined by the CSVV)")]
             for covar in covars:
@@ -158,14 +188,10 @@ def main(config, config_name=None, statman=None):
                 version = module + config['outputdir']
 
             metacsv.to_header(filepath, attrs=OrderedDict([('oneline', "Yearly covariates by region and year"), ('version', version), ('author', "James R."), ('contact', "jrising@berkeley.edu"), ('dependencies', [model + '.nc4'])]), variables=OrderedDict(variables))
-            with open(filepath, 'a') as fp:
-                writer = csv.writer(fp)
-                writer.writerow(['region', 'year', 'model'] + covarnames)
 
-        with open(filepath, 'a') as fp:
-            writer = csv.writer(fp)
-            predictors = get_predictors(region)
-            writer.writerow([region, year, model] + [predictors[covar] for covar in covars])
+        sink = get_sink(os.path.join(targetdir, module + "-allpreds.csv"), ['region', 'year', 'model'] + covarnames, write_header)
+        predictors = get_predictors(region)
+        sink.append(region, year, model, *[predictors[covar] for covar in covars])
 
     def genericpush_callback(region, year, application, get_predictors, model, weatherbundle=None, economicmodel=None):
         if isinstance(year, np.ndarray):
@@ -173,16 +199,41 @@ def main(config, config_name=None, statman=None):
         if isinstance(region, np.ndarray):
             region = region.tolist()
         predictors = get_predictors(region)
-        for predictor in predictors:
-            diagnostic.record(region, year, predictor, predictors[predictor])
+        covars = sorted(predictors.keys())
+        values = [predictors[covar] for covar in covars]
         if economicmodel is not None:
-            diagnostic.record(region, year, 'population', economicmodel.get_population_year(region, year))
+            covars.append('population')
+            if isinstance(region, list) and getattr(economicmodel, 'region_index', None) and not isinstance(year, list):
+                populations = economicmodel.get_populations(year)
+                values.append([populations[economicmodel.region_index[rr]] if rr in economicmodel.region_index else np.nan for rr in region])
+            else:
+                values.append(economicmodel.get_population_year(region, year))
+
+        module = config['module']
+        if '.yml' in module:
+            module = os.path.basename(module)[:-4]
+
+        def write_header(filepath):
+            variables = [('region', "Hierarchy region index"), ('year', "Year of the result"), ('model', "Specification (determined by the CSVV)")]
+            variables += [(covar, "Predictor of the calculation") for covar in covars]
+            outputdir = config['outputdir']
+            version = module + (outputdir[outputdir.rindex('-'):] if '-' in outputdir else outputdir)
+            metacsv.to_header(filepath, attrs=OrderedDict([('oneline', "Yearly predictors by region and year"), ('version', version), ('author', "James R."), ('contact', "jrising@berkeley.edu"), ('dependencies', [model + '.nc4'])]), variables=OrderedDict(variables))
+
+        # Each model may have its own predictors, so each gets its own file
+        sink = get_sink(os.path.join(targetdir, module + "-allpreds-" + model + ".csv"), ['region', 'year', 'model'] + covars, write_header)
+        if isinstance(region, list):
+            years = year if isinstance(year, list) else [year] * len(region)
+            for ii in range(len(region)):
+                sink.append(region[ii], years[ii], model, *[value[ii] for value in values])
+        else:
+            sink.append(region, year, model, *values)
 
     # Select the iterator based on the mode
 
     mode_iterators = {'median': iterate_median, 'montecarlo': iterate_montecarlo, 'lincom': iterate_single, 'single': iterate_single,
                       'writesplines': iterate_single, 'writepolys': iterate_single, 'writecalcs': iterate_single,
-                      'profile': iterate_nosideeffects, 'diagnostic': iterate_nosideeffects,
+                      'profile': iterate_single, 'diagnostic': iterate_nosideeffects,
                       'parallelmc': iterate_parallel_maker('mcdriver'), 'testparallelpe': iterate_parallel_maker('pedriver')}
 
     assert 'mode' in config, "Configuration does not contain 'mode'."
@@ -191,6 +242,8 @@ def main(config, config_name=None, statman=None):
     # Load the module for setting up the calculation
 
     start = timing.process_time()
+    if config.get('telemetry', False):
+        telemetry.enable()
 
     mod, shortmodule = configs.get_config_module(config, config_name)
     mod.preload()
@@ -221,15 +274,21 @@ def main(config, config_name=None, statman=None):
         print(clim_scenario, clim_model)
         print(econ_scenario, econ_model)
 
-        if config['mode'] == 'profile':
-            pr = cProfile.Profile()
-            pr.enable()
-
         # Claim the directory
+        if jobs is not None and configs.is_generated(targetdir):
+            jobs.finish('done', "Generated outside of the queue")
+            continue
         if not configs.claim_targetdir(statman, targetdir, mode_iterators[config['mode']] == iterate_single, config):
+            if jobs is not None:
+                jobs.release() # held by another process; leave for other workers
             continue
 
         print(targetdir)
+        telemetry.begin(targetdir)
+
+        if config['mode'] == 'profile':
+            profiler = sampling.SamplingProfiler(config.get('profile-interval', .01))
+            profiler.start()
 
         # Load the pvals data, if available
         if not isinstance(pvals, pvalses.PlaceholderPvals):
@@ -243,28 +302,18 @@ def main(config, config_name=None, statman=None):
 
         # Produce the results!
 
-        if config['mode'] == 'writesplines':
-            mod.produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callback=splinepush_callback, diagnosefile=os.path.join(targetdir, shortmodule + "-allcalcs.csv"))
-        elif config['mode'] in ['writepolys', 'lincom']:
-            mod.produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callback=polypush_callback, diagnosefile=os.path.join(targetdir, shortmodule + "-allcalcs.csv"))
-        elif config['mode'] in ['writecalcs']:
-            mod.produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callback=lambda *args: genericpush_callback(*args, weatherbundle=weatherbundle, economicmodel=economicmodel), diagnosefile=os.path.join(targetdir, shortmodule + "-allcalcs.csv"))
-        elif config['mode'] == 'profile':
-            mod.produce(targetdir, weatherbundle, economicmodel, pvals, config, profile=True)
-            pr.disable()
-
-            statman.release(targetdir, "Profiled")
-
-            s = io.StringIO()
-            sortby = 'cumulative'
-            ps = pstats.Stats(pr, stream=s).sort_stats(sortby)
-            ps.print_stats()
-            #ps.print_callers(.5, 'sum')
-            print(s.getvalue())
-            exit()
-
-        else:
-            mod.produce(targetdir, weatherbundle, economicmodel, pvals, config)
+        try:
+            if config['mode'] == 'writesplines':
+                mod.produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callback=splinepush_callback, diagnosefile=os.path.join(targetdir, shortmodule + "-allcalcs.csv"))
+            elif config['mode'] in ['writepolys', 'lincom']:
+                mod.produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callback=polypush_callback, diagnosefile=os.path.join(targetdir, shortmodule + "-allcalcs.csv"))
+            elif config['mode'] in ['writecalcs']:
+                mod.produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callback=lambda *args: genericpush_callback(*args, weatherbundle=weatherbundle, economicmodel=economicmodel), diagnosefile=os.path.join(targetdir, shortmodule + "-allcalcs.csv"))
+            else:
+                mod.produce(targetdir, weatherbundle, economicmodel, pvals, config)
+        finally:
+            # Keep the rows collected so far, especially if the run failed
+            close_sinks()
 
         # Also produce historical climate results
         is_diagnostic = config['mode'] in ['writesplines', 'writepolys', 'writecalcs', 'diagnostic', 'parallelmc', 'testparallelpe']  # Workers have to produce themselves
@@ -272,10 +321,19 @@ def main(config, config_name=None, statman=None):
             (not is_diagnostic and config.get('do_historical', True))): # default do histclim
             # Generate historical baseline
             print("Historical")
-            historybundle = weather.HistoricalWeatherBundle.make_historical(weatherbundle, None if config['mode'] == 'median' else pvals['histclim'].get_seed('yearorder'))
+            historybundle = weather.HistoricalWeatherBundle.make_historical(weatherbundle, None if config['mode'] == 'median' else pvals['histclim'].get_seed('yearorder'), cache_years=config.get('histclim-cache-years'))
             pvals.lock()
 
-            mod.produce(targetdir, historybundle, economicmodel, pvals, config, suffix='-histclim')
+            try:
+                mod.produce(targetdir, historybundle, economicmodel, pvals, config, suffix='-histclim')
+            finally:
+                # Do not hold decoded past years (or their readers) beyond this target directory
+                weather.clear_pastyear_cache()
+
+        if config['mode'] == 'profile':
+            profiler.stop()
+            profiler.write_collapsed(os.path.join(targetdir, "profile.collapsed"))
+            profiler.print_summary()
 
         # Clean up
 
@@ -283,6 +341,9 @@ def main(config, config_name=None, statman=None):
             pvalses.make_pval_file(targetdir, pvals)
 
         statman.release(targetdir, "Generated")
+        if jobs is not None:
+            jobs.finish()
+        telemetry.finish()
 
         os.system("chmod g+rw " + os.path.join(targetdir, "*"))
 
@@ -0,0 +1,277 @@
+"""File-backed queue of generate target directories.
+
+Without a queue, every generate worker walks its own random
+permutation of all (batch, RCP, GCM, IAM, SSP) combinations and tries
+to claim each target directory, so late in a campaign most of a
+worker's time goes to failed claims. With `job-queue` set in the
+configuration, the combinations are instead recorded once in an
+SQLite database (in WAL mode, so status queries do not block
+workers), and each worker atomically leases the next pending job.
+
+Leases expire unless renewed by a heartbeat thread, so jobs from
+crashed workers are returned to the queue. Jobs that fail or expire
+are retried up to a maximum number of attempts.
+
+The state of a queue can be printed with
+`python -m generate.jobqueue <path>`.
+"""
+
+import os, time, socket, sqlite3, threading
+
+statuses = ['pending', 'leased', 'done', 'skipped', 'failed']
+
+class JobQueue(object):
+    """SQLite-backed queue of target directories, leased to workers.
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database, created if it does not exist.
+    lease_timeout : float
+        Seconds before a lease expires, if not renewed.
+    max_attempts : int
+        Number of leases a job gets before it is marked as failed.
+    worker : str, optional
+        Name of this worker; defaults to `<hostname>:<pid>`.
+    heartbeat : bool
+        If true, renew the current lease from a background thread.
+    """
+    def __init__(self, path, lease_timeout=30 * 60, max_attempts=3, worker=None, heartbeat=True):
+        assert lease_timeout > 0
+        assert max_attempts > 0
+
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        if worker is None:
+            worker = "%s:%d" % (socket.gethostname(), os.getpid())
+        self.worker = worker
+        self.use_heartbeat = heartbeat
+
+        self.current = None # jobid of the current lease
+        self.stop_heartbeat = None
+        self.excluded = set() # jobids this worker cannot run
+
+        conn = self.connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                jobid TEXT PRIMARY KEY, batch TEXT, clim_scenario TEXT, clim_model TEXT, econ_model TEXT, econ_scenario TEXT,
+                status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, worker TEXT,
+                lease_expires REAL, updated REAL, message TEXT)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        finally:
+            conn.close()
+
+    def connect(self):
+        """Open a new connection; each thread and operation uses its own."""
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def transaction(self, conn):
+        """Start a write transaction, so that reads and updates are atomic."""
+        conn.execute("BEGIN IMMEDIATE")
+
+    def populate(self, jobs):
+        """Add jobs to the queue; jobs already in the queue are left as they are.
+
+        Parameters
+        ----------
+        jobs : sequence of (batch, clim_scenario, clim_model, econ_model, econ_scenario)
+
+        Returns
+        -------
+        int
+            The number of new jobs.
+        """
+        now = time.time()
+        conn = self.connect()
+        try:
+            self.transaction(conn)
+            before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            conn.executemany("INSERT OR IGNORE INTO jobs (jobid, batch, clim_scenario, clim_model, econ_model, econ_scenario, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(get_jobid(*job), *job, now) for job in jobs])
+            after = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        return after - before
+
+    def lease(self):
+        """Lease the next pending job to this worker.
+
+        Expired leases are first returned to the queue (or marked as
+        failed, if out of attempts).
+
+        Returns
+        -------
+        tuple of (batch, clim_scenario, clim_model, econ_model, econ_scenario) or None
+            None if no jobs remain.
+        """
+        assert self.current is None, "Must finish %s before leasing another job." % self.current
+
+        now = time.time()
+        conn = self.connect()
+        try:
+            self.transaction(conn)
+            conn.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker = NULL, updated = ?, message = 'Lease expired' WHERE status = 'leased' AND lease_expires < ?",
+                         (self.max_attempts, now, now))
+            excluded = sorted(self.excluded)
+            row = conn.execute("SELECT jobid, batch, clim_scenario, clim_model, econ_model, econ_scenario FROM jobs WHERE status = 'pending' AND jobid NOT IN (%s) ORDER BY attempts, RANDOM() LIMIT 1" % ', '.join('?' * len(excluded)),
+                               excluded).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'leased', attempts = attempts + 1, worker = ?, lease_expires = ?, updated = ? WHERE jobid = ?",
+                             (self.worker, now + self.lease_timeout, now, row[0]))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+
+        self.current = row[0]
+        if self.use_heartbeat:
+            self.start_heartbeat()
+        return tuple(row[1:])
+
+    def heartbeat(self, jobid=None):
+        """Extend the lease on a job held by this worker.
+
+        Returns
+        -------
+        bool
+            False if the lease has expired or is no longer held by this worker.
+        """
+        if jobid is None:
+            jobid = self.current
+        if jobid is None:
+            return False
+
+        now = time.time()
+        conn = self.connect()
+        try:
+            cursor = conn.execute("UPDATE jobs SET lease_expires = ?, updated = ? WHERE jobid = ? AND status = 'leased' AND worker = ? AND lease_expires >= ?",
+                                  (now + self.lease_timeout, now, jobid, self.worker, now))
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def start_heartbeat(self):
+        jobid = self.current
+        stop = threading.Event()
+        def beat():
+            while not stop.wait(self.lease_timeout / 3):
+                try:
+                    if not self.heartbeat(jobid):
+                        print("WARNING: Lost the lease on %s." % jobid)
+                        return
+                except sqlite3.Error as ex:
+                    print("WARNING: Cannot renew the lease on %s: %s" % (jobid, ex))
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        self.stop_heartbeat = stop
+
+    def finish(self, status='done', message=None):
+        """Mark the current job as finished, with status `done` or `skipped`."""
+        assert status in ['done', 'skipped']
+        self.set_current_status(status, message)
+
+    def fail(self, message=None):
+        """Return the current job to the queue, or mark it as failed if out of attempts."""
+        self.set_current_status(None, message)
+
+    def release(self):
+        """Return the current job to the queue without counting the attempt, and exclude it from later leases by this worker."""
+        if self.current is None:
+            return
+        self.excluded.add(self.current)
+        self.set_current_status('pending', None)
+
+    def set_current_status(self, status, message):
+        if self.current is None:
+            return
+        if self.stop_heartbeat is not None:
+            self.stop_heartbeat.set()
+            self.stop_heartbeat = None
+
+        conn = self.connect()
+        try:
+            if status is None:
+                conn.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker = NULL, updated = ?, message = ? WHERE jobid = ? AND worker = ?",
+                             (self.max_attempts, time.time(), message, self.current, self.worker))
+            elif status == 'pending':
+                conn.execute("UPDATE jobs SET status = 'pending', attempts = attempts - 1, worker = NULL, updated = ? WHERE jobid = ? AND worker = ?",
+                             (time.time(), self.current, self.worker))
+            else:
+                conn.execute("UPDATE jobs SET status = ?, updated = ?, message = ? WHERE jobid = ? AND worker = ?",
+                             (status, time.time(), message, self.current, self.worker))
+        finally:
+            conn.close()
+        self.current = None
+
+    def summary(self):
+        """Return the number of jobs with each status, as {status: count}."""
+        conn = self.connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        finally:
+            conn.close()
+
+        return {status: counts.get(status, 0) for status in statuses}
+
+    def iterate(self, batches, exogenous):
+        """Yield leased jobs, with their exogenous models, until the queue is empty.
+
+        The queue is populated with the combination of each batch and
+        each entry in `exogenous`. A job that the caller neither
+        finishes, fails, nor releases before requesting the next one
+        (e.g., one it filters out) is released, and left for other
+        workers; if iteration stops during a job, the job is failed.
+
+        Parameters
+        ----------
+        batches : sequence of str
+            Batch directory names (e.g., `median` or `batch3`).
+        exogenous : iterable of (clim_scenario, clim_model, weatherbundle, econ_scenario, econ_model, economicmodel)
+            As produced by loadmodels.random_order.
+
+        Yields
+        ------
+        str, tuple
+            The batch and the `exogenous` entry for each leased job.
+        """
+        byname = {}
+        for exogen in exogenous:
+            byname[exogen[0], exogen[1], exogen[4], exogen[3]] = exogen
+
+        added = self.populate([(batch,) + names for batch in batches for names in byname])
+        print("Job queue: %d new jobs; %s" % (added, ', '.join("%d %s" % (count, status) for status, count in self.summary().items())))
+
+        while True:
+            job = self.lease()
+            if job is None:
+                break
+            if job[0] not in batches or job[1:] not in byname:
+                # Queue shared with workers configured for other batches or models
+                self.release()
+                continue
+
+            try:
+                yield job[0], byname[job[1:]]
+            except GeneratorExit:
+                self.fail("Stopped before completion")
+                raise
+            if self.current is not None:
+                self.release()
+
+def get_jobid(batch, clim_scenario, clim_model, econ_model, econ_scenario):
+    """Job identifier, matching the target directory relative to the output directory."""
+    return os.path.join(batch, clim_scenario, clim_model, econ_model, econ_scenario)
+
+if __name__ == '__main__':
+    import sys
+
+    queue = JobQueue(sys.argv[1], heartbeat=False)
+    for status, count in queue.summary().items():
+        print("%s: %d" % (status, count))
@@ -1,5 +1,5 @@
 import numpy as np
-from . import weather
+from . import weather, telemetry
 from adaptation import covariates
 
 do_econ_model_only = None
@@ -13,12 +13,14 @@ single_econ_scenario = 'SSP3'
 
 def single(bundle_iterator):
     allecons = []
-    for econ_model, econ_scenario, economicmodel in covariates.iterate_econmodels():
-        allecons.append((econ_scenario, econ_model, economicmodel))
+    with telemetry.stage('econ-load'):
+        for econ_model, econ_scenario, economicmodel in covariates.iterate_econmodels():
+            allecons.append((econ_scenario, econ_model, economicmodel))
 
     allclims = []
-    for clim_scenario, clim_model, weatherbundle in bundle_iterator:
-        allclims.append((clim_scenario, clim_model, weatherbundle))
+    with telemetry.stage('discovery'):
+        for clim_scenario, clim_model, weatherbundle in bundle_iterator:
+            allclims.append((clim_scenario, clim_model, weatherbundle))
 
     allexogenous = []
     for econ_scenario, econ_model, economicmodel in allecons:
@@ -44,12 +46,14 @@ def random_order(bundle_iterator, config=None):
 
     print("Loading models...")
     allecons = []
-    for econ_model, econ_scenario, economicmodel in covariates.iterate_econmodels(config):
-        allecons.append((econ_scenario, econ_model, economicmodel))
+    with telemetry.stage('econ-load'):
+        for econ_model, econ_scenario, economicmodel in covariates.iterate_econmodels(config):
+            allecons.append((econ_scenario, econ_model, economicmodel))
 
     allclims = []
-    for clim_scenario, clim_model, weatherbundle in bundle_iterator:
-        allclims.append((clim_scenario, clim_model, weatherbundle))
+    with telemetry.stage('discovery'):
+        for clim_scenario, clim_model, weatherbundle in bundle_iterator:
+            allclims.append((clim_scenario, clim_model, weatherbundle))
 
     allexogenous = []
     for econ_scenario, econ_model, economicmodel in allecons:
@@ -1,7 +1,77 @@
-import copy, threading
+import copy, threading, time, json
+from contextlib import contextmanager, nullcontext
 
 DEFAULT_VERBOSITY = 0
 
+class DriverTimings(object):
+    """Records the time that driver and worker threads spend in each stage.
+
+    Stages are `prepare` (the driver preparing a timestep), `action:<name>`
+    and `setup:<name>` (within preparation or an intermission),
+    `instant:<name>`, `intermission`, `wait` (a thread blocked on the
+    others), and `compute` (a worker's time between waits). If `path`
+    is given, each record is appended to it as a JSON line, and
+    `summarize` adds a final summary line.
+
+    Parameters
+    ----------
+    path : str, optional
+        JSON lines file to append records to.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.totals = {} # {(thread, stage): [count, seconds]}
+        self.start_time = time.perf_counter()
+        self.fp = open(path, 'a') if path else None
+
+    def record(self, who, stage, seconds, clock=None):
+        with self.lock:
+            total = self.totals.setdefault((who, stage), [0, 0.])
+            total[0] += 1
+            total[1] += seconds
+            if self.fp is not None:
+                self.fp.write(json.dumps({'thread': who, 'stage': stage, 'clock': clock, 'seconds': seconds}) + "\n")
+
+    @contextmanager
+    def timed(self, who, stage, clock=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(who, stage, time.perf_counter() - start, clock)
+
+    def pause(self, who, clock=None):
+        """Record the compute time since this thread last resumed, and return the time it starts waiting."""
+        now = time.perf_counter()
+        resumed = getattr(self.local, 'resumed', self.start_time) # workers start with the run
+        if resumed is not None:
+            self.record(who, 'compute', now - resumed, clock)
+        self.local.resumed = None
+        return now
+
+    def resume(self, who, start, clock=None):
+        """Record the time waited since `start`, from `pause`."""
+        now = time.perf_counter()
+        self.record(who, 'wait', now - start, clock)
+        self.local.resumed = now
+
+    def summarize(self):
+        """Print total time by thread and stage, and the share of the run spent in each."""
+        wall = time.perf_counter() - self.start_time
+        with self.lock:
+            print("Parallel timings over %.1f s:" % wall)
+            for who, stage in sorted(self.totals):
+                count, seconds = self.totals[(who, stage)]
+                print("  %-10s %-30s %7d x %9.4f s = %8.2f s (%.1f%%)" % (who, stage, count, seconds / count, seconds, 100 * seconds / wall))
+
+            if self.fp is not None:
+                summary = {"%s/%s" % key: {'count': value[0], 'seconds': value[1]} for key, value in self.totals.items()}
+                self.fp.write(json.dumps({'summary': summary, 'wall': wall}) + "\n")
+                self.fp.close()
+                self.fp = None
+
 class LockstepParallelDriver(object):
     """Facilitates a parallel programming structure with driver and worker threads.
 
@@ -16,46 +86,74 @@ class LockstepParallelDriver(object):
         Number of worker threads to create
     verbosity : int
         Level of verbosity, with 0 (silent), 1 (progress), 2+ (debugging)
+
+    Attributes
+    ----------
+    timings : DriverTimings or None
+        If set before `loop`, records the time spent in each stage, and
+        prints a summary at the end.
     """
     def __init__(self, nthreads, verbosity=DEFAULT_VERBOSITY):
         self.nthreads = nthreads
         self.verbosity = verbosity
         self.barrier = threading.Barrier(nthreads + 1, timeout=threading.TIMEOUT_MAX)
+        self.timings = None
+        self.driver_thread = None
 
         # Read-only, except update during intermission
         self.outputs = None
 
     def loop(self, start, *args, **kwargs):
-        self.outputs = self._prepare_next()
-        # Start all threads
-        for proc in range(self.nthreads):
-            thread = threading.Thread(None, start, args=tuple([proc, self] + list(args)), kwargs=kwargs)
-            thread.start()
+        self.driver_thread = threading.current_thread()
+        try:
+            with self._timed('prepare'):
+                self.outputs = self._prepare_next()
+            # Start all threads
+            for proc in range(self.nthreads):
+                thread = threading.Thread(None, start, name='worker%d' % proc, args=tuple([proc, self] + list(args)), kwargs=kwargs)
+                thread.start()
             
-        # Initiate lockstep process
-        while True:
-            next_outputs = self._prepare_next()
-            if not next_outputs:
-                break
+            # Initiate lockstep process
+            while True:
+                with self._timed('prepare'):
+                    next_outputs = self._prepare_next()
+                if not next_outputs:
+                    break
             
-            # Barrier 1 is when everyone is done processing
+                # Barrier 1 is when everyone is done processing
+                try:
+                    with self._timed('wait'):
+                        self.barrier.wait()
+                    with self._timed('intermission'):
+                        self._intermission_threadsafe(next_outputs)
+                    if self.verbosity > 0:
+                        print("----- LOCKSTEP -----")
+                    self.barrier.wait()
+                except threading.BrokenBarrierError:
+                    # This happens if aborted while in prepare_next
+                    break
+
             try:
                 self.barrier.wait()
-                self._intermission_threadsafe(next_outputs)
-                if self.verbosity > 0:
-                    print("----- LOCKSTEP -----")
+                self.outputs = None # report that there's no more data
                 self.barrier.wait()
             except threading.BrokenBarrierError:
                 # This happens if aborted while in prepare_next
-                break
-
-        try:
-            self.barrier.wait()
-            self.outputs = None # report that there's no more data
-            self.barrier.wait()
-        except threading.BrokenBarrierError:
-            # This happens if aborted while in prepare_next
-            pass
+                pass
+        finally:
+            # Write the summary even if a worker failure ends the run
+            if self.timings is not None:
+                self.timings.summarize()
+
+    def _timing_name(self):
+        thread = threading.current_thread()
+        return 'driver' if thread is self.driver_thread else thread.name
+
+    def _timed(self, stage):
+        """Context manager recording the time of a driver stage, if timings are enabled."""
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.timed(self._timing_name(), stage, getattr(self, 'clock', None))
 
     def _intermission_threadsafe(self, next_outputs):
         # Everyone else immediately waits at barrier 2 for the data to be copied over
@@ -65,8 +163,18 @@ class LockstepParallelDriver(object):
         raise NotImplementedError
 
     def lockstep_pause(self):
-        self.barrier.wait()
-        self.barrier.wait()
+        if self.timings is None or threading.current_thread() is self.driver_thread:
+            self.barrier.wait()
+            self.barrier.wait()
+            return
+
+        who = self._timing_name()
+        start = self.timings.pause(who, getattr(self, 'clock', None))
+        try:
+            self.barrier.wait()
+            self.barrier.wait()
+        finally:
+            self.timings.resume(who, start, getattr(self, 'clock', None))
 
 class SharingLockstepParallelDriver(LockstepParallelDriver):
     """Lockstep system that introduces a Driver-level lock.
@@ -76,6 +184,7 @@ class SharingLockstepParallelDriver(LockstepParallelDriver):
     def __init__(self, nthreads, verbosity=DEFAULT_VERBOSITY):
         super().__init__(nthreads, verbosity=verbosity)
         self.lock = threading.Lock() # for accessing driver-level attributes
+        self.writelock = threading.Lock() # for workers writing result files
         self.worker_exception = None
         self.workers_failed = 0
 
@@ -179,17 +288,21 @@ class FoldedActionsLockstepParallelDriver(SharingLockstepParallelDriver):
         while self.new_action:
             action, action_args, action_kwargs = self.new_action
             if self.is_new_action_instant:
-                self.instant_result = getattr(self, 'instant_' + action)(*action_args, **action_kwargs)
+                with self._timed('instant:' + action):
+                    self.instant_result = getattr(self, 'instant_' + action)(*action_args, **action_kwargs)
                 self.new_action = None
                 self.lockstep_pause()
                 continue
             
             # Setup the action
-            getattr(self, 'setup_' + action)(*action_args, **action_kwargs)
+            with self._timed('setup:' + action):
+                getattr(self, 'setup_' + action)(*action_args, **action_kwargs)
             # Perform the new action for both curr step and next step
-            curr_newouts = getattr(self, action)(self.outputs, *action_args, **action_kwargs)
+            with self._timed('action:' + action):
+                curr_newouts = getattr(self, action)(self.outputs, *action_args, **action_kwargs)
             self.outputs.update(curr_newouts)
-            next_newouts = getattr(self, action)(next_outputs, *action_args, **action_kwargs)
+            with self._timed('action:' + action):
+                next_newouts = getattr(self, action)(next_outputs, *action_args, **action_kwargs)
             next_outputs.update(next_newouts)
             self.action_list.append(self.new_action)
             self.new_action = None
@@ -214,7 +327,8 @@ class FoldedActionsLockstepParallelDriver(SharingLockstepParallelDriver):
         self.drop_after_index = None
         for ii in range(len(self.action_list)):
             action, action_args, action_kwargs = self.action_list[ii]
-            newouts = getattr(self, action)(outputs, *action_args, **action_kwargs)
+            with self._timed('action:' + action):
+                newouts = getattr(self, action)(outputs, *action_args, **action_kwargs)
             if not newouts:
                 self.drop_after_index = ii
                 break
@@ -270,3 +384,295 @@ class FoldedActionsLockstepParallelDriver(SharingLockstepParallelDriver):
             self.barrier.abort()
         except threading.BrokenBarrierError:
             pass
+
+class PipelinedFoldedActionsParallelDriver(FoldedActionsLockstepParallelDriver):
+    """Folded-actions system where the driver prepares several timesteps ahead.
+
+    Instead of holding all threads in lockstep, the driver keeps a
+    timeline of prepared timesteps. Each worker keeps its own clock
+    and consumes these at its own pace, and the driver only waits
+    when it is `depth` timesteps ahead of the slowest worker.
+
+    Actions are requested and registered as under
+    FoldedActionsLockstepParallelDriver, and all workers must still
+    request the same actions at the same timesteps. A new action is
+    performed for the timestep of the first worker to request it and
+    for every timestep already prepared after it, so workers that
+    reach those timesteps later find it already in their action
+    list. Instant actions wait until every worker still in the
+    pipeline has requested them.
+
+    Workers with nothing to do call `lockstep_pause`, which removes
+    them from the pipeline until the driver finishes. A worker that
+    raises an exception also leaves the pipeline; the exception is
+    raised by `loop` if all workers fail.
+
+    Parameters
+    ----------
+    depth : int
+        Maximum number of timesteps prepared beyond the current
+        timestep of the slowest worker.
+    """
+    def __init__(self, *args, depth=2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.depth = depth
+        self.condition = threading.Condition(self.lock)
+        self.workerlocal = threading.local() # holds `proc` for each worker thread
+
+        # Updated with lock
+        self.timeline = {} # {clock: outputs}
+        self.prepared_clock = 0
+        self.action_spans = [] # list of [(name, args, kwargs), start clock, end clock or None]
+        self.worker_clocks = {} # {proc: clock} for workers still in the pipeline
+        self.new_action_clock = None
+        self.instant_request = None
+        self.instant_waiting = 0
+        self.instant_generation = 0
+        self.finished = False
+
+    def loop(self, start, *args, **kwargs):
+        self.worker_exception = None
+        self.workers_failed = 0
+        self.finished = False
+        self.worker_clocks = {proc: 1 for proc in range(self.nthreads)}
+        self.driver_thread = threading.current_thread()
+
+        try:
+            self._prepare_timestep()
+            for proc in range(self.nthreads):
+                thread = threading.Thread(None, self._pipelined_worker, name='worker%d' % proc, args=tuple([proc, start] + list(args)), kwargs=kwargs)
+                thread.start()
+
+            while True:
+                with self.condition:
+                    if not self._driver_has_work():
+                        with self._timed('wait'):
+                            while not self._driver_has_work():
+                                self.condition.wait()
+                    if not self.worker_clocks:
+                        break
+                    do_new_action = self.new_action is not None
+                    do_instant = self.instant_request is not None and self.instant_waiting == len(self.worker_clocks)
+
+                if do_new_action:
+                    self._fold_new_action()
+                elif do_instant:
+                    self._perform_instant()
+                else:
+                    self._prepare_timestep()
+        finally:
+            # Release any waiting workers
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+            if self.timings is not None:
+                self.timings.summarize()
+
+        if self.workers_failed == self.nthreads:
+            print("All threads have failed.")
+            raise self.worker_exception
+
+    def _pipelined_worker(self, proc, start, *args, **kwargs):
+        self.workerlocal.proc = proc
+        try:
+            start(proc, self, *args, **kwargs)
+        except Exception as ex:
+            # Report to the driver and leave the pipeline, without ending the other workers
+            with self.condition:
+                if self.worker_exception is None:
+                    self.worker_exception = ex
+                self.workers_failed += 1
+                self._remove_worker()
+            return
+
+        self.end_worker()
+
+    def _driver_has_work(self):
+        if not self.worker_clocks or self.new_action is not None:
+            return True
+        if self.instant_request is not None and self.instant_waiting == len(self.worker_clocks):
+            return True
+        return not self.complete and self.clock < min(self.worker_clocks.values()) + self.depth
+
+    def _prepare_timestep(self):
+        with self._timed('prepare'):
+            outputs = self._prepare_next()
+        if not outputs:
+            return # a worker has completed
+
+        with self.condition:
+            self.timeline[self.clock] = outputs
+            self.prepared_clock = self.clock
+            if self.drop_after_index is not None:
+                for span in self._open_spans()[self.drop_after_index:]:
+                    span[2] = self.clock
+                self.action_list = self.action_list[:self.drop_after_index]
+                self.drop_after_index = None
+            if self.verbosity > 0:
+                print("----- PREPARED %d -----" % self.clock)
+            self.condition.notify_all()
+
+    def _fold_new_action(self):
+        """Perform a newly requested action for all prepared timesteps from the request on."""
+        action, action_args, action_kwargs = self.new_action
+        with self._timed('setup:' + action):
+            getattr(self, 'setup_' + action)(*action_args, **action_kwargs)
+
+        span = [self.new_action, self.new_action_clock, None]
+        for clock in range(self.new_action_clock, self.prepared_clock + 1):
+            with self.condition:
+                # Actions after an action that ends are dropped with it
+                ended = clock > span[1] and any(other[2] == clock for other in self.action_spans)
+            if ended:
+                span[2] = clock
+                break
+
+            with self._timed('action:' + action):
+                newouts = getattr(self, action)(self.timeline[clock], *action_args, **action_kwargs)
+            if not newouts:
+                span[2] = clock
+                break
+            self.timeline[clock].update(newouts)
+
+        with self.condition:
+            self.action_spans.append(span)
+            if span[2] is None:
+                self.action_list.append(self.new_action)
+            self.new_action = None
+            self.new_action_clock = None
+            self.condition.notify_all()
+
+    def _perform_instant(self):
+        action, action_args, action_kwargs = self.instant_request
+        with self._timed('instant:' + action):
+            result = getattr(self, 'instant_' + action)(*action_args, **action_kwargs)
+
+        with self.condition:
+            self.instant_result = result
+            self.instant_request = None
+            self.instant_waiting = 0
+            self.instant_generation += 1
+            self.condition.notify_all()
+
+    def _open_spans(self):
+        return [span for span in self.action_spans if span[2] is None]
+
+    def _actions_at(self, clock):
+        return [span[0] for span in self.action_spans if span[1] <= clock and (span[2] is None or clock < span[2])]
+
+    def _wait_prepared(self):
+        """Wait until this worker's timestep is prepared, and return its clock. Call with lock."""
+        clock = self.worker_clocks[self.workerlocal.proc]
+        self._worker_wait(lambda: self.prepared_clock >= clock or self.complete or self.finished, clock)
+        if self.prepared_clock < clock:
+            raise threading.BrokenBarrierError # no more timesteps will be prepared
+        return clock
+
+    def _worker_wait(self, predicate, clock=None):
+        """Wait until `predicate()` is true, recording the wait if timings are enabled. Call with lock."""
+        if predicate():
+            return
+        if self.timings is None:
+            while not predicate():
+                self.condition.wait()
+            return
+
+        who = self._timing_name()
+        start = self.timings.pause(who, clock)
+        while not predicate():
+            self.condition.wait()
+        self.timings.resume(who, start, clock)
+
+    def _remove_worker(self):
+        """Take this worker out of the pipeline. Call with lock."""
+        self.worker_clocks.pop(self.workerlocal.proc, None)
+        self._forget_passed()
+        self.condition.notify_all()
+
+    def _forget_passed(self):
+        """Drop timesteps and actions that all workers have passed. Call with lock."""
+        if not self.worker_clocks:
+            return
+        minclock = min(self.worker_clocks.values())
+        for clock in [clock for clock in self.timeline if clock < minclock]:
+            del self.timeline[clock]
+        self.action_spans = [span for span in self.action_spans if span[2] is None or span[2] >= minclock]
+
+    def instant_action(self, action, *args, **kwargs):
+        with self.condition:
+            if self.instant_request:
+                assert self.instant_request == (action, args, kwargs), "Workers are requesting different instant actions."
+            else:
+                self.instant_request = (action, args, kwargs)
+                if self.verbosity > 1:
+                    print("Instant " + str(self.instant_request))
+            self.instant_waiting += 1
+            generation = self.instant_generation
+            self.condition.notify_all()
+
+            self._worker_wait(lambda: self.instant_generation != generation or self.finished)
+            if self.instant_generation == generation:
+                raise threading.BrokenBarrierError
+            return self.instant_result
+
+    def request_action(self, local, action, *args, **kwargs):
+        if 'action_index' not in local.__dict__:
+            local.action_index = 0
+            local.ending_acknowledge = -1
+        request = (action, args, kwargs)
+
+        with self.condition:
+            clock = self._wait_prepared()
+            actions = self._actions_at(clock)
+            if local.action_index < len(actions) and actions[local.action_index] == request:
+                # already in the list and being performed
+                local.action_index += 1
+                return self.timeline[clock]
+
+            if local.action_index == len(actions) and local.ending_acknowledge < clock and any(span[0] == request and span[2] == clock for span in self.action_spans):
+                local.ending_acknowledge = clock
+                return self.timeline[clock]
+
+            assert local.action_index == len(actions), "Actions cannot be added mid-sequence."
+            if self.new_action:
+                assert self.new_action == request and self.new_action_clock == clock, "Workers are requesting different driver actions."
+            else:
+                self.new_action = request
+                self.new_action_clock = clock
+                if self.verbosity > 1:
+                    print("Request %s at %d" % (str(self.new_action), clock))
+                self.condition.notify_all()
+
+            self._worker_wait(lambda: self.new_action != request or self.new_action_clock != clock or self.finished, clock)
+            if self.new_action == request:
+                raise threading.BrokenBarrierError
+
+            local.action_index += 1
+            return self.timeline[clock]
+
+    def end_timestep(self, local):
+        with self.condition:
+            self.worker_clocks[self.workerlocal.proc] += 1
+            self._forget_passed()
+            self.condition.notify_all()
+        local.action_index = 0
+
+    def lockstep_pause(self):
+        """Leave the pipeline, for a worker with nothing to do, until the driver finishes.
+
+        As when a lockstep driver ends, raises BrokenBarrierError if
+        called again afterwards.
+        """
+        with self.condition:
+            if self.workerlocal.proc not in self.worker_clocks:
+                raise threading.BrokenBarrierError
+            self._remove_worker()
+            while not self.finished:
+                self.condition.wait()
+
+    def end_worker(self):
+        if self.timings is not None:
+            self.timings.pause(self._timing_name()) # record the final compute time
+        with self.condition:
+            self.complete = True
+            self._remove_worker()
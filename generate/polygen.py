@@ -0,0 +1,83 @@
+"""Consolidated polynomial weather generation tool.
+
+Polynomial specifications use a variable (e.g., `tas`) and its
+higher powers (`tas-poly-2`, ..., `tas-poly-k`), each stored in its
+own directory under `climate/BCSD/hierid/popwt/daily/`. This tool
+copies all of these into a single file per year, under
+`<variable>-polys/<scenario>/<model>/<year>/<version>.nc4`, so that
+`climate.discover` can read all powers with one open and one
+contiguous read per year.
+
+Call as:
+  python -m generate.polygen VARIABLE MAXPOWER
+e.g.,
+  python -m generate.polygen tas 4
+"""
+
+import sys, os
+from impactlab_tools.utils import files
+from climate import netcdfs
+from climate.reader import YearlySplitWeatherReader
+
+basedir = 'climate/BCSD/hierid/popwt/daily'
+
+def get_power_names(variable, maxpower):
+    """Return the variable names for powers 1 through `maxpower`."""
+    return [variable] + ["%s-poly-%d" % (variable, power) for power in range(2, maxpower + 1)]
+
+def consolidate(variable, maxpower, only_missing=True):
+    """Write consolidated yearly files for all scenarios, models, and years of `variable`.
+
+    Parameters
+    ----------
+    variable : str
+        Name of the base variable, e.g. ``"tas"``.
+    maxpower : int
+        Highest power to include.
+    only_missing : bool, optional
+        Skip years for which a consolidated file already exists.
+    """
+    names = get_power_names(variable, maxpower)
+    sourcedir = files.sharedpath(os.path.join(basedir, variable))
+    targetdir = files.sharedpath(os.path.join(basedir, variable + '-polys'))
+
+    for scenario in sorted(os.listdir(sourcedir)):
+        if scenario != 'historical' and scenario[0:3] != 'rcp':
+            continue
+        for model in sorted(os.listdir(os.path.join(sourcedir, scenario))):
+            for year in sorted(os.listdir(os.path.join(sourcedir, scenario, model))):
+                if not year.isdigit():
+                    continue
+                consolidate_year(names, scenario, model, int(year), targetdir, only_missing)
+
+def consolidate_year(names, scenario, model, year, targetdir, only_missing=True):
+    """Combine the files for each name in a single year into one consolidated file."""
+    sourcepaths = []
+    for name in names:
+        template = files.sharedpath(os.path.join(basedir, name, scenario, model, '%d', '%v.nc4'))
+        sourcepath = YearlySplitWeatherReader.find_templated_given(template, year)
+        if not os.path.exists(sourcepath):
+            print("Missing %s; skipping %s %s %d" % (name, scenario, model, year))
+            return
+        sourcepaths.append(sourcepath)
+
+    # The consolidated file takes the version of the base variable
+    version = os.path.splitext(os.path.basename(sourcepaths[0]))[0]
+    targetpath = os.path.join(targetdir, scenario, model, str(year), version + '.nc4')
+    if only_missing and os.path.exists(targetpath):
+        return
+
+    print(targetpath)
+    dses = [netcdfs.load_netcdf(sourcepath) for sourcepath in sourcepaths]
+    combined = dses[0]
+    for name, ds in zip(names[1:], dses[1:]):
+        combined[name] = ds[name]
+    combined.attrs['version'] = version
+    combined.attrs['source'] = ', '.join(sourcepaths)
+
+    os.makedirs(os.path.dirname(targetpath), exist_ok=True)
+    encoding = {name: {'contiguous': True} for name in names}
+    combined.to_netcdf(targetpath, format='NETCDF4', encoding=encoding)
+
+if __name__ == '__main__':
+    consolidate(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,107 @@
+"""Sampling profiler for generate runs (`mode: profile`).
+
+A background thread records the stack of every other thread at a
+fixed interval, so profiled code runs at full speed and the run
+completes normally. Each sample is attributed to a pipeline stage
+(matching the stages in generate/telemetry.py), by the innermost frame
+on the stack that belongs to a known stage function, and the counts
+are written in the collapsed-stack format read by flame graph tools:
+
+    stage;outer_function (file:line);...;inner_function (file:line) count
+"""
+
+import os, sys, threading
+
+# (path suffix, function name or None for any function) -> stage; the innermost match wins
+STAGE_FRAMES = [('generate/weather.py', 'load', 'discovery'),
+                ('climate/manifest.py', None, 'discovery'),
+                ('adaptation/econmodel.py', None, 'econ-load'),
+                ('adaptation/csvvfile.py', 'read', 'csvv-read'),
+                ('generate/caller.py', 'call_prepare_interp', 'covariate-baseline'),
+                ('generate/effectset.py', 'simultaneous_application', 'apply'),
+                ('generate/weather.py', 'yearbundles', 'weather-read'),
+                ('adaptation/curvegen.py', 'get_next_curve', 'curve-evaluation'),
+                ('adaptation/covariates.py', 'offer_update', 'covariate-update'),
+                ('generate/effectset.py', 'write_ncdf', 'write')]
+
+def get_stage(code):
+    """Return the stage for a code object, or None if it is not a stage function."""
+    filename = code.co_filename.replace(os.sep, '/')
+    for suffix, name, stage in STAGE_FRAMES:
+        if filename.endswith(suffix) and (name is None or code.co_name == name):
+            return stage
+    return None
+
+class SamplingProfiler(object):
+    """Collects stack samples from all threads in a background thread.
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between samples.
+    """
+    def __init__(self, interval=.01):
+        self.interval = interval
+        self.counts = {} # {collapsed stack: samples}
+        self.stagecache = {} # {code: stage or None}
+        self.samples = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        assert self.thread is None, "Profiler already started."
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        myident = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != myident:
+                    self.sample(frame)
+
+    def sample(self, frame):
+        """Record the stack ending at `frame`."""
+        names = []
+        stage = None
+        while frame is not None:
+            code = frame.f_code
+            if stage is None:
+                if code not in self.stagecache:
+                    self.stagecache[code] = get_stage(code)
+                stage = self.stagecache[code]
+            names.append("%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+            frame = frame.f_back
+
+        names.append(stage or 'other')
+        key = ';'.join(reversed(names))
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.samples += 1
+
+    def get_stage_counts(self):
+        """Return {stage: samples}."""
+        stages = {}
+        for key, count in list(self.counts.items()):
+            stage = key.split(';', 1)[0]
+            stages[stage] = stages.get(stage, 0) + count
+        return stages
+
+    def write_collapsed(self, filepath):
+        """Write the samples in collapsed-stack format."""
+        with open(filepath, 'w') as fp:
+            for key, count in sorted(self.counts.items()):
+                fp.write("%s %d\n" % (key, count))
+
+    def print_summary(self):
+        stages = self.get_stage_counts()
+        print("Profile samples by stage (%d total, every %g s):" % (self.samples, self.interval))
+        for stage, count in sorted(stages.items(), key=lambda item: -item[1]):
+            print("  %s: %d (%.1f%%)" % (stage, count, 100. * count / max(1, self.samples)))
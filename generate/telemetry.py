@@ -0,0 +1,143 @@
+"""Stage-level performance telemetry for generate runs.
+
+When enabled (with the `telemetry` configuration option), the wall
+time, CPU time, and peak resident memory of each stage of a run are
+accumulated by stage, basename, and farmer, and written as
+`telemetry.json` in each target directory. Stages recorded before a
+target directory is begun (e.g., discovery and loading the economic
+models) are included under `process` in every target directory's
+file.
+
+Stages may nest (e.g., `covariate-update` occurs within `apply`), so
+their times should not be summed. CPU time is for the calling thread,
+so it is also meaningful for parallel workers.
+
+When telemetry is not enabled, stages return immediately; frequent
+stages check the module-level `enabled` flag before timing anything.
+"""
+
+import os, json, time, resource, threading
+from contextlib import contextmanager
+
+enabled = False # Set by `enable`
+local = threading.local() # `current` (StageTelemetry), `targetdir`, and `labels` for each thread
+
+class StageTelemetry(object):
+    """Totals of wall time, CPU time, and peak RSS by stage and labels."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {} # {(stage, basename, farmer): [count, wall, cpu, peak RSS]}
+
+    def add(self, stage, labels, wall, cpu, maxrss=None):
+        key = (stage, labels.get('basename'), labels.get('farmer'))
+        with self.lock:
+            total = self.totals.get(key)
+            if total is None:
+                total = self.totals[key] = [0, 0., 0., None]
+            total[0] += 1
+            total[1] += wall
+            total[2] += cpu
+            if maxrss is not None and (total[3] is None or maxrss > total[3]):
+                total[3] = maxrss
+
+    def get_records(self):
+        """Return a list of dicts, one per stage and labels."""
+        with self.lock:
+            return [dict(stage=key[0], basename=key[1], farmer=key[2], count=total[0], wall=total[1],
+                         cpu=total[2], peak_rss_mb=total[3])
+                    for key, total in sorted(self.totals.items(), key=lambda item: tuple(str(part) for part in item[0]))]
+
+process = StageTelemetry() # Stages outside of any target directory
+
+def enable():
+    global enabled
+    enabled = True
+
+def get_maxrss():
+    """Return the peak resident memory of this process, in MB."""
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+def begin(targetdir):
+    """Start accumulating stages for `targetdir` in this thread."""
+    if not enabled:
+        return
+    local.current = StageTelemetry()
+    local.targetdir = targetdir
+
+def finish():
+    """Write the stages for the current target directory, and stop accumulating them."""
+    current = getattr(local, 'current', None)
+    if current is None:
+        return
+    local.current = None
+
+    if not os.path.isdir(local.targetdir):
+        return
+    with open(os.path.join(local.targetdir, 'telemetry.json'), 'w') as fp:
+        json.dump({'stages': current.get_records(), 'process': process.get_records(),
+                   'peak_rss_mb': get_maxrss()}, fp, indent=1)
+
+def detach():
+    """Stop accumulating stages in this thread, returning them for `resume` in another thread."""
+    current = getattr(local, 'current', None)
+    local.current = None
+    return current
+
+def resume(current, targetdir):
+    """Continue accumulating stages returned by `detach`, for `targetdir`, in this thread."""
+    if current is None:
+        return
+    local.current = current
+    local.targetdir = targetdir
+
+def get_current():
+    current = getattr(local, 'current', None)
+    return process if current is None else current
+
+@contextmanager
+def labels(**kwargs):
+    """Attribute stages in this block to the given `basename` and `farmer`."""
+    oldlabels = getattr(local, 'labels', {})
+    local.labels = dict(oldlabels, **kwargs)
+    try:
+        yield
+    finally:
+        local.labels = oldlabels
+
+@contextmanager
+def stage(name):
+    """Record the time and peak memory of a block as stage `name`."""
+    if not enabled:
+        yield
+        return
+
+    started = start()
+    try:
+        yield
+    finally:
+        stop(name, started, maxrss=get_maxrss())
+
+def start():
+    """Start timing a frequent stage, without the overhead of a context manager."""
+    return time.perf_counter(), time.thread_time()
+
+def stop(name, started, maxrss=None):
+    """Record a stage begun at `started`, from `start`."""
+    get_current().add(name, getattr(local, 'labels', {}), time.perf_counter() - started[0], time.thread_time() - started[1], maxrss)
+
+def timed_iterator(name, iterator):
+    """Return `iterator`, recording the time to produce each item as stage `name`."""
+    if not enabled:
+        return iterator
+    return _timed_iterator(name, iter(iterator))
+
+def _timed_iterator(name, iterator):
+    while True:
+        started = start()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        stop(name, started, maxrss=get_maxrss())
+        yield item
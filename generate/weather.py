@@ -1,5 +1,7 @@
-import os, re, csv, traceback
+import os, re, csv, traceback, threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from collections import OrderedDict
 import numpy as np
 import xarray as xr
 from netCDF4 import Dataset
@@ -7,6 +9,7 @@ from impactlab_tools.utils import files
 from openest.generate import fast_dataset
 import helpers.header as headre
 from climate import netcdfs
+from . import telemetry
 from datastore import irregions
 
 class WeatherTransformer(object):
@@ -26,7 +29,18 @@ def iterate_bundles(*iterators_readers, **config):
         transformer = WeatherTransformer()
 
     print("Loading weather...")
-        
+
+    bundles = iterate_unloaded_bundles(transformer, iterators_readers, config)
+    if config.get('bundle-init-threads', 1) > 1:
+        # Load all bundles up front, with a pool of threads
+        bundles = list(bundles)
+        preload_bundles([weatherbundle for scenario, model, weatherbundle in bundles], config['bundle-init-threads'])
+
+    for scenario, model, weatherbundle in bundles:
+        yield scenario, model, weatherbundle
+
+def iterate_unloaded_bundles(transformer, iterators_readers, config):
+    """Yield lazily-loaded bundles for each RCP and model."""
     if len(iterators_readers) == 1:
         for scenario, model, pastreader, futurereader in iterators_readers[0]:
             if 'gcm' in config and config['gcm'] != model:
@@ -51,6 +65,12 @@ def iterate_bundles(*iterators_readers, **config):
         weatherbundle = PastFutureWeatherBundle(scenmodels[(scenario, model)], scenario, model, transformer=transformer)
         yield scenario, model, weatherbundle
 
+def preload_bundles(weatherbundles, threads):
+    """Construct the readers and load the metadata of lazily-initialized bundles concurrently."""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # list() to raise any exceptions here
+        list(executor.map(lambda weatherbundle: weatherbundle.load(), weatherbundles))
+
 def iterate_amorphous_bundles(iterators_reader_dict):
     scenmodels = {} # {(scenario, model): [(pastreader, futurereader), ...]}
     for name in iterators_reader_dict:
@@ -231,9 +251,22 @@ class SingleWeatherBundle(ReaderWeatherBundle, DailyWeatherBundle):
         return self.transformer.get_years(self.reader.get_years())
 
 class PastFutureWeatherBundle(DailyWeatherBundle):
-    def __init__(self, pastfuturereaders, scenario, model, hierarchy='hierarchy.csv', transformer=WeatherTransformer()):
+    """WeatherBundle joining historical and future readers for each variable.
+
+    The readers (see climate.reader.LazyWeatherReader), reader
+    metadata, regions, and the first future year are loaded on first
+    use (or by `load`), so constructing bundles for every scenario and
+    model does not touch the filesystem. Pass `lazy=False` to load
+    them immediately.
+    """
+    lazy_attributes = ('futureyear1', 'version', 'units', 'regions', 'dependencies')
+
+    def __init__(self, pastfuturereaders, scenario, model, hierarchy='hierarchy.csv', transformer=WeatherTransformer(), lazy=True):
         super(PastFutureWeatherBundle, self).__init__(scenario, model, hierarchy, transformer)
         self.pastfuturereaders = pastfuturereaders
+        self.loaded = False
+        self.loadlock = threading.Lock()
+        del self.dependencies # set by load()
 
         self.variable2readers = {}
         for pastfuturereader in pastfuturereaders:
@@ -244,12 +277,36 @@ class PastFutureWeatherBundle(DailyWeatherBundle):
                 else:
                     self.variable2readers[variable] = None # ambiguous-- don't provide shortcut
                     print("WARNING: Multiple weather readers provide " + variable)
-                    
-        onefuturereader = self.pastfuturereaders[0][1]
-        self.futureyear1 = min(onefuturereader.get_years())
 
-        self.load_readermeta(onefuturereader)
-        self.load_regions(onefuturereader)
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """Read the years, metadata, and regions of the future reader, if not yet loaded."""
+        with self.loadlock:
+            if self.loaded:
+                return
+
+            with telemetry.stage('discovery'):
+                # Construct any readers deferred by the discover iterators
+                for pastreader, futurereader in self.pastfuturereaders:
+                    pastreader.load()
+                    futurereader.load()
+
+                self.dependencies = []
+                onefuturereader = self.pastfuturereaders[0][1]
+                self.futureyear1 = min(onefuturereader.get_years())
+
+                self.load_readermeta(onefuturereader)
+                self.load_regions(onefuturereader)
+                self.loaded = True
+
+    def __getattr__(self, name):
+        # Only called for attributes not yet set
+        if name in PastFutureWeatherBundle.lazy_attributes and not self.__dict__.get('loaded', True):
+            self.load()
+            return getattr(self, name)
+        raise AttributeError("%r object has no attribute %r" % (self.__class__.__name__, name))
 
     def is_historical(self):
         return False
@@ -333,6 +390,15 @@ class PastFutureWeatherBundle(DailyWeatherBundle):
 
         return alldims
 
+# Decoded past years, shared across HistoricalWeatherBundles
+pastyear_cache = OrderedDict() # {(reader, pastyear): ds}, in LRU order
+pastyear_cache_lock = threading.Lock()
+
+def clear_pastyear_cache():
+    """Drop all decoded past years held for HistoricalWeatherBundles."""
+    with pastyear_cache_lock:
+        pastyear_cache.clear()
+
 class HistoricalWeatherBundle(DailyWeatherBundle):
     """WeatherBundle composed of randomly or sequentially drawn historical weather
 
@@ -357,8 +423,15 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
         Transformer to apply to the bundled weather Datasets.
     pastyear_end : int or None
         Latest year to use when constructing historical baseline.
+    cache_years : int or None, optional
+        Maximum number of decoded past years to keep in memory per reader,
+        so that resampled years are not re-read from disk. If `None`, all
+        years in the historical pool are kept; 0 disables the cache. The
+        cache is shared (see `pastyear_cache`) by all bundles reading
+        from the same readers, such as those from `make_historical`,
+        and is held until `clear_pastyear_cache` is called.
     """
-    def __init__(self, pastreaders, futureyear_end, seed, scenario, model, hierarchy='hierarchy.csv', transformer=WeatherTransformer(), pastyear_end=None):
+    def __init__(self, pastreaders, futureyear_end, seed, scenario, model, hierarchy='hierarchy.csv', transformer=WeatherTransformer(), pastyear_end=None, cache_years=None):
         super(HistoricalWeatherBundle, self).__init__(scenario, model, hierarchy, transformer)
         self.pastreaders = pastreaders
 
@@ -395,12 +468,47 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
                 replace=True,
             )
 
+        if cache_years is None:
+            cache_years = int(self.pastyear_end - self.pastyear_start + 1)
+        self.cache_years = cache_years
+
         self.load_readermeta(onereader)
         self.load_regions(onereader)
 
     def is_historical(self):
         return True
 
+    def read_pastyear(self, readerii, pastyear):
+        """Return the decoded Dataset for a past year, as read by a reader
+
+        Datasets are stored before `update_year`, and must not be
+        modified by the caller.
+
+        Parameters
+        ----------
+        readerii : int
+            Index of the reader in `pastreaders`.
+        pastyear : int
+
+        Returns
+        -------
+        xr.Dataset
+        """
+        reader = self.pastreaders[readerii]
+        key = (reader, pastyear)
+        with pastyear_cache_lock:
+            if key in pastyear_cache:
+                pastyear_cache.move_to_end(key)
+                return pastyear_cache[key]
+
+        ds = reader.read_year(pastyear)
+        if self.cache_years > 0:
+            with pastyear_cache_lock:
+                pastyear_cache[key] = ds
+                while len(pastyear_cache) > self.cache_years * len(self.pastreaders):
+                    pastyear_cache.popitem(last=False)
+        return ds
+
     def yearbundles(self, maxyear=np.inf, variable_ofinterest=None):
         """Generator yielding per-year weather xr.Datasets
 
@@ -423,7 +531,7 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
                 if year > maxyear:
                     break
 
-                ds = self.pastreaders[0].read_year(pastyear)
+                ds = self.read_pastyear(0, pastyear)
                 ds = self.update_year(ds, pastyear, year)
                 
                 for year2, ds2 in self.transformer.push(year, ds):
@@ -435,8 +543,8 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
             if year > maxyear:
                 break
             allds = xr.Dataset({'region': self.regions})
-            for pastreader in self.pastreaders:
-                ds = pastreader.read_year(pastyear)
+            for readerii in range(len(self.pastreaders)):
+                ds = self.read_pastyear(readerii, pastyear)
                 allds = fast_dataset.merge((allds, ds)) #xr.merge((allds, ds))
 
             allds = self.update_year(allds, pastyear, year)
@@ -448,6 +556,9 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
     def update_year(self, ds, pastyear, futureyear):
         """Corrects resampled weather Dataset 'time' coordinate to a new range
 
+        `ds` itself is left unchanged, so that it can be reused from the
+        year cache; only the time coordinate is copied.
+
         Parameters
         ----------
         ds : xr.Dataset
@@ -460,15 +571,16 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
         xr.Dataset
         """
         # Correct the time - should generalize
+        times = ds['time']._values
         if isinstance(ds['time'][0], np.datetime64):
-            ds['time']._values = np.array([str(futureyear) + str(date)[4:] for date in ds['time']._values])
+            times = np.array([str(futureyear) + str(date)[4:] for date in times])
         elif ds['time'][0] < 10000:
-            ds['time']._values += futureyear - pastyear # YYYY
+            times = times + (futureyear - pastyear) # YYYY
         elif ds['time'][0] < 1000000:
-            ds['time']._values += (futureyear - pastyear) * 100 # YYYYMM
+            times = times + (futureyear - pastyear) * 100 # YYYYMM
         else:
-            ds['time']._values += (futureyear - pastyear) * 1000 # YYYYDDD
-        return ds
+            times = times + (futureyear - pastyear) * 1000 # YYYYDDD
+        return replace_time(ds, times)
             
     def get_years(self):
         """Get list of years represented in this bundle"""
@@ -482,7 +594,7 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
         return alldims
 
     @staticmethod
-    def make_historical(weatherbundle, seed, pastyear_end=None):
+    def make_historical(weatherbundle, seed, pastyear_end=None, cache_years=None):
         """Sugar to easily instantiate a HistoricalWeatherBundle from a PastFutureWeatherBundle
 
         Parameters
@@ -491,6 +603,8 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
             Weatherbundle to resample.
         seed : int
             Seed for RNG.
+        cache_years : int or None, optional
+            Passed to HistoricalWeatherBundle.
 
         Returns
         -------
@@ -498,7 +612,30 @@ class HistoricalWeatherBundle(DailyWeatherBundle):
         """
         futureyear_end = max(weatherbundle.get_reader_years())
         pastreaders = [pastreader for pastreader, futurereader in weatherbundle.pastfuturereaders]
-        return HistoricalWeatherBundle(pastreaders, futureyear_end, seed, weatherbundle.scenario, weatherbundle.model, transformer=weatherbundle.transformer, pastyear_end=pastyear_end)
+        return HistoricalWeatherBundle(pastreaders, futureyear_end, seed, weatherbundle.scenario, weatherbundle.model, transformer=weatherbundle.transformer, pastyear_end=pastyear_end, cache_years=cache_years)
+
+def replace_time(ds, times):
+    """Return a shallow copy of `ds`, with a new 'time' coordinate
+
+    Data variables are shared with `ds`, not copied.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Weather data with 'time' coordinate.
+    times : array_like
+        New values for the 'time' coordinate.
+
+    Returns
+    -------
+    xr.Dataset
+    """
+    if isinstance(ds, fast_dataset.FastDataset):
+        coords = dict(ds.original_coords)
+        coords['time'] = times
+        return fast_dataset.FastDataset(ds.original_data_vars, coords=coords, attrs=ds.attrs)
+
+    return ds.assign_coords(time=times)
 
 class AmorphousWeatherBundle(WeatherBundle):
     def __init__(self, pastfuturereader_dict, scenario, model, hierarchy='hierarchy.csv', transformer=WeatherTransformer()):
@@ -513,17 +650,32 @@ class AmorphousWeatherBundle(WeatherBundle):
 class RollingYearTransformer(WeatherTransformer):
     """WeatherTransformer giving years and weather for a number of past years
 
+    Years are written once into a preallocated buffer per variable, and
+    each rolling window is returned as a view into that buffer. Windows
+    are never overwritten: when the buffer is full, a new one is
+    allocated, starting with the last `rolling_years - 1` years.
+    Datasets that cannot be buffered (not FastDatasets, or changing
+    shapes) are concatenated instead.
+
     Parameters
     ----------
     rolling_years : int, optional
         Number of previous years to include in output transformation. Must be
         > 1.
+    buffer_years : int or None, optional
+        Number of years held by each buffer. Defaults to 3 *
+        `rolling_years`.
     """
-    def __init__(self, rolling_years=1):
+    def __init__(self, rolling_years=1, buffer_years=None):
         self.rolling_years = rolling_years
         assert self.rolling_years > 1
+        if buffer_years is None:
+            buffer_years = 3 * rolling_years
+        assert buffer_years >= rolling_years
+        self.buffer_years = buffer_years
         self.pastdses = []
         self.last_year = None
+        self.buffer = None
 
     def get_years(self, years):
         """Get rolling years from 'years' sequence"""
@@ -548,6 +700,7 @@ class RollingYearTransformer(WeatherTransformer):
         """
         if self.last_year is not None and year != self.last_year + 1:
             self.pastdses = []
+            self.buffer = None
         self.last_year = year
         
         if len(self.pastdses) < self.rolling_years:
@@ -555,7 +708,123 @@ class RollingYearTransformer(WeatherTransformer):
         else:
             self.pastdses = self.pastdses[1:] + [ds]
 
+        parts = RollingYearBuffer.get_timed_parts(ds)
+        if parts is None:
+            self.buffer = None
+        else:
+            if self.buffer is None or self.buffer.is_full() or not self.buffer.accepts(parts):
+                # Start a new buffer, carrying over the previous years
+                self.buffer = RollingYearBuffer(parts, self.buffer_years)
+                for pastds in self.pastdses[:-1]:
+                    pastparts = RollingYearBuffer.get_timed_parts(pastds)
+                    if pastparts is None or not self.buffer.accepts(pastparts):
+                        self.buffer = None
+                        break
+                    self.buffer.write(pastparts)
+            if self.buffer is not None:
+                self.buffer.write(parts)
+
         if len(self.pastdses) == self.rolling_years:
-            ds = fast_dataset.concat(self.pastdses, dim='time')
+            if self.buffer is not None:
+                ds = self.buffer.window(self.rolling_years, ds)
+            else:
+                ds = fast_dataset.concat(self.pastdses, dim='time')
             yield year - self.rolling_years + 1, ds
 
+class RollingYearBuffer(object):
+    """Preallocated storage for consecutive years of time-dimensioned variables
+
+    Parameters
+    ----------
+    parts : dict
+        Result of `get_timed_parts` for a representative year.
+    buffer_years : int
+        Number of years that can be written.
+    """
+    def __init__(self, parts, buffer_years):
+        self.buffer_years = buffer_years
+        self.filled = 0
+        self.arrays = {}
+        self.layouts = {}
+        for key, (dims, values) in parts.items():
+            timeaxis = dims.index('time')
+            shape = list(values.shape)
+            shape[timeaxis] *= buffer_years
+            self.arrays[key] = np.empty(tuple(shape), dtype=values.dtype)
+            self.layouts[key] = (dims, values.shape, values.dtype)
+
+    @staticmethod
+    def get_timed_parts(ds):
+        """Return {(group, name): (dims, values)} for all time-dimensioned variables and coordinates
+
+        Returns None if `ds` cannot be buffered.
+        """
+        if not isinstance(ds, fast_dataset.FastDataset):
+            return None
+
+        parts = {}
+        for group, vardefs in [('vars', ds.original_data_vars), ('coords', ds.original_coords)]:
+            for name, vardef in vardefs.items():
+                if group == 'coords' and name == 'time' and isinstance(vardef, np.ndarray) and vardef.ndim == 1:
+                    parts[(group, name)] = (('time',), vardef)
+                    continue
+                if isinstance(vardef, tuple):
+                    dims = (vardef[0],) if isinstance(vardef[0], str) else tuple(vardef[0])
+                    values = np.asarray(vardef[1])
+                elif isinstance(vardef, xr.Variable):
+                    dims, values = vardef.dims, vardef.values
+                else:
+                    if group == 'vars':
+                        return None
+                    continue
+                if 'time' in dims:
+                    parts[(group, name)] = (dims, values)
+        if ('coords', 'time') not in parts:
+            return None
+
+        return parts
+
+    def accepts(self, parts):
+        """Can `parts` be written into this buffer?"""
+        if set(parts.keys()) != set(self.layouts.keys()):
+            return False
+        for key, (dims, values) in parts.items():
+            if (tuple(dims), values.shape, values.dtype) != (tuple(self.layouts[key][0]), self.layouts[key][1], self.layouts[key][2]):
+                return False
+        return True
+
+    def is_full(self):
+        return self.filled == self.buffer_years
+
+    def write(self, parts):
+        """Copy a year into the next free slot."""
+        assert not self.is_full()
+        for key, (dims, values) in parts.items():
+            self.arrays[key][self._slots(key, self.filled, 1)] = values
+        self.filled += 1
+
+    def window(self, years, ds):
+        """Return a FastDataset viewing the last `years` years written
+
+        Variables without a time dimension are taken from `ds`.
+        """
+        data_vars = dict(ds.original_data_vars)
+        coords = dict(ds.original_coords)
+        for (group, name), array in self.arrays.items():
+            view = array[self._slots((group, name), self.filled - years, years)]
+            if group == 'vars':
+                data_vars[name] = (self.layouts[(group, name)][0], view)
+            elif isinstance(coords[name], np.ndarray):
+                coords[name] = view
+            else:
+                coords[name] = (self.layouts[(group, name)][0], view)
+
+        return fast_dataset.FastDataset(data_vars, coords=coords, attrs=ds.attrs)
+
+    def _slots(self, key, start, years):
+        dims, shape, dtype = self.layouts[key]
+        timeaxis = dims.index('time')
+        index = [slice(None)] * len(dims)
+        index[timeaxis] = slice(start * shape[timeaxis], (start + years) * shape[timeaxis])
+        return tuple(index)
+
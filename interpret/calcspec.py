@@ -66,6 +66,7 @@ def prepare_interp_raw(csvv, weatherbundle, economicmodel, qvals, farmer="full",
 
     models = {}
     extras = dict(errorvar=csvvfile.get_errorvar(csvv))
+    transforms = {} # weather transforms shared by all specifications
     for key in specconf["specifications"]:
         modelspecconf = configs.merge(specconf, specconf["specifications"][key])
 
@@ -95,7 +96,8 @@ def prepare_interp_raw(csvv, weatherbundle, economicmodel, qvals, farmer="full",
             target_regions,
             farmer=farmer,
             specconf=modelspecconf,
-            diag_infix=diag_infix
+            diag_infix=diag_infix,
+            transforms=transforms
         )
         modelextras = dict(
             output_unit=modelspecconf["depenunit"],
@@ -1,6 +1,6 @@
-import yaml, copy, itertools, importlib, os
+import yaml, copy, itertools, importlib, importlib.util, os, glob
 from pathlib import Path
-from impactlab_tools.utils import paralog
+from impactlab_tools.utils import paralog, files
 from impactlab_tools.utils.files import get_file_config
 from collections.abc import MutableMapping, MutableSequence
 
@@ -120,6 +120,14 @@ involved. Entries in `child` supercede entries in `parent`.
 
     """
 
+    if isinstance(parent, FrozenConfigDict) or isinstance(child, FrozenConfigDict):
+        # Stay frozen, resolving the merged view once (and recording accesses through frozen children)
+        if not isinstance(child, MutableMapping):
+            if child not in parent:
+                return parent
+            child = parent[child]
+        return FrozenConfigDict(MergedConfigDict(parent, child))
+
     if isinstance(parent, dict) and isinstance(child, dict):
         return {**parent, **child}
     
@@ -192,6 +200,15 @@ def claim_targetdir(statman, targetdir, is_single, config):
         return False
     return True
 
+def is_generated(targetdir):
+    """Check if the last status recorded for `targetdir` by the generate system is that it was generated."""
+    filepath = paralog.StatusManager.globalstatus_filepath(targetdir)
+    if not os.path.exists(filepath):
+        return False
+    with open(filepath, 'r') as fp:
+        lines = [line.strip() for line in fp if " generate.generate " in line]
+    return bool(lines) and lines[-1].endswith(": Generated")
+
 def get_regions(allregions, filter_region):
     if filter_region is None:
         my_regions = allregions
@@ -270,6 +287,69 @@ def get_covariate_rate(config, group):
     else:
         return 1
 
+# Modes handled by generate.generate.main (checked against its mode_iterators in tests/test_cli.py)
+generate_modes = ['median', 'montecarlo', 'lincom', 'single', 'writesplines', 'writepolys', 'writecalcs',
+                  'profile', 'diagnostic', 'parallelmc', 'testparallelpe']
+
+def validate(config):
+    """Check a generate configuration for problems that would stop a run.
+
+    Only the configuration and the files it names are inspected, so
+    this can be done without loading any weather, economic, or
+    numerical modules.
+
+    Parameters
+    ----------
+    config : MutableMapping
+        Projection run configuration, after "import"s have been merged.
+
+    Returns
+    -------
+    list of str
+        Descriptions of each problem found; empty if none.
+    """
+    problems = []
+    if 'mode' not in config:
+        problems.append("Configuration does not contain 'mode'.")
+    elif config['mode'] not in generate_modes:
+        problems.append("Unknown mode '%s'; must be one of %s." % (config['mode'], ', '.join(generate_modes)))
+
+    for group in ['income', 'climate']:
+        try:
+            get_covariate_rate(config, group)
+        except ValueError as ex:
+            problems.append(str(ex))
+
+    if config.get('module'):
+        if os.path.splitext(config['module'])[1] in ['.yml', '.yaml']:
+            if not os.path.exists(config['module']):
+                problems.append("Cannot find module file %s." % config['module'])
+        else:
+            try:
+                found = importlib.util.find_spec(config['module']) is not None
+            except ImportError:
+                found = False
+            if not found:
+                problems.append("Cannot find module %s." % config['module'])
+        return problems # models are defined in the module
+
+    if 'models' not in config:
+        problems.append("Configuration does not contain 'models' or 'module'.")
+        return problems
+
+    for ii, model in enumerate(config['models']):
+        if 'csvvs' not in model:
+            problems.append("Model %d is missing 'csvvs'." % ii)
+        else:
+            csvvs = model['csvvs'] if isinstance(model['csvvs'], list) else [model['csvvs']]
+            for csvv in csvvs:
+                if not glob.glob(files.configpath(csvv)):
+                    problems.append("Model %d: cannot find any files that match %s." % (ii, files.configpath(csvv)))
+        if 'module' not in model and 'specification' not in model and 'calculation' not in model:
+            problems.append("Model %d is missing one of 'module', 'specification', or 'calculation'." % ii)
+
+    return problems
+
 def wrap_config(config, source_config=None):
     """Ensure that a config dictionary is wrapped in a ConfigDict-like object.
 
@@ -323,6 +403,67 @@ def shallow_copy(config):
     return {**config}
 
 
+def freeze(config):
+    """Return a read-only snapshot of a configuration for the projection loop.
+
+    Once calculations are built, the configuration no longer changes,
+    so the merged views and per-access wrappers can be resolved into
+    plain (immutable) dicts and lists. The first access of each entry
+    is still recorded in the access set of the wrapped configuration,
+    so `check_usage` continues to report unused entries.
+
+    Parameters
+    ----------
+    config : MutableMapping
+        The dict/ConfigDict/MergedConfigDict to freeze
+
+    Returns
+    -------
+    FrozenConfigDict
+    """
+    if isinstance(config, FrozenConfigDict):
+        return config
+    return FrozenConfigDict(config)
+
+def get_access_tracking(config, key):
+    """Return the (accessed set, access key) that records using `key`, or None if untracked."""
+    if isinstance(config, ConfigDict):
+        return config.accessed, config.prefix + str(key)
+    if isinstance(config, ConfigList):
+        return config.accessed, config.prefix + str(key)
+    if isinstance(config, MergedConfigDict):
+        if key in config.child:
+            return get_access_tracking(config.child, key)
+        return get_access_tracking(config.parent, key)
+    if isinstance(config, FrozenConfigDict) or isinstance(config, FrozenConfigList):
+        return config.tracking.get(key, None)
+    return None
+
+def get_unrecorded(config, key):
+    """Return the raw entry for `key`, without recording the access."""
+    if isinstance(config, ConfigDict) or isinstance(config, ConfigList):
+        return config.wrapped_get(key)
+    if isinstance(config, MergedConfigDict):
+        if key in config.child:
+            return get_unrecorded(config.child, key)
+        return get_unrecorded(config.parent, key)
+    if isinstance(config, FrozenConfigDict):
+        return dict.__getitem__(config, key)
+    if isinstance(config, FrozenConfigList):
+        return list.__getitem__(config, key)
+    return config[key]
+
+def freeze_value(value):
+    if isinstance(value, FrozenConfigDict) or isinstance(value, FrozenConfigList):
+        return value
+    if isinstance(value, MutableMapping):
+        return FrozenConfigDict(value)
+    if isinstance(value, MutableSequence):
+        return FrozenConfigList(value)
+    return value
+
+
+
 class ConfigDict(MutableMapping):
     """Configuration dictionary that monitors key access.
 
@@ -553,3 +694,111 @@ class ConfigList(MutableSequence):
                 missing.update(value.check_usage())
 
         return missing
+
+class FrozenConfigDict(dict):
+    """Read-only configuration dictionary, produced by `freeze`.
+
+    Entries are resolved once from the source configuration, so
+    lookups are plain dict lookups. The first access of each entry is
+    recorded in the source configuration's access set, to support
+    `check_usage` on the original ConfigDict.
+
+    Parameters
+    ----------
+    config : MutableMapping
+        The dict/ConfigDict/MergedConfigDict to take a snapshot of.
+    """
+    def __init__(self, config):
+        keys = list(dict.fromkeys(config)) # MergedConfigDict may repeat keys
+        super(FrozenConfigDict, self).__init__((key, freeze_value(get_unrecorded(config, key))) for key in keys)
+        self.tracking = {}
+        for key in keys:
+            tracking = get_access_tracking(config, key)
+            if tracking is not None:
+                self.tracking[key] = tracking
+
+    def record(self, key):
+        tracking = self.tracking.pop(key, None)
+        if tracking is not None:
+            tracking[0].add(tracking[1])
+
+    def __getitem__(self, key):
+        if self.tracking:
+            self.record(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def values(self):
+        # Reading values records them, as through MutableMapping.values on a ConfigDict
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def readonly(self, *args, **kwargs):
+        raise TypeError("Configuration is frozen; use shallow_copy or merge to modify it.")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = readonly
+
+    def __copy__(self):
+        return dict(dict.items(self))
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(dict.items(self)), memo)
+
+    def __reduce__(self):
+        return (dict, (dict(dict.items(self)),))
+
+class FrozenConfigList(list):
+    """Read-only configuration list, produced by `freeze`.
+
+    Parameters
+    ----------
+    configlist : MutableSequence
+        The list/ConfigList to take a snapshot of.
+    """
+    def __init__(self, configlist):
+        super(FrozenConfigList, self).__init__(freeze_value(get_unrecorded(configlist, ii)) for ii in range(len(configlist)))
+        self.tracking = {}
+        for ii in range(len(configlist)):
+            tracking = get_access_tracking(configlist, ii)
+            if tracking is not None:
+                self.tracking[ii] = tracking
+
+    def record(self, index):
+        tracking = self.tracking.pop(index, None)
+        if tracking is not None:
+            tracking[0].add(tracking[1])
+
+    def __getitem__(self, index):
+        if self.tracking:
+            if isinstance(index, slice):
+                for ii in range(len(self))[index]:
+                    self.record(ii)
+            else:
+                self.record(index % len(self) if index < 0 else index)
+        return list.__getitem__(self, index)
+
+    def __iter__(self):
+        # ConfigList iterates through __getitem__, recording every index
+        for ii in list(self.tracking):
+            self.record(ii)
+        return list.__iter__(self)
+
+    def readonly(self, *args, **kwargs):
+        raise TypeError("Configuration is frozen; use shallow_copy or merge to modify it.")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = clear = extend = insert = pop = remove = reverse = sort = readonly
+
+    def __copy__(self):
+        return list(list.__iter__(self))
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(list(list.__iter__(self)), memo)
+
+    def __reduce__(self):
+        return (list, (list(list.__iter__(self)),))
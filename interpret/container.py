@@ -1,9 +1,10 @@
 ## Equivalent to `allmodels.py` for imperics .yml specifications.
 
-import os, glob, copy, warnings
+import os, glob, warnings
 from impactlab_tools.utils import files
-from generate import weather, server, effectset, caller, checks, pvalses
+from generate import weather, server, effectset, caller, checks, pvalses, telemetry
 from adaptation import csvvfile
+from climate import manifest
 from climate.discover import discover_variable, discover_derived_variable, standard_variable
 from interpret import configs
 
@@ -14,6 +15,8 @@ def get_bundle_iterator(config):
     if 'timerate' not in config:
         print("Warning: 'timerate' not found in the configuration; assuming daily.")
     timerate = config.get('timerate', 'day')
+    if config.get('discovery-manifest'):
+        manifest.enable(files.configpath(config['discovery-manifest']))
     discoverers = []
     for variable in config['climate']:
         discoverers.append(standard_variable(variable, timerate, **config))
@@ -74,9 +77,15 @@ def produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callbac
     if push_callback is None:
         push_callback = lambda reg, yr, app, predget, mod: None
 
+    lastmodel = None
     for model, csvvpath, module, specconf in get_modules_csvv(config):
+        if model is not lastmodel:
+            # Resolve the configuration once per model, before building calculations
+            frozen_specconf = configs.freeze(specconf)
+            frozen_config = configs.freeze(configs.merge(config, model))
+            lastmodel = model
         basename = os.path.basename(csvvpath)[:-5]
-        produce_csvv(basename, csvvpath, module, specconf, targetdir, weatherbundle, economicmodel, pvals, configs.merge(config, model), push_callback, suffix, profile, diagnosefile)
+        produce_csvv(basename, csvvpath, module, frozen_specconf, targetdir, weatherbundle, economicmodel, pvals, frozen_config, push_callback, suffix, profile, diagnosefile)
         if profile:
             return
 
@@ -94,8 +103,7 @@ def csvv_organization(specconf):
 def produce_csvv(basename, csvv, module, specconf, targetdir, weatherbundle, economicmodel, pvals, config, push_callback, suffix, profile, diagnosefile):
     csvv_parts = csvv_organization(specconf)
     if csvv_parts is not None:
-        specconf_part = copy.copy(specconf)
-        specconf_part['csvv-organization'] = 'normal'
+        specconf_part = configs.merge(specconf, {'csvv-organization': 'normal'})
         csvv = csvvfile.read(csvv)
         n_csvv = len(csvv['gamma'])
         n_parts = len(csvv_parts)
@@ -115,9 +123,10 @@ def produce_csvv(basename, csvv, module, specconf, targetdir, weatherbundle, eco
     # Full Adaptation
     if check_doit(targetdir, basename, suffix, config):
         print("Full Adaptation")
-        calculation, dependencies, baseline_get_predictors = caller.call_prepare_interp(csvv, module, weatherbundle, economicmodel, pvals[basename], specconf=specconf, config=config, standard=False)
+        with telemetry.labels(basename=basename + suffix, farmer='full'):
+            calculation, dependencies, baseline_get_predictors = caller.call_prepare_interp(csvv, module, weatherbundle, economicmodel, pvals[basename], specconf=specconf, config=config, standard=False)
 
-        effectset.generate(targetdir, basename + suffix, weatherbundle, calculation, specconf['description'] + ", with interpolation and adaptation through interpolation.", dependencies + weatherbundle.dependencies + economicmodel.dependencies, config, push_callback=lambda reg, yr, app: push_callback(reg, yr, app, baseline_get_predictors, basename), diagnosefile=diagnosefile.replace('.csv', '-' + basename + '.csv') if diagnosefile else False, deltamethod_vcv=deltamethod_vcv)
+            effectset.generate(targetdir, basename + suffix, weatherbundle, calculation, specconf['description'] + ", with interpolation and adaptation through interpolation.", dependencies + weatherbundle.dependencies + economicmodel.dependencies, config, push_callback=lambda reg, yr, app: push_callback(reg, yr, app, baseline_get_predictors, basename), diagnosefile=diagnosefile.replace('.csv', '-' + basename + '.csv') if diagnosefile else False, deltamethod_vcv=deltamethod_vcv)
 
         # Make sure to save any random decisions to the pvals file
         if not isinstance(pvals, pvalses.PlaceholderPvals):
@@ -132,10 +141,12 @@ def produce_csvv(basename, csvv, module, specconf, targetdir, weatherbundle, eco
 
         if check_doit(targetdir, basename + "-noadapt", suffix, config):
             print("No adaptation")
-            calculation, dependencies, baseline_get_predictors = caller.call_prepare_interp(csvv, module, weatherbundle, economicmodel, pvals[basename], specconf=specconf, farmer='noadapt', config=config, standard=False)
-            effectset.generate(targetdir, basename + "-noadapt" + suffix, weatherbundle, calculation, specconf['description'] + ", with no adaptation.", dependencies + weatherbundle.dependencies + economicmodel.dependencies, config, push_callback=lambda reg, yr, app: push_callback(reg, yr, app, baseline_get_predictors, basename), deltamethod_vcv=deltamethod_vcv)
+            with telemetry.labels(basename=basename + suffix, farmer='noadapt'):
+                calculation, dependencies, baseline_get_predictors = caller.call_prepare_interp(csvv, module, weatherbundle, economicmodel, pvals[basename], specconf=specconf, farmer='noadapt', config=config, standard=False)
+                effectset.generate(targetdir, basename + "-noadapt" + suffix, weatherbundle, calculation, specconf['description'] + ", with no adaptation.", dependencies + weatherbundle.dependencies + economicmodel.dependencies, config, push_callback=lambda reg, yr, app: push_callback(reg, yr, app, baseline_get_predictors, basename), deltamethod_vcv=deltamethod_vcv)
 
         if check_doit(targetdir, basename + "-incadapt", suffix, config):
             print("Income-only adaptation")
-            calculation, dependencies, baseline_get_predictors = caller.call_prepare_interp(csvv, module, weatherbundle, economicmodel, pvals[basename], specconf=specconf, farmer='incadapt', config=config, standard=False)
-            effectset.generate(targetdir, basename + "-incadapt" + suffix, weatherbundle, calculation, specconf['description'] + ", with interpolation and only environmental adaptation.", dependencies + weatherbundle.dependencies + economicmodel.dependencies, config, push_callback=lambda reg, yr, app: push_callback(reg, yr, app, baseline_get_predictors, basename), deltamethod_vcv=deltamethod_vcv)
+            with telemetry.labels(basename=basename + suffix, farmer='incadapt'):
+                calculation, dependencies, baseline_get_predictors = caller.call_prepare_interp(csvv, module, weatherbundle, economicmodel, pvals[basename], specconf=specconf, farmer='incadapt', config=config, standard=False)
+                effectset.generate(targetdir, basename + "-incadapt" + suffix, weatherbundle, calculation, specconf['description'] + ", with interpolation and only environmental adaptation.", dependencies + weatherbundle.dependencies + economicmodel.dependencies, config, push_callback=lambda reg, yr, app: push_callback(reg, yr, app, baseline_get_predictors, basename), deltamethod_vcv=deltamethod_vcv)
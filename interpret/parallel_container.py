@@ -13,6 +13,10 @@ the action first immediately, and then it will continue to perform it
 in future timesteps, while the workers are working on the last
 timestep's values.
 
+With the `pipeline-depth` option, workers instead proceed at their own
+pace, with the driver preparing a bounded number of timesteps ahead
+of the slowest worker (see multithread.PipelinedFoldedActionsParallelDriver).
+
 This allows all processing logic in effectset to be performed at the
 worker level. That is, the code below this point is unchanged and run
 by workers, and the code does not need special conditions for parallel
@@ -22,9 +26,9 @@ processing.
 import os, threading
 from openest.generate import fast_dataset
 from . import container, configs, specification
-from generate import parallel_weather, pvalses, multithread, weather
+from generate import parallel_weather, pvalses, multithread, weather, telemetry
 from adaptation import parallel_econmodel, curvegen
-from impactlab_tools.utils import paralog
+from impactlab_tools.utils import files, paralog
 
 preload = container.preload
 get_bundle_iterator = container.get_bundle_iterator
@@ -58,6 +62,9 @@ class WeatherCovariatorLockstepParallelDriver(multithread.FoldedActionsLockstepP
 
         # Has any worker found work to do?
         self.any_worker_working = False
+
+        # Batches whose historical climate results are produced after the lockstep
+        self.pending_histclim = []
         
     def setup_yearbundles(self, *request_args, **request_kwargs):
         """Start producing yearly weather data. Called by a `request_action`."""
@@ -84,7 +91,7 @@ class WeatherCovariatorLockstepParallelDriver(multithread.FoldedActionsLockstepP
     def instant_make_historical(self):
         """Cause the shared weatherbundle to be replaced by a historical version."""
         print("Historical")
-        self.weatherbundle = weather.HistoricalWeatherBundle.make_historical(self.weatherbundle, self.seed)
+        self.weatherbundle = weather.HistoricalWeatherBundle.make_historical(self.weatherbundle, self.seed, cache_years=self.config.get('histclim-cache-years'))
     
     def setup_covariate_update(self, covariator, farmer):
         """Start updating covariates. Called by a `request_action`."""
@@ -106,6 +113,10 @@ class WeatherCovariatorLockstepParallelDriver(multithread.FoldedActionsLockstepP
 
         return dict(covars_update_year=outputs['year'], curr_covars=curr_covars, curr_years=curr_years)
 
+class PipelinedWeatherCovariatorParallelDriver(multithread.PipelinedFoldedActionsParallelDriver, WeatherCovariatorLockstepParallelDriver):
+    """The driver thread controller, preparing up to `depth` years ahead of the slowest worker."""
+    pass
+
 def produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callback=None, suffix='', profile=False, diagnosefile=False):
     """Split the processing to the workers."""
     assert config['threads'] > 1, "More than one thread needed."
@@ -113,7 +124,7 @@ def produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callbac
     if push_callback is not None or suffix != '' or profile or diagnosefile:
         print("WARNING: Cannot use diagnostic options.")
 
-    if config['mode'] == 'testparallelpe':
+    if config['mode'] == 'testparallelpe' or histclim_per_batch(config):
         seed = None
     else:
         # Always create a new seed
@@ -121,10 +132,54 @@ def produce(targetdir, weatherbundle, economicmodel, pvals, config, push_callbac
         seed = driver_pvals['histclim'].get_seed('yearorder')
     
     print("Setting up parallel processing...")
+    config = configs.freeze(config) # shared by the driver's covariators
     my_regions = configs.get_regions(weatherbundle.regions, config.get('filter-region', None))
-    driver = WeatherCovariatorLockstepParallelDriver(weatherbundle, economicmodel, config, config['threads'] - 1, seed, my_regions)
+    if config.get('pipeline-depth'):
+        driver = PipelinedWeatherCovariatorParallelDriver(weatherbundle, economicmodel, config, config['threads'] - 1, seed, my_regions,
+                                                          depth=config['pipeline-depth'])
+    else:
+        driver = WeatherCovariatorLockstepParallelDriver(weatherbundle, economicmodel, config, config['threads'] - 1, seed, my_regions)
+    if config.get('parallel-timings'):
+        driver.timings = multithread.DriverTimings(files.configpath(config['parallel-timings']))
     driver.loop(worker_produce, targetdir, config, pvals)
 
+    # Each batch keeps its own historical year ordering, so these cannot share a weather pass
+    pending = list(driver.pending_histclim)
+    try:
+        while pending:
+            batchdir, batch_pvals, batch_seed, batch_telemetry = pending[0]
+            telemetry.resume(batch_telemetry, batchdir)
+
+            print("Historical")
+            historybundle = weather.HistoricalWeatherBundle.make_historical(weatherbundle, batch_seed, cache_years=config.get('histclim-cache-years'))
+            container.produce(batchdir, historybundle, economicmodel, batch_pvals, config, suffix='-histclim')
+
+            pvalses.make_pval_file(batchdir, batch_pvals)
+            telemetry.finish()
+            configs.global_statman.release(batchdir, "Generated")
+            os.system("chmod g+rw " + os.path.join(batchdir, "*"))
+            pending.pop(0)
+    finally:
+        # Do not leave the remaining batches claimed if one fails
+        telemetry.detach()
+        for batchdir, batch_pvals, batch_seed, batch_telemetry in pending:
+            configs.global_statman.release(batchdir, "Incomplete")
+        weather.clear_pastyear_cache()
+
+def histclim_per_batch(config):
+    """Should each Monte Carlo batch use its own historical year ordering?
+
+    Under `parallel-histclim: shared` (the default), all batches in a
+    pass share one historical ordering and one historical weather
+    pass. Under `parallel-histclim: batch` (only for `parallelmc`),
+    the historical climate results for each batch follow the
+    `histclim` seed of that batch, as under `montecarlo` mode, and are
+    produced by the driver after the shared weather pass.
+    """
+    if config['mode'] != 'parallelmc':
+        return False
+    return config.get('parallel-histclim', 'shared') == 'batch'
+
 def worker_produce(proc, driver, driverdir, config, placeholder_pvals):
     """
     Find a single batch and produce data into it.
@@ -140,8 +195,10 @@ def worker_produce(proc, driver, driverdir, config, placeholder_pvals):
         # Construct a pvals and targetdir
         if 'mcdriver' in driverdir:
             targetdir = driverdir.replace('mcdriver', 'batch' + str(batch))
-            pvals = placeholder_pvals.get_montecarlo_pvals()
-            pvals['histclim'].set_seed('yearorder', driver.seed)
+            relative_location = ['batch' + str(batch)] + placeholder_pvals.relative_location[1:]
+            pvals = pvalses.get_montecarlo_pvals(config, relative_location)
+            if not histclim_per_batch(config):
+                pvals['histclim'].set_seed('yearorder', driver.seed)
         elif 'pedriver' in driverdir:
             targetdir = driverdir.replace('pedriver', 'batch' + str(batch))
             pvals = pvalses.ConstantPvals(.5)
@@ -154,6 +211,7 @@ def worker_produce(proc, driver, driverdir, config, placeholder_pvals):
                 continue
             driver.any_worker_working = True  # report that we are working
         produced_one = True
+        telemetry.begin(targetdir)
 
         # Wrap weatherbundle
         weatherbundle = parallel_weather.WorkerParallelWeatherBundle(driver, local)
@@ -161,6 +219,15 @@ def worker_produce(proc, driver, driverdir, config, placeholder_pvals):
 
         container.produce(targetdir, weatherbundle, economicmodel, pvals, config)
 
+        if histclim_per_batch(config):
+            # Leave the lockstep; the driver produces historical results afterwards
+            seed = pvals['histclim'].get_seed('yearorder')
+            pvals.lock()
+            with driver.lock:
+                driver.pending_histclim.append((targetdir, pvals, seed, telemetry.detach()))
+            driver.end_worker()
+            break
+
         # Make historical
         driver.instant_action('make_historical')
         pvals.lock()
@@ -169,6 +236,7 @@ def worker_produce(proc, driver, driverdir, config, placeholder_pvals):
         
         pvalses.make_pval_file(targetdir, pvals)
         configs.global_statman.release(targetdir, "Generated")
+        telemetry.finish()
         os.system("chmod g+rw " + os.path.join(targetdir, "*"))
         driver.end_worker()
         break
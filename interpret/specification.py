@@ -156,7 +156,7 @@ def create_covariator(specconf, weatherbundle, economicmodel, config=None, quiet
 
     return covariator
         
-def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, getcsvvcurve=False, diag_infix=""):
+def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, getcsvvcurve=False, diag_infix="", transforms=None):
     """Create a CurveGenerator instance from specifications
 
     Parameters
@@ -173,6 +173,9 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
         If True, a adaptation.curvegen.CSVVCurveGenerator instance is returned.
     diag_infix : str
         Appended to the diagnostic suffix for CurveGenerators that report diagnostics.
+    transforms : dict, optional
+        Weather transforms compiled for this calculation, shared by its
+        predictors; see interpret.variables.interpret_ds_transform.
 
     Returns
     -------
@@ -180,6 +183,8 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
     """
     if specconf is None:
         specconf = {}
+    if transforms is None:
+        transforms = {}
     user_assert('depenunit' in specconf, "Specification configuration missing 'depenunit' string.")
     user_assert('functionalform' in specconf, "Specification configuration missing 'functionalform' string.")
     if specconf['functionalform'] in ['polynomial', 'cubicspline']:
@@ -223,7 +228,7 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
         
         weathernames = [variable] + ['%s-poly-%d' % (variable, power) for power in range(2, order+1)]
         if variables.needs_interpret(variable, specconf):
-            weathernames = [variables.interpret_ds_transform(name, specconf) for name in weathernames]
+            weathernames = [variables.interpret_ds_transform(name, specconf, transforms) for name in weathernames]
 
         curr_curvegen = curvegen_known.PolynomialCurveGenerator([indepunit] + ['%s^%d' % (indepunit, pow) for pow in range(2, order+1)],
                                                                 depenunit, coeffvar, order, csvv, diagprefix='coeff-' + diag_infix, predinfix=predinfix,
@@ -253,7 +258,7 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
             else:
                 match = re.match(r"^(.+?)\s+\[(.+?)\]$", specconf['variables'][name])
                 assert match is not None, "Could not find unit in %s" % specconf['variables'][name]
-            ds_transforms[name] = variables.interpret_ds_transform(match.group(1), specconf)
+            ds_transforms[name] = variables.interpret_ds_transform(match.group(1), specconf, transforms)
             transform_descriptions.append(match.group(1))
             indepunits.append(match.group(2))
 
@@ -277,7 +282,7 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
     elif specconf['functionalform'] == 'sum-by-time':
         if specconf['subspec']['functionalform'] in ['polynomial', 'coefficients']:
             subspecconf = configs.merge(specconf, specconf['subspec'])
-            csvvcurvegen = create_curvegen(csvv, None, regions, farmer=farmer, specconf=subspecconf, getcsvvcurve=True) # don't pass covariator, so skip farmer curvegen
+            csvvcurvegen = create_curvegen(csvv, None, regions, farmer=farmer, specconf=subspecconf, getcsvvcurve=True, transforms=transforms) # don't pass covariator, so skip farmer curvegen
             if isinstance(csvvcurvegen, curvegen_known.PolynomialCurveGenerator):
                 sumbytime_constructor = curvegen_known.SumByTimePolynomialCurveGenerator
             elif isinstance(csvvcurvegen, curvegen_arbitrary.SumCoefficientsCurveGenerator):
@@ -301,16 +306,23 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
                 raise AssertionError("Either 'suffixes' or 'suffix-triangle' required for functional form 'sum-by-time'.")
         else:
             assert 'suffixes' in specconf, "Only 'suffixes' is allowed for arbitrary subform with 'sum-by-time'."
-            print("WARNING: Sum-by-time is being performed reductively. Efficiency improvements possible.")
-            
-            csvvcurvegens = []
-            for tt in range(len(specconf['suffixes'])):
-                subspecconf = configs.merge(specconf, specconf['subspec'])
-                subspecconf['final-t'] = tt # timestep of weather; also used by subspec to get suffix
-                csvvcurvegen = create_curvegen(csvv, None, regions, farmer=farmer, specconf=subspecconf, getcsvvcurve=True) # don't pass covariator, so skip farmer curvegen
-                assert isinstance(csvvcurvegen, curvegen.CSVVCurveGenerator), "Error: Curve-generator resulted in a " + str(csvvcurvegen.__class__)
-                csvvcurvegens.append(csvvcurvegen)
-            curr_curvegen = curvegen.SumCurveGenerator(csvvcurvegens, specconf['suffixes'])
+
+            # Curves linear in their coefficients are applied to all timesteps at once
+            subspecconf = configs.merge(specconf, specconf['subspec'])
+            smartcurvegen = create_curvegen(csvv, None, regions, farmer=farmer, specconf=subspecconf, getcsvvcurve=True, transforms=transforms) # don't pass covariator, so skip farmer curvegen
+            if isinstance(smartcurvegen, curvegen_known.CubicSplineCurveGenerator) and not smartcurvegen.betalimits:
+                curr_curvegen = curvegen_known.SumByTimeSmartCSVVCurveGenerator(csvv, smartcurvegen, specconf['suffixes'], diagprefix='coeff-' + diag_infix)
+            else:
+                print("WARNING: Sum-by-time is being performed reductively. Efficiency improvements possible.")
+
+                csvvcurvegens = []
+                for tt in range(len(specconf['suffixes'])):
+                    # timestep of weather; also used by subspec to get suffix
+                    subspecconf = configs.merge(configs.merge(specconf, specconf['subspec']), {'final-t': tt})
+                    csvvcurvegen = create_curvegen(csvv, None, regions, farmer=farmer, specconf=subspecconf, getcsvvcurve=True, transforms=transforms) # don't pass covariator, so skip farmer curvegen
+                    assert isinstance(csvvcurvegen, curvegen.CSVVCurveGenerator), "Error: Curve-generator resulted in a " + str(csvvcurvegen.__class__)
+                    csvvcurvegens.append(csvvcurvegen)
+                curr_curvegen = curvegen.SumCurveGenerator(csvvcurvegens, specconf['suffixes'])
 
         weathernames = [] # Use curve directly
     else:
@@ -323,6 +335,8 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
         baselineloggdppcs = {}
         for region in regions:
             baselineloggdppcs[region] = covariator.get_current(region)['loggdppc']
+        # Curves without income adaptation, from the covariates passed to curr_curvegen
+        noincadapt_curvegen = constraints.BaselineIncomeCurveGenerator(curr_curvegen, baselineloggdppcs)
 
     # Clause to set curve baseline extents if configured.
     clipping_cfg = specconf.get('clipping', False)
@@ -346,17 +360,18 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
             raise ValueError("unknown option for configuration key 'clipping'")
 
         if covariator:
+            # Polynomial and cubic spline extrema are found for all regions at once
             _, baselineexts = get_baselineextrema(
                 regions, curr_curvegen, covariator,
                 mintemp, maxtemp,
-                analytic=curve_extrema
+                analytic=None if constraints.is_batchable(curr_curvegen) else curve_extrema
             )
         else:
             curve = curr_curvegen.get_curve('global', 2000, {})
             curve_global_extrema = curve_extrema(curve)
             baselineexts = {r: curve_global_extrema for r in regions}
 
-    def transform(region, curve):
+    def transform(region, curve, noincadapt_unshifted_curve=None):
         if isinstance(curve, smart_curve.SmartCurve):
             final_curve = curve
         else:
@@ -373,9 +388,7 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
                 gm_curve = smart_curve.MinimumCurve
             else:
                 raise ValueError('the goodmoney option must be one of more-is-good, less-is-good, yes or True')
-            covars = covariator.get_current(region)
-            covars['loggdppc'] = baselineloggdppcs[region]
-            noincadapt_unshifted_curve = curr_curvegen.get_curve(region, None, covars, recorddiag=False)
+            # Produced by noincadapt_curvegen, from the same covariates as `curve`
             if not isinstance(noincadapt_unshifted_curve, smart_curve.SmartCurve):
                 noincadapt_unshifted_curve = smart_curve.CoefficientsCurve(noincadapt_unshifted_curve.ccs, weathernames)
             noincadapt_curve = smart_curve.ShiftedCurve(noincadapt_unshifted_curve, -noincadapt_unshifted_curve.univariate(baselineexts[region]))            
@@ -423,11 +436,11 @@ def create_curvegen(csvv, covariator, regions, farmer='full', specconf=None, get
         return final_curve
 
     if clipping_cfg and specconf.get('goodmoney', False):
-        final_curvegen = curvegen.TransformCurveGenerator(transform, "Clipping and Good Money transformation", curr_curvegen)
+        final_curvegen = curvegen.TransformCurveGenerator(transform, "Clipping and Good Money transformation", curr_curvegen, noincadapt_curvegen)
     elif clipping_cfg:
         final_curvegen = curvegen.TransformCurveGenerator(transform, "Clipping transformation", curr_curvegen)
     elif specconf.get('goodmoney', False):
-        final_curvegen = curvegen.TransformCurveGenerator(transform, "Good Money transformation", curr_curvegen)
+        final_curvegen = curvegen.TransformCurveGenerator(transform, "Good Money transformation", curr_curvegen, noincadapt_curvegen)
     else:
         final_curvegen = curvegen.TransformCurveGenerator(transform, "Smart curve transformation", curr_curvegen)
         final_curvegen.deltamethod_passthrough = True
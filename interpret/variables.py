@@ -1,4 +1,4 @@
-import re, copy
+import re, copy, threading
 from contextlib import suppress
 import numpy as np
 from openest.generate import fast_dataset, selfdocumented
@@ -21,9 +21,53 @@ def wrap_as_selfdoc(as_selfdoc, func, description=None, docfunc=None, docargs=No
         return func
     
 
-def interpret_ds_transform(name, config):
+class TransformNode(object):
+    """Weather transform which is evaluated once per dataset.
+
+    Predictors often share subexpressions (the same variable
+    difference or product), so compiled transforms are shared between
+    them, and each remembers its result for the last dataset it was
+    called with. The memo is kept per thread, since workers under
+    parallel modes call the same calculation on different datasets.
+
+    Parameters
+    ----------
+    func : function(Dataset) -> array_like
+        Transform to evaluate.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.local = threading.local()
+
+    def __call__(self, ds):
+        local = self.local
+        if getattr(local, 'ds', None) is not ds:
+            value = self.func(ds)
+            local.ds = ds
+            local.value = value
+            return value
+        return local.value
+
+def get_transform_key(name, config):
+    return (name, config.get('final-t', None), config.get('within-season', None), config.get('mode', 'NA') == 'writecalcs')
+
+def get_compiled(name, config, compiled, builder):
+    """Return the shared transform for `name` in `compiled`, compiling it with `builder` if needed."""
+    key = get_transform_key(name, config)
+    if key not in compiled:
+        transform = builder()
+        if not key[-1]:
+            transform = TransformNode(transform)
+        compiled[key] = transform
+    return compiled[key]
+
+def interpret_ds_transform(name, config, compiled=None):
     """Parse variable name for transformations to apply to variables
 
+    Transforms are compiled once per name and configuration within
+    `compiled`, so common subexpressions across the predictors of a
+    calculation are evaluated only once for each dataset.
+
     Parameters
     ----------
     name : str
@@ -31,12 +75,21 @@ def interpret_ds_transform(name, config):
         brackets or parenthesis.
     config : dict
         Configuration dictionary.
+    compiled : dict, optional
+        Transforms already compiled for this calculation, which is
+        added to. If None, subexpressions are shared only within `name`.
 
     Returns
     -------
     function-like:
       openest.generate.selfdocumented.DocumentedFunction or function
     """
+    if compiled is None:
+        compiled = {}
+    return get_compiled(name, config, compiled, lambda: compile_ds_transform(name, config, compiled))
+
+
+def compile_ds_transform(name, config, compiled):
     as_selfdoc = config.get('mode', 'NA') == 'writecalcs'
     
     # If can cast name into float (no ValueError), simply use as float value.
@@ -57,8 +110,8 @@ def interpret_ds_transform(name, config):
     # Otherwise interpret variable names and possible implied transformations.
     if ' ** ' in name:
         chunks = name.split(' ** ', 1)
-        internal_left = interpret_ds_transform(chunks[0], config)
-        internal_right = interpret_ds_transform(chunks[1], config)
+        internal_left = interpret_ds_transform(chunks[0], config, compiled)
+        internal_right = interpret_ds_transform(chunks[1], config, compiled)
 
         return wrap_as_selfdoc(as_selfdoc, lambda ds: internal_left(ds) * internal_right(ds),
                                name, lambda x, y: x * y,
@@ -66,8 +119,8 @@ def interpret_ds_transform(name, config):
 
     if ' - ' in name:
         chunks = name.split(' - ', 1)
-        internal_left = interpret_ds_transform(chunks[0], config)
-        internal_right = interpret_ds_transform(chunks[1], config)
+        internal_left = interpret_ds_transform(chunks[0], config, compiled)
+        internal_right = interpret_ds_transform(chunks[1], config, compiled)
 
         return wrap_as_selfdoc(as_selfdoc, lambda ds: internal_left(ds) - internal_right(ds),
                                name, lambda x, y: x - y,
@@ -75,8 +128,8 @@ def interpret_ds_transform(name, config):
 
     if ' * ' in name:
         chunks = name.split(' * ', 1)
-        internal_left = interpret_ds_transform(chunks[0], config)
-        internal_right = interpret_ds_transform(chunks[1], config)
+        internal_left = interpret_ds_transform(chunks[0], config, compiled)
+        internal_right = interpret_ds_transform(chunks[1], config, compiled)
 
         return wrap_as_selfdoc(as_selfdoc, lambda ds: internal_left(ds) * internal_right(ds),
                                name, lambda x, y: x * y,
@@ -85,10 +138,11 @@ def interpret_ds_transform(name, config):
     if '.' in name:
         chunks = re_dotsplit.split(name)
         if len(chunks) > 1:
-            internal = get_post_process(chunks[0], config, as_selfdoc)
-            for chunk in chunks[1:]:
-                internal = interpret_wrap_transform(chunk, internal, as_selfdoc)
-            return internal
+            internal = interpret_ds_transform(chunks[0], config, compiled)
+            for ii in range(1, len(chunks) - 1):
+                internal = get_compiled('.'.join(chunks[:ii+1]), config, compiled,
+                                        lambda chunk=chunks[ii], internal=internal: interpret_wrap_transform(chunk, internal, as_selfdoc))
+            return interpret_wrap_transform(chunks[-1], internal, as_selfdoc)
 
     return get_post_process(name, config, as_selfdoc)
 
@@ -0,0 +1,29 @@
+import os
+import numpy as np
+from benchmarks import synthetic
+from climate.dailyreader import DailyWeatherReader
+from datastore import irregions
+from impactlab_tools.utils import files
+
+def test_synthetic_shareddir(tmpdir, monkeypatch):
+    basedir = str(tmpdir)
+    info = synthetic.make_shareddir(basedir, numregions=15, endyear=2017, order=3)
+    assert len(info['regions']) == 15
+    assert info['variables'] == ['tas', 'tas-poly-2', 'tas-poly-3']
+
+    monkeypatch.setattr(files, 'server_config', {'shareddir': basedir})
+    assert irregions.load_regions('hierarchy.csv', []) == info['regions']
+
+    template = os.path.join(basedir, 'climate/BCSD/hierid/popwt/daily/tas-poly-2/rcp85', synthetic.gcm, '%d', synthetic.version + '.nc4')
+    reader = DailyWeatherReader(template, 2006, 'hierid', 'tas-poly-2')
+    assert reader.get_years() == list(range(2006, 2018))
+    ds = reader.read_year(2010)
+    assert ds['tas-poly-2'].shape == (365, 15)
+    assert np.all(ds['tas-poly-2'].values >= 0)
+
+    economicmodel = synthetic.SyntheticEconomicModel(basedir)
+    baselines = economicmodel.baseline_prepared(2015, 15, np.mean)
+    assert set(baselines.keys()) == set(info['regions'])
+    region = info['regions'][0]
+    assert economicmodel.get_loggdppc_year(region, 2016) == np.log(economicmodel.gdppcs[region][2016])
+    assert np.isnan(economicmodel.get_population_year(region, 2050))
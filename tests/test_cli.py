@@ -28,7 +28,7 @@ def ggmain_stub(mocker):
     )
 
 
-@pytest.mark.parametrize("subcmd", [None, "generate", "diagnostic", "aggregate"])
+@pytest.mark.parametrize("subcmd", [None, "generate", "diagnostic", "aggregate", "validate"])
 def test_imperics_helpflags(subcmd):
     """Ensure all commands print error if given --help flag
     """
@@ -84,3 +84,46 @@ def test_diagnostic_basic(tmpconf_path, ggmain_stub):
 
     result = runner.invoke(cli.impactcalculations_cli, ["diagnostic", tmpconf_path])
     assert result.output == expected
+
+
+def test_validate_config(tmpdir):
+    """Check validate CLI subcommand reports problems in a config
+    """
+    runner = CliRunner()
+
+    csvvpath = tmpdir.join("model.csvv")
+    csvvpath.write("")
+    goodconf = tmpdir.join("good.yaml")
+    goodconf.write(f"mode: median\nmodels:\n  - csvvs: {csvvpath}\n    specification: {{}}\n")
+    result = runner.invoke(cli.impactcalculations_cli, ["validate", str(goodconf)])
+    assert result.exit_code == 0
+    assert "Configuration OK." in result.output
+
+    result = runner.invoke(
+        cli.impactcalculations_cli, ["validate", str(goodconf), "-c mode=unknown", "-c slowadapt=neither"]
+    )
+    assert result.exit_code == 1
+    assert "Unknown mode 'unknown'" in result.output
+    assert "slowadapt" in result.output
+
+    badconf = tmpdir.join("bad.yaml")
+    badconf.write(f"mode: median\nmodels:\n  - csvvs: {tmpdir.join('missing*.csvv')}\n")
+    result = runner.invoke(cli.impactcalculations_cli, ["validate", str(badconf)])
+    assert result.exit_code == 1
+    assert "cannot find any files" in result.output
+    assert "missing one of 'module', 'specification', or 'calculation'" in result.output
+
+
+def test_validate_modes_match_generate():
+    """Check validate accepts exactly the modes that generate.generate.main runs
+    """
+    import ast
+    from interpret import configs
+
+    # Read the modes from the source, since generate.generate needs the full numerical stack
+    with open(os.path.join(os.path.dirname(__file__), "..", "generate", "generate.py")) as fp:
+        tree = ast.parse(fp.read())
+    iterators = [node.value for node in ast.walk(tree) if isinstance(node, ast.Assign)
+                 and any(isinstance(target, ast.Name) and target.id == "mode_iterators" for target in node.targets)]
+    assert len(iterators) == 1
+    assert sorted(ast.literal_eval(key) for key in iterators[0].keys) == sorted(configs.generate_modes)
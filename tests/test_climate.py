@@ -1,9 +1,11 @@
+import os
 import numpy as np
 import xarray as xr
 from climate.netcdfs import load_netcdf
 from climate import discover
 import pytest 
 
+
 def test_load_netcdf(tmpdir):
     """Test that load_netcdf actually loads a dataset."""
     # Build data. Dump it to tmp netcdf4 file.
@@ -25,4 +27,124 @@ def test_standard_variable_identifies():
     """ testing that discover.standard_variable() is able to find existing data """
 
     # particular version of tas data with month timerate 
-    discover.standard_variable('tasmin = tasmin-clip23', 'month', **{'grid-weight': 'cropwt'})
\ No newline at end of file
+    discover.standard_variable('tasmin = tasmin-clip23', 'month', **{'grid-weight': 'cropwt'})
+
+
+def test_data_vars_time_conversion_months():
+    """Test that monthly conversion follows the calendar months."""
+    values = np.arange(365 * 2, dtype=float).reshape((365, 2))
+    ds = xr.Dataset({"tas": (["time", "region"], values)},
+                    coords={"time": np.arange(365)})
+
+    dims, monthly = discover.data_vars_time_conversion('tas', ds, 'vars', discover.accumulate_sum)
+    assert monthly.shape == (12, 2)
+    np.testing.assert_allclose(monthly[1], values[31:59].sum(axis=0))
+
+    dims, monthly = discover.data_vars_time_conversion('tas', ds, 'vars', discover.accumulate_mean)
+    np.testing.assert_allclose(monthly[11], values[334:].mean(axis=0))
+
+
+def test_data_vars_time_conversion_year_mean():
+    """Test that the yearly sum and daily mean agree with separate reductions."""
+    values = np.random.rand(365, 3)
+    ds = xr.Dataset({"tas": (["time", "region"], values)},
+                    coords={"time": np.arange(365)})
+
+    total, mean = discover.data_vars_time_conversion_year_mean('tas', ds, discover.accumulate_sum)
+    np.testing.assert_allclose(total[1], discover.data_vars_time_conversion_year('tas', ds, 'vars', discover.accumulate_sum)[1])
+    np.testing.assert_allclose(mean[1], values.mean(axis=0, keepdims=True))
+
+
+def test_discovery_manifest(tmpdir):
+    """Test that manifest entries are reused until their dependencies change."""
+    from climate import manifest
+    calls = []
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    datadir = tmpdir.mkdir("data")
+    path = str(tmpdir.join("manifest.json"))
+    manifest.enable(path)
+    try:
+        assert manifest.cached('key', [str(datadir)], compute) == 1
+        assert manifest.cached('key', [str(datadir)], compute) == 1
+        np.testing.assert_array_equal(manifest.cached_array('array', [str(datadir)], lambda: np.arange(3)), np.arange(3))
+    finally:
+        manifest.disable()
+
+    # Reread from disk
+    manifest.enable(path)
+    try:
+        assert manifest.cached('key', [str(datadir)], compute) == 1
+        np.testing.assert_array_equal(manifest.cached_array('array', [str(datadir)], lambda: None), np.arange(3))
+
+        os.utime(str(datadir), (0, 0))
+        assert manifest.cached('key', [str(datadir)], compute) == 2
+    finally:
+        manifest.disable()
+
+
+def test_load_netcdf_variables(tmpdir):
+    """Test that load_netcdf reads only the requested variables and coordinates."""
+    testdata_path = str(tmpdir.join("test.nc"))
+    orig_ds = xr.Dataset(
+        {"a_variable": (["time"], np.array([11, 12, 13])),
+         "b_variable": (["time"], np.array([21, 22, 23]))},
+        coords={"time": np.array([1, 2, 3])},
+    )
+    orig_ds.to_netcdf(testdata_path)
+
+    ds = load_netcdf(testdata_path, variables=["a_variable", "missing"])
+    assert list(ds.data_vars) == ["a_variable"]
+    np.testing.assert_array_equal(ds.time, [1, 2, 3])
+    assert ds.a_variable.equals(orig_ds.a_variable)
+
+
+def test_consolidated_polys_dir(tmpdir, monkeypatch):
+    """Consolidated powers are only used if their files contain the requested power."""
+    from impactlab_tools.utils import files
+    monkeypatch.setattr(files, 'server_config', {'shareddir': str(tmpdir)})
+    polysdir = tmpdir.mkdir("climate").mkdir("BCSD").mkdir("hierid").mkdir("popwt").mkdir("daily").mkdir("tas-polys")
+    ds = xr.Dataset({'tas': (['time'], np.zeros(3)), 'tas-poly-2': (['time'], np.zeros(3))},
+                    coords={'time': np.array([1, 2, 3])})
+    ds.to_netcdf(str(polysdir.mkdir("historical").mkdir("CCSM4").mkdir("1981").join("1.0.nc4")))
+
+    assert discover.get_consolidated_polys_dir('tas', 'tas-poly-2') == str(polysdir)
+    assert discover.get_consolidated_polys_dir('tas', 'tas-poly-3') is None
+    assert discover.get_consolidated_polys_dir('tas', 'tas', version='1.0') is None
+    assert discover.get_consolidated_polys_dir('tasmax', 'tasmax') is None
+
+
+def test_makegddkdd():
+    """gddkdd transforms take their temperature variables from the source readers."""
+    from climate.reader import LazyWeatherReader
+    readers = [('rcp85', 'CCSM4', LazyWeatherReader(None, ('tasmin', 'tasmax')), LazyWeatherReader(None, ('tasmin', 'tasmax')))]
+    scenario, model, pastreader, futurereader = next(discover.discover_makegddkdd(iter(readers), 8, 29))
+    assert (pastreader.tminvar, pastreader.tmaxvar) == ('tasmin', 'tasmax')
+    assert futurereader.get_dimension() == ['gdd-8-29', 'kdd-29']
+
+
+def test_gddkdd_convert_matches_columns():
+    """The all-regions degree-day conversion matches converting one region at a time."""
+    from climate.dailyreader import GDDKDDReader
+    from impactcommon.math import gddkdd
+
+    # Non-square time x region, with missing values
+    np.random.seed(0)
+    tasmin = np.random.uniform(-5, 25, (365, 7))
+    tasmax = tasmin + np.random.uniform(0, 15, (365, 7))
+    tasmin[10, 2] = np.nan
+    tasmax[200, 5] = np.nan
+    tasmax[:, 6] = np.nan
+    ds = xr.Dataset({'tasmin': (('time', 'region'), tasmin), 'tasmax': (('time', 'region'), tasmax)},
+                    coords={'time': np.arange(365), 'region': ['R%d' % ii for ii in range(7)]})
+
+    reader = GDDKDDReader(None, 'tasmin', 'tasmax', 8, 29)
+    converted = reader.convert(ds, 8, 29)
+    assert converted['gdd-8-29'].values.shape == (365, 7)
+
+    for ii in range(7):
+        gdd, kdd = gddkdd.get_gddkdd(tasmin[:, ii], tasmax[:, ii], 8, 29)
+        np.testing.assert_allclose(converted['gdd-8-29'].values[:, ii], gdd)
+        np.testing.assert_allclose(converted['kdd-29'].values[:, ii], kdd)
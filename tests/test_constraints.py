@@ -0,0 +1,84 @@
+"""Check that the vectorized extrema agree with the per-region curves.
+"""
+
+import os
+import numpy as np
+import numpy.testing as npt
+from adaptation import constraints, curvegen_known
+from generate import caller
+
+class DictCovariator(object):
+    def __init__(self, covariates):
+        self.covariates = covariates
+
+    def get_current(self, region):
+        return dict(self.covariates[region])
+
+def get_polynomial_curvegen():
+    csvv = dict(variables={'tas': {'unit': 'C'}, 'tas-poly-2': {'unit': 'C^2'}, 'tas-poly-3': {'unit': 'C^3'}, 'outcome': {'unit': 'widgets'}},
+                prednames=['tas', 'tas', 'tas-poly-2', 'tas-poly-2', 'tas-poly-3'],
+                covarnames=['1', 'climtas', '1', 'climtas', '1'],
+                gamma=[-3., .05, .1, .002, -.001])
+    return curvegen_known.PolynomialCurveGenerator(['C'], 'widgets', 'tas', 3, csvv, predinfix='-poly-',
+                                                   weathernames=['tas', 'tas-poly-2', 'tas-poly-3'])
+
+def test_polynomial_extrema(tmpdir):
+    curvegen = get_polynomial_curvegen()
+    covariator = DictCovariator({'A': {'climtas': 5.}, 'B': {'climtas': 15.}, 'C': {'climtas': 25.}})
+
+    caller.callinfo = {'minpath': str(tmpdir.join('minpath.csv'))}
+    try:
+        curves, exts = constraints.get_curve_minima(['A', 'B', 'C', 'missing'], curvegen, covariator, 10, 25, None)
+    finally:
+        caller.callinfo = None
+
+    assert sorted(curves.keys()) == ['A', 'B', 'C']
+    temps = np.linspace(10, 25, 15001)
+    for region in curves:
+        expected = curvegen.get_curve(region, 2005, covariator.get_current(region), recorddiag=False)
+        npt.assert_allclose(curves[region].univariate(temps), expected.univariate(temps))
+        assert 10 <= exts[region] <= 25
+        npt.assert_allclose(curves[region].univariate(exts[region]), np.min(expected.univariate(temps)), atol=1e-6)
+
+    with open(str(tmpdir.join('minpath.csv')), 'r') as fp:
+        lines = fp.readlines()
+    assert lines[0].strip() == 'region,brute,analytic'
+    assert len(lines) == 4
+
+def test_polynomial_extrema_fallback():
+    curvegen = get_polynomial_curvegen()
+    covariator = DictCovariator({'A': {'climtas': 5.}, 'B': {'climtas': 15.}})
+
+    _, exts = constraints.get_curve_maxima(['A', 'B'], curvegen, covariator, 10, 25, None)
+    _, analytic_exts = constraints.get_curve_maxima(['A', 'B'], curvegen, covariator, 10, 25, lambda curve: 17.)
+    for region in ['A', 'B']:
+        assert analytic_exts[region] == 17.
+        curve = curvegen.get_curve(region, 2005, covariator.get_current(region), recorddiag=False)
+        assert curve.univariate(exts[region]) >= np.max(curve.univariate(np.arange(10, 26)))
+
+def test_polynomial_roots():
+    polys = np.array([[0, -2, 1, 0], # minimum at 1
+                      [0, 0, -1, 0], # maximum at 0; minima at ends
+                      [0, 1, 0, 0], # linear
+                      [0, 0, 0, 1]]) # inflection at 0
+    exttemps, extvalues = constraints.get_polynomial_extrema(polys, -2, 2, 'boatpose')
+    npt.assert_allclose(exttemps[[0, 2, 3]], [1, -2, -2])
+    npt.assert_allclose(extvalues, [-1, -4, -2, -8])
+    exttemps, extvalues = constraints.get_polynomial_extrema(polys, -2, 2, 'downdog')
+    npt.assert_allclose(exttemps, [-2, 0, 2, 2])
+
+def test_baseline_income_curves():
+    csvv = dict(variables={'tas': {'unit': 'C'}, 'tas-poly-2': {'unit': 'C^2'}, 'outcome': {'unit': 'widgets'}},
+                prednames=['tas', 'tas', 'tas', 'tas-poly-2', 'tas-poly-2'],
+                covarnames=['1', 'climtas', 'loggdppc', '1', 'loggdppc'],
+                gamma=[-3., .05, .2, .1, -.01])
+    curvegen = curvegen_known.PolynomialCurveGenerator(['C'], 'widgets', 'tas', 2, csvv, predinfix='-poly-',
+                                                       weathernames=['tas', 'tas-poly-2'])
+    baselines = {'A': 8., 'B': 10.}
+    noincadapt = constraints.BaselineIncomeCurveGenerator(curvegen, baselines)
+    assert noincadapt.baselinecoeffs is not None
+
+    temps = np.linspace(-10, 40, 51)
+    for region, covars in [('A', {'climtas': 5., 'loggdppc': 9.}), ('B', {'climtas': 20., 'loggdppc': 10.5})]:
+        expected = curvegen.get_curve(region, 2050, dict(covars, loggdppc=baselines[region]), recorddiag=False)
+        npt.assert_allclose(noincadapt.get_curve(region, 2050, covars).univariate(temps), expected.univariate(temps))
@@ -82,6 +82,103 @@ def test_scale_covariate_change():
         np.testing.assert_approx_equal(fast_change, 0)
 
 
+class RunningMean(object):
+    def __init__(self, values):
+        self.values = list(values)
+
+    def update(self, value):
+        self.values.append(value)
+
+    def get(self):
+        return np.mean(self.values)
+
+class CountryEconomicModel(object):
+    """Two countries, with all regions in a country sharing a loggdppc averager."""
+    def __init__(self):
+        self.calls = 0
+
+    def baseline_prepared(self, maxbaseline, numeconyears, func, country_level_gdppc=False):
+        shared = {'AAA': RunningMean([8.]), 'BBB': RunningMean([9.])}
+        return {region: dict(loggdppc=shared[region[:3]], popop=RunningMean([100.]))
+                for region in ['AAA.1', 'AAA.2', 'AAA.3', 'BBB.1']}
+
+    def get_loggdppc_year(self, region, year):
+        self.calls += 1
+        return {'AAA': 10., 'BBB': 11.}[region]
+
+    def get_popop_year(self, region, year):
+        return None
+
+def test_country_level_shared():
+    economicmodel = CountryEconomicModel()
+    covar = covariates.EconomicCovariator(economicmodel, 2015, country_level=True)
+
+    assert covar.offer_update('AAA.1', 2016, None)['loggdppc'] == 9.
+    # Not yet updated, so still at the baseline
+    assert covar.get_current('AAA.2')['loggdppc'] == 8.
+    assert covar.offer_update('AAA.2', 2016, None)['loggdppc'] == 9.
+    assert covar.offer_update('AAA.3', 2016, None)['loggdppc'] == 9.
+    assert covar.offer_update('BBB.1', 2016, None)['loggdppc'] == 10.
+    assert economicmodel.calls == 2 # once per country
+
+    assert covar.offer_update('AAA.1', 2017, None)['loggdppc'] == np.mean([8., 10., 10.])
+    assert covar.get_current('AAA.2')['loggdppc'] == 9.
+
+def test_country_aggregated():
+    testcovar = covariates.ConstantCovariator('val', {'AAA.1': 1., 'AAA.2': 3., 'BBB.1': 5.})
+    aggcovar = covariates.CountryDeviationCovariator(testcovar, ['AAA.1', 'AAA.2', 'BBB.1'])
+    assert aggcovar.get_current('AAA.1') == {'val': -1.}
+    assert aggcovar.get_current('AAA.2') == {'val': 1.}
+    assert aggcovar.get_current('BBB.1') == {'val': 0.}
+
+def test_country_aggregated_updates():
+    # Sources updated through another covariator's get_update are not cached
+    testcovar = covariates.ConstantCovariator('val', {'AAA.1': 1., 'AAA.2': 3.})
+    aggcovar = covariates.CountryAggregatedCovariator(testcovar, ['AAA.1', 'AAA.2'])
+    assert aggcovar.get_current('AAA') == {'val': 2.}
+    testcovar.irvalues['AAA.1'] = 5.
+    assert aggcovar.get_current('AAA') == {'val': 4.}
+
+    # Economic covariators record the year in get_update, so are cached until then
+    econcovar = covariates.EconomicCovariator(CountryEconomicModel(), 2015, country_level=True)
+    aggcovar = covariates.CountryAggregatedCovariator(econcovar, ['AAA.1', 'AAA.2'])
+    assert aggcovar.get_current('AAA')['loggdppc'] == 8.
+    econcovar.get_update('AAA.1', 2016, None)
+    econcovar.get_update('AAA.2', 2016, None)
+    assert aggcovar.get_current('AAA')['loggdppc'] == 9.
+
+
+class FakeIncomeModel(object):
+    def get_startyear(self):
+        return 2010
+
+    def get_timeseries(self, region):
+        return np.arange(1., 12.) * (2 if region == 'AAA.2' else 1)
+
+    def get_value(self, region, year):
+        return self.get_timeseries(region)[year - 2010]
+
+class ArrayEconomicModel(econmodel.SSPEconomicModel):
+    def __init__(self):
+        # Skip loading the SSP income data
+        self.income_model = FakeIncomeModel()
+        self.pop_future_years = {'AAA.1': {2010: 10., 2015: 20.}, 'AAA.2': {2010: 0., 2015: 5.}}
+        self.densities = {'AAA.1': 100., 'AAA.3': 50.}
+
+def test_economicmodel_arrays():
+    economicmodel = ArrayEconomicModel()
+    economicmodel.materialize(['AAA.1', 'AAA.2', 'AAA.3'])
+
+    np.testing.assert_allclose(economicmodel.get_loggdppcs(2012), np.log([3., 6., 3.]))
+    assert economicmodel.get_loggdppc_year('AAA.2', 2020) == np.log(22.)
+    np.testing.assert_allclose(economicmodel.get_populations(2015), [20., 5., np.nan])
+    assert np.isnan(economicmodel.get_population_year('AAA.1', 2011))
+    np.testing.assert_allclose(economicmodel.get_popops(2015), [200., np.nan, 50.])
+    assert economicmodel.get_popop_year('AAA.1', 2015) == 200.
+    assert economicmodel.get_popop_year('AAA.2', 2015) is None
+    assert economicmodel.get_popop_year('AAA.3', 2100) == 50.
+
+
 class TestCovariates(unittest.TestCase):
     def test_spline_covariator(self):
         """Test the SplineCovariator class with two dummy spline terms."""
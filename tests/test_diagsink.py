@@ -0,0 +1,41 @@
+import os, csv
+import numpy as np
+from generate import diagsink
+
+def write_header(filepath):
+    with open(filepath, 'w') as fp:
+        fp.write("# Test header\n")
+
+def test_csv_sink(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'test-allpreds.csv')
+    sink = diagsink.BufferedColumnarSink(filepath, ['region', 'year', 'climtas'], write_header, blocksize=3)
+    for year in range(2000, 2005):
+        sink.append('USA.1', year, year / 100.)
+    assert sink.count == 2 # first block written
+    sink.close()
+
+    # A second sink appends, without repeating the header
+    sink = diagsink.BufferedColumnarSink(filepath, ['region', 'year', 'climtas'], write_header, blocksize=3)
+    sink.append('USA.2', 2000, 1.5)
+    sink.close()
+
+    with open(filepath, 'r') as fp:
+        assert fp.readline() == "# Test header\n"
+        rows = list(csv.reader(fp))
+    assert rows[0] == ['region', 'year', 'climtas']
+    assert len(rows) == 7
+    assert rows[1] == ['USA.1', '2000', '20.0']
+    assert rows[-1] == ['USA.2', '2000', '1.5']
+
+def test_npz_sink(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'test-allpreds.csv')
+    sink = diagsink.BufferedColumnarSink(filepath, ['region', 'year', 'climtas'], write_header, blocksize=2, format='npz')
+    for year in range(2000, 2005):
+        sink.append('USA.1', year, year / 100.)
+    sink.close()
+
+    assert not os.path.exists(filepath)
+    data = np.load(os.path.join(str(tmpdir), 'test-allpreds.npz'))
+    np.testing.assert_equal(data['year'], np.arange(2000, 2005))
+    np.testing.assert_allclose(data['climtas'], np.arange(2000, 2005) / 100.)
+    assert list(data['region']) == ['USA.1'] * 5
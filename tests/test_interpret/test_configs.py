@@ -1,5 +1,6 @@
 import pytest
 import unittest
+from unittest import mock
 from pathlib import Path
 from interpret import configs
 from interpret.configs import merge_import_config, get_covariate_rate
@@ -104,3 +105,67 @@ class TestConfigUsage(unittest.TestCase):
 
         missing = config.check_usage()
         self.assertEqual(missing, set(['ignored1', 'dict.ignored2', 'list.0', 'list.1.ignored4']))
+
+    def test_frozen_config(self):
+        config = {'ignored1': 0, 'used': 1, 'inparent': 2, 'dict': {'inchild': 3, 'ignored2': 0}, 'list': ['ignored3', {'inlistdict': 5, 'ignored4': 0}]}
+        config = configs.standardize(config)
+
+        subconfig = configs.merge(config, config['list'][1])
+        frozen = configs.freeze(configs.merge(subconfig, {'quiet': True}))
+        self.assertIsInstance(frozen, dict)
+        self.assertEqual(frozen.get('used'), 1)
+        self.assertEqual(frozen['dict']['inchild'], 3)
+        self.assertEqual(frozen['inlistdict'], 5)
+        self.assertEqual(frozen['quiet'], True)
+        self.assertEqual(frozen.get('missing', 'default'), 'default')
+        with self.assertRaises(TypeError):
+            frozen['used'] = 2
+        with self.assertRaises(TypeError):
+            frozen['list'].append(3)
+
+        missing = config.check_usage()
+        self.assertEqual(missing, set(['ignored1', 'inparent', 'dict.ignored2', 'list.0', 'list.1.ignored4']))
+
+    def test_frozen_config_values(self):
+        def walk_calculation(config):
+            # As calculator.create_calculation reads each step
+            return [(list(calcstep.keys())[0], list(calcstep.values())[0]) for calcstep in config['specification']['calculation']]
+
+        for freeze in [False, True]:
+            config = configs.standardize({'models': [{'specification': {'calculation': [{'Rebase': {'unshift': False}}, {'YearlyApply': {'model': 'main'}}]}}]})
+            specconf = configs.merge(config, config['models'][0])
+            if freeze:
+                specconf = configs.freeze(specconf)
+            steps = walk_calculation(specconf)
+            self.assertEqual(steps[0][0], 'Rebase')
+            self.assertEqual(steps[1][1]['model'], 'main')
+            self.assertEqual(config.check_usage(), set(['models.0.specification.calculation.0.Rebase.unshift']))
+
+        # Merging into a plain dict still records accesses through the frozen child
+        config = configs.standardize({'used': 1, 'ignored': 0})
+        merged = configs.merge({'quiet': True}, configs.freeze(config))
+        self.assertEqual(merged['used'], 1)
+        self.assertEqual(merged['quiet'], True)
+        self.assertEqual(config.check_usage(), set(['ignored']))
+        self.assertEqual(dict(merged.items())['ignored'], 0)
+        self.assertEqual(config.check_usage(), set())
+
+    def test_frozen_lookups(self):
+        config = configs.standardize({'econcovar': {'class': 'bartlett', 'length': 13}, 'slowadapt': 'income',
+                                      'models': [{'specification': {'functionalform': 'polynomial', 'unused': 0}}]})
+        model = config['models'][0]
+        specconf = configs.freeze(configs.merge(config, model['specification']))
+        frozen = configs.freeze(configs.merge(config, model))
+
+        # Lookups made by covariators and curvegens go through no wrappers
+        with mock.patch.object(configs.ConfigDict, '__getitem__', side_effect=AssertionError("ConfigDict accessed")):
+            covarconfig = configs.merge(frozen, 'econcovar')
+            self.assertIsInstance(covarconfig, configs.FrozenConfigDict)
+            self.assertEqual(covarconfig.get('length', 30), 13)
+            self.assertEqual(configs.get_covariate_rate(covarconfig, 'income'), .5)
+            subspecconf = configs.merge(specconf, {'final-t': 1})
+            self.assertEqual(subspecconf['functionalform'], 'polynomial')
+            self.assertEqual(subspecconf['final-t'], 1)
+
+        missing = config.check_usage()
+        self.assertEqual(missing, set(['econcovar.class', 'models.0.specification.unused']))
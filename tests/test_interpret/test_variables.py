@@ -1,3 +1,4 @@
+import threading
 import numpy as np
 from interpret.variables import interpret_ds_transform
 
@@ -29,3 +30,56 @@ def test_interpret_ds_transform_scalarname():
     # MockFastDataset is essentially empty with metadata for (1, 3) array. Goal
     # is to have array filled with our scalar as float.
     assert (out.values == np.array([[scalar] * 3], dtype='float')).all()
+
+
+
+class CountingDataset(object):
+    def __init__(self, scale=1.):
+        self.variables = {'a': np.array([1., 2.]) * scale, 'b': np.array([3., 4.]), 'c': np.array([5., 6.])}
+        self.counts = {}
+
+    def __getitem__(self, x):
+        self.counts[x] = self.counts.get(x, 0) + 1
+        return self.variables[x]
+
+
+def test_interpret_ds_transform_shared():
+    """Tests that common subexpressions are compiled and evaluated once per dataset
+    """
+    compiled = {}
+    product = interpret_ds_transform('a * b', {}, compiled)
+    difference = interpret_ds_transform('c - a * b', {}, compiled)
+    assert interpret_ds_transform('a * b', {}, compiled) is product
+    assert interpret_ds_transform('a * b', {'final-t': 1}, compiled) is not product
+    assert interpret_ds_transform('a * b', {}) is not product # not shared across calculations
+
+    ds = CountingDataset()
+    np.testing.assert_allclose(difference(ds), [2., -2.])
+    np.testing.assert_allclose(product(ds), [3., 8.])
+    assert ds.counts == {'a': 1, 'b': 1, 'c': 1}
+
+    ds = CountingDataset()
+    np.testing.assert_allclose(product(ds), [3., 8.])
+    assert ds.counts == {'a': 1, 'b': 1}
+
+
+def test_interpret_ds_transform_threads():
+    """Tests that threads evaluating the same transform get their own results
+    """
+    product = interpret_ds_transform('a * b', {})
+    started = threading.Barrier(2)
+    results = {}
+
+    def evaluate(scale):
+        started.wait()
+        results[scale] = [product(CountingDataset(scale)) for ii in range(200)]
+
+    threads = [threading.Thread(target=evaluate, args=(scale,)) for scale in [1., 10.]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for scale in [1., 10.]:
+        for result in results[scale]:
+            np.testing.assert_allclose(result, np.array([3., 8.]) * scale)
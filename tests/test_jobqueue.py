@@ -0,0 +1,72 @@
+import os, time
+from generate import jobqueue
+from interpret import configs
+
+def get_queue(tmpdir, worker, **kwargs):
+    return jobqueue.JobQueue(str(tmpdir.join('jobs.sqlite')), worker=worker, heartbeat=False, **kwargs)
+
+def test_lease_all(tmpdir):
+    queue1 = get_queue(tmpdir, 'one')
+    queue2 = get_queue(tmpdir, 'two')
+    jobs = [('median', 'rcp45', gcm, 'high', 'SSP3') for gcm in ['A', 'B', 'C']]
+    assert queue1.populate(jobs) == 3
+    assert queue2.populate(jobs) == 0 # already populated
+
+    leased = [queue1.lease(), queue2.lease()]
+    assert leased[0] != leased[1]
+    queue1.finish()
+    queue2.finish('skipped')
+    leased.append(queue1.lease())
+    queue1.finish()
+    assert queue2.lease() is None
+    assert sorted(leased) == sorted(jobs)
+    assert queue1.summary() == {'pending': 0, 'leased': 0, 'done': 2, 'skipped': 1, 'failed': 0}
+
+def test_retry(tmpdir):
+    queue = get_queue(tmpdir, 'one', lease_timeout=.01, max_attempts=2)
+    queue.populate([('batch0', 'rcp85', 'A', 'low', 'SSP2')])
+
+    queue.lease()
+    queue.fail("Crashed")
+    assert queue.summary()['pending'] == 1
+
+    # A crashed worker's lease expires
+    crashed = get_queue(tmpdir, 'two', lease_timeout=.01, max_attempts=2)
+    crashed.lease()
+    time.sleep(.05)
+    assert not crashed.heartbeat()
+    assert queue.lease() is None
+    assert queue.summary()['failed'] == 1
+
+def test_iterate(tmpdir):
+    queue = get_queue(tmpdir, 'one')
+    exogenous = [('rcp45', gcm, 'weather' + gcm, 'SSP3', 'high', 'econ') for gcm in ['A', 'B']]
+    # Jobs added by a worker with other models or batches are left for it
+    queue.populate([('batch0', 'rcp45', 'Z', 'high', 'SSP3'), ('batch2', 'rcp45', 'A', 'high', 'SSP3')])
+
+    done = []
+    for batchdir, exogen in queue.iterate(['batch0', 'batch1'], exogenous):
+        if exogen[1] == 'A': # filters out B, leaving it for other workers
+            done.append((batchdir, exogen[2]))
+            queue.finish()
+
+    assert sorted(done) == [('batch0', 'weatherA'), ('batch1', 'weatherA')]
+    assert queue.summary() == {'pending': 4, 'leased': 0, 'done': 2, 'skipped': 0, 'failed': 0}
+
+    other = get_queue(tmpdir, 'two')
+    done = []
+    for batchdir, exogen in other.iterate(['batch0', 'batch1'], exogenous):
+        done.append((batchdir, exogen[1]))
+        other.finish()
+    assert sorted(done) == [('batch0', 'B'), ('batch1', 'B')]
+
+def test_is_generated(tmpdir):
+    targetdir = str(tmpdir)
+    assert not configs.is_generated(targetdir)
+    with open(os.path.join(targetdir, 'status-global.txt'), 'w') as fp:
+        fp.write("Mon Jan  1 00:00:00 2024 generate.generate median: Generated\n")
+        fp.write("Mon Jan  1 01:00:00 2024 generate.aggregate median: Complete\n")
+    assert configs.is_generated(targetdir)
+    with open(os.path.join(targetdir, 'status-global.txt'), 'a') as fp:
+        fp.write("Mon Jan  1 02:00:00 2024 generate.generate median: Incomplete\n")
+    assert not configs.is_generated(targetdir)
@@ -66,5 +66,31 @@ def test_lockstep():
     for proc in range(5):
         np.testing.assert_equal(processed[proc], np.arange(1, 10))
 
+class MyTestSharingParallelDriver(multithread.SharingLockstepParallelDriver):
+    def __init__(self, mcdraws):
+        super(MyTestSharingParallelDriver, self).__init__(mcdraws)
+        self.timestep = 0
+
+    def _prepare_next(self):
+        self.timestep += 1
+        return self.timestep
+
+def failing_process(proc, driver):
+    raise ValueError("Worker failure")
+
+def test_lockstep_timings_failure(tmpdir):
+    """Timings are summarized even if all workers fail."""
+    import json, pytest
+    path = str(tmpdir.join("timings.jsonl"))
+    driver = MyTestSharingParallelDriver(3)
+    driver.timings = multithread.DriverTimings(path)
+    with pytest.raises(ValueError):
+        driver.loop(failing_process)
+
+    with open(path) as fp:
+        records = [json.loads(line) for line in fp]
+    assert 'summary' in records[-1]
+    assert driver.timings.fp is None
+
 if __name__ == '__main__':
     test_lockstep()
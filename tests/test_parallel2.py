@@ -77,5 +77,22 @@ def test_folded():
     driver = MyTestFoldedActionsLockstepParallelDriver(5)
     driver.loop(worker_process)
 
+def test_folded_timings(tmpdir):
+    """Timings record the driver's actions and the workers' waits."""
+    import json
+    path = str(tmpdir.join("timings.jsonl"))
+    driver = MyTestFoldedActionsLockstepParallelDriver(2)
+    driver.timings = multithread.DriverTimings(path)
+    driver.loop(worker_process)
+
+    with open(path) as fp:
+        records = [json.loads(line) for line in fp]
+    stages = set((record['thread'], record['stage']) for record in records[:-1])
+    assert ('driver', 'action:iterate_weather') in stages
+    assert ('driver', 'action:calc_covar') in stages
+    assert ('worker0', 'wait') in stages
+    assert ('worker1', 'compute') in stages
+    assert 'driver/prepare' in records[-1]['summary']
+
 if __name__ == '__main__':
     test_folded()
@@ -0,0 +1,139 @@
+import time, threading
+import numpy as np
+from generate import multithread
+
+## Determine what the result should look like
+weather = np.random.normal(size=60)
+weathersum = np.cumsum(weather)
+covars = [weathersum[19]] * 20 + list(weathersum[20:])
+results_true = weather * covars
+
+class MyTestPipelinedParallelDriver(multithread.PipelinedFoldedActionsParallelDriver):
+    def __init__(self, mcdraws, depth):
+        super(MyTestPipelinedParallelDriver, self).__init__(mcdraws, depth=depth)
+        self.covarval = 0
+        self.weatheriter = None
+        self.max_ahead = 0
+
+    def setup_iterate_weather(self, count):
+        assert self.weatheriter is None
+        self.weatheriter = enumerate(weather[:count])
+
+    def iterate_weather(self, outputs, count):
+        with self.lock:
+            self.max_ahead = max(self.max_ahead, outputs['clock'] - min(self.worker_clocks.values()))
+        try:
+            ii, val = next(self.weatheriter)
+            return {'weather': val}
+        except StopIteration:
+            self.weatheriter = None
+            return None # stop this and following actions
+
+    def setup_calc_covar(self, baseline):
+        self.covarval = baseline
+
+    def calc_covar(self, outputs, baseline):
+        self.covarval += outputs['weather']
+        return {'covar': self.covarval}
+
+    def instant_get_baseline(self, baseline):
+        return baseline
+
+def weatherbundle(driver, local, count=len(weather)):
+    while True:
+        outputs = driver.request_action(local, 'iterate_weather', count)
+        if 'weather' not in outputs:
+            driver.end_timestep(local)
+            break
+        yield outputs['weather']
+        driver.end_timestep(local)
+
+def worker_process(proc, driver, results):
+    local = threading.local()
+
+    baseline = 0
+    for weather in weatherbundle(driver, local, 20):
+        baseline += weather
+        time.sleep(np.random.uniform(0, .002 * (proc + 1)))
+
+    # All workers agree on the baseline
+    assert driver.instant_action('get_baseline', baseline) == baseline
+
+    results[proc] = []
+    year = 0
+    for weather in weatherbundle(driver, local):
+        year += 1
+        if year > 20:
+            outputs = driver.request_action(local, 'calc_covar', baseline)
+            results[proc].append(weather * outputs['covar'])
+        else:
+            results[proc].append(weather * baseline)
+        time.sleep(np.random.uniform(0, .002 * (proc + 1)))
+
+    driver.end_worker()
+
+def idle_process(proc, driver, results):
+    if proc == 0:
+        return worker_process(proc, driver, results)
+    # Same as parallel_container.worker_produce, when no work is found
+    driver.lockstep_pause()
+    try:
+        driver.lockstep_pause()
+    except threading.BrokenBarrierError:
+        pass
+
+def test_pipelined():
+    results = {}
+    driver = MyTestPipelinedParallelDriver(4, 3)
+    driver.loop(worker_process, results)
+
+    for proc in range(4):
+        np.testing.assert_allclose(results[proc], results_true)
+    assert 0 < driver.max_ahead <= 3
+
+def test_pipelined_idle():
+    results = {}
+    driver = MyTestPipelinedParallelDriver(3, 2)
+    driver.loop(idle_process, results)
+
+    np.testing.assert_allclose(results[0], results_true)
+
+def test_pipelined_timings(tmpdir):
+    import json
+    path = str(tmpdir.join("timings.jsonl"))
+    results = {}
+    driver = MyTestPipelinedParallelDriver(2, 2)
+    driver.timings = multithread.DriverTimings(path)
+    driver.loop(worker_process, results)
+
+    with open(path) as fp:
+        summary = json.loads(fp.readlines()[-1])['summary']
+    assert summary['driver/action:iterate_weather']['count'] == 20 + len(weather) + 2 # including the calls that end each pass
+    assert summary['driver/instant:get_baseline']['count'] == 1
+    assert 'worker1/compute' in summary
+
+def test_pipelined_writelock():
+    driver = MyTestPipelinedParallelDriver(2, 2)
+    # Workers writing results must not hold the lock that the pipeline waits on
+    assert driver.writelock is not driver.lock
+    with driver.writelock:
+        assert driver.lock.acquire(blocking=False)
+        driver.lock.release()
+
+class FailingPipelinedParallelDriver(MyTestPipelinedParallelDriver):
+    def calc_covar(self, outputs, baseline):
+        raise ValueError("Driver failure")
+
+def test_pipelined_timings_failure(tmpdir):
+    """Timings are summarized even if the driver fails."""
+    import json, pytest
+    path = str(tmpdir.join("timings.jsonl"))
+    driver = FailingPipelinedParallelDriver(2, 2)
+    driver.timings = multithread.DriverTimings(path)
+    with pytest.raises(ValueError):
+        driver.loop(worker_process, {})
+
+    with open(path) as fp:
+        records = [json.loads(line) for line in fp]
+    assert 'summary' in records[-1]
+    assert driver.timings.fp is None
@@ -0,0 +1,33 @@
+import os, time
+from generate import sampling
+
+def busy_work(seconds):
+    until = time.time() + seconds
+    total = 0
+    while time.time() < until:
+        total += sum(range(1000))
+    return total
+
+def test_sampling_profiler(tmpdir):
+    profiler = sampling.SamplingProfiler(.001)
+    profiler.start()
+    busy_work(.2)
+    profiler.stop()
+
+    assert profiler.samples > 0
+    assert list(profiler.get_stage_counts().keys()) == ['other']
+
+    filepath = os.path.join(str(tmpdir), 'profile.collapsed')
+    profiler.write_collapsed(filepath)
+    with open(filepath, 'r') as fp:
+        lines = fp.readlines()
+    assert any('busy_work (test_sampling.py:' in line for line in lines)
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert stack.startswith('other;')
+        assert int(count) > 0
+
+def test_get_stage():
+    assert sampling.get_stage(sampling.SamplingProfiler.sample.__code__) is None
+    from adaptation import csvvfile
+    assert sampling.get_stage(csvvfile.read.__code__) == 'csvv-read'
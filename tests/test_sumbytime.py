@@ -0,0 +1,89 @@
+"""Check that sum-by-time over an arbitrary subspec combines all timesteps at once.
+"""
+
+import numpy as np
+import numpy.testing as npt
+from adaptation import curvegen, curvegen_known
+from interpret.specification import create_curvegen
+
+def test_terms_curve():
+    yy = np.array([[1., 2., 3.], [10., 20., 30.]])
+    termcurves = [lambda ds: ds['x'], lambda ds: ds['x'] ** 2]
+
+    curve = curvegen_known.SumByTimeTermsCurve(yy, termcurves)
+    ds = {'x': np.array([1., 2., 3., 4.])} # the 4th timestep is dropped
+    npt.assert_allclose(curve(ds), (1 + 4 + 9) + (10 + 80 + 270))
+
+    ds = {'x': np.array([1., 2.])} # missing timesteps are dropped
+    npt.assert_allclose(curve(ds), (1 + 4) + (10 + 80))
+
+def test_spline_subspec():
+    csvv = dict(variables={'pr': {'unit': 'mm'}, 'prspline1': {'unit': 'mm^3'}, 'outcome': {'unit': 'widgets'}},
+                prednames=['pr-1', 'pr-2', 'prspline1-1', 'prspline1-2', 'pr-1', 'pr-2'],
+                covarnames=['1', '1', '1', '1', 'climpr', 'climpr'],
+                gamma=[1., 2., 3., 4., .5, 0.])
+    specconf = {"description": "Sum-by-time spline",
+                "depenunit": "widgets",
+                "indepunit": "mm",
+                "functionalform": "sum-by-time",
+                "suffixes": [1, 2],
+                "subspec": {"functionalform": "cubicspline", "variable": "pr", "prefix": "prspline", "knots": [0, 10, 20]}}
+
+    curvegen = create_curvegen(csvv, None, 'TrinLand', specconf=specconf)
+    assert isinstance(curvegen, curvegen_known.SumByTimeSmartCSVVCurveGenerator)
+
+    curve = curvegen.get_curve('TrinLand', 2000, {'climpr': 2.}, recorddiag=False)
+    npt.assert_allclose(curve.yy, [[2., 2.], [3., 4.]])
+
+def test_stacked_coefficients():
+    csvv = dict(variables={'pr': {'unit': 'mm'}, 'pr-poly-2': {'unit': 'mm^2'}, 'outcome': {'unit': 'widgets'}},
+                prednames=['pr-1', 'pr-1', 'pr-2', 'pr-2', 'pr-poly-2-1', 'pr-poly-2-1', 'pr-poly-2-2', 'pr-poly-2-2'],
+                covarnames=['1', 'climpr', 'climpr', '1', '1', 'loggdppc', '1', 'loggdppc'],
+                gamma=[1., .5, .25, 2., 3., -.1, 4., -.2])
+    polycurvegen = curvegen_known.PolynomialCurveGenerator(['mm'], 'widgets', 'pr', 2, csvv, predinfix='-poly-')
+    sumcurvegen = curvegen_known.SumByTimePolynomialCurveGenerator(csvv, polycurvegen, [1, 2, 0])
+
+    covars = {'climpr': 3., 'loggdppc': 9.}
+    stacked = sumcurvegen.get_coefficients(covars)
+    expected = curvegen.CSVVCurveGenerator.get_coefficients(sumcurvegen, covars)
+    assert sorted(stacked.keys()) == sorted(expected.keys())
+    for predname in expected:
+        npt.assert_allclose(stacked[predname], expected[predname])
+    npt.assert_allclose(stacked['pr'], [2.5, 2.75, 0])
+
+def test_spline_subspec_matches_reductive():
+    """The stacked spline sum-by-time gives the same result as the per-timestep SumCurveGenerator path."""
+    import xarray as xr
+    csvv = dict(variables={'pr': {'unit': 'mm'}, 'prspline1': {'unit': 'mm^3'}, 'outcome': {'unit': 'widgets'}},
+                prednames=['pr-1', 'pr-2', 'prspline1-1', 'prspline1-2', 'pr-1', 'pr-2', 'prspline1-2'],
+                covarnames=['1', '1', '1', '1', 'climpr', 'climpr', 'loggdppc'],
+                gamma=[1., 2., 3., 4., .5, -.25, .1])
+    specconf = {"description": "Sum-by-time spline",
+                "depenunit": "widgets",
+                "indepunit": "mm",
+                "functionalform": "sum-by-time",
+                "suffixes": [1, 2],
+                "subspec": {"functionalform": "cubicspline", "variable": "pr", "prefix": "prspline", "knots": [0, 10, 20]}}
+    covars = {'climpr': 2., 'loggdppc': 9.}
+
+    stackedcurvegen = create_curvegen(csvv, None, 'TrinLand', specconf=specconf)
+    stackedcurve = stackedcurvegen.get_curve('TrinLand', 2000, covars, recorddiag=False)
+
+    # The previous path: one curve generator per timestep, reading that timestep's weather by suffix
+    csvvcurvegens = []
+    for tt in range(len(specconf['suffixes'])):
+        subspecconf = dict(specconf)
+        subspecconf.update(specconf['subspec'])
+        subspecconf['final-t'] = tt
+        csvvcurvegens.append(create_curvegen(csvv, None, 'TrinLand', specconf=subspecconf, getcsvvcurve=True))
+    sumcurvegen = curvegen.SumCurveGenerator(csvvcurvegens, specconf['suffixes'])
+    sumcurve = sumcurvegen.get_curve('TrinLand', 2000, covars, recorddiag=False)
+
+    pr = np.array([3., 12.])
+    prspline1 = np.array([0., 8.])
+    ds = xr.Dataset({'pr': (('time',), pr), 'prspline1': (('time',), prspline1),
+                     'pr-1': (('step',), pr[:1]), 'prspline1-1': (('step',), prspline1[:1]),
+                     'pr-2': (('step',), pr[1:]), 'prspline1-2': (('step',), prspline1[1:])})
+
+    npt.assert_allclose(np.sum(stackedcurve(ds)), np.sum(sumcurve(ds)))
+    npt.assert_allclose(np.sum(stackedcurve(ds)), (2. * 3. + 3. * 0.) + (1.5 * 12. + 4.9 * 8.))
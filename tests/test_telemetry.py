@@ -0,0 +1,62 @@
+import os, json, threading
+from generate import telemetry
+
+def test_telemetry(tmpdir):
+    telemetry.enable()
+    try:
+        with telemetry.stage('econ-load'):
+            pass
+
+        telemetry.begin(str(tmpdir))
+        with telemetry.labels(basename='test', farmer='full'):
+            for year in telemetry.timed_iterator('weather-read', range(3)):
+                started = telemetry.start()
+                telemetry.stop('apply', started)
+        with telemetry.stage('write'):
+            pass
+        telemetry.finish()
+    finally:
+        telemetry.enabled = False
+        telemetry.process = telemetry.StageTelemetry()
+
+    with open(os.path.join(str(tmpdir), 'telemetry.json'), 'r') as fp:
+        result = json.load(fp)
+
+    stages = {record['stage']: record for record in result['stages']}
+    assert stages['weather-read']['count'] == 3
+    assert stages['apply']['basename'] == 'test' and stages['apply']['farmer'] == 'full'
+    assert stages['write']['basename'] is None
+    assert [record['stage'] for record in result['process']] == ['econ-load']
+    assert result['peak_rss_mb'] > 0
+
+def test_telemetry_disabled(tmpdir):
+    telemetry.begin(str(tmpdir))
+    with telemetry.stage('write'):
+        pass
+    telemetry.finish()
+    assert not os.path.exists(os.path.join(str(tmpdir), 'telemetry.json'))
+
+def test_telemetry_handoff(tmpdir):
+    telemetry.enable()
+    try:
+        telemetry.begin(str(tmpdir))
+        with telemetry.stage('apply'):
+            pass
+        current = telemetry.detach()
+        telemetry.finish() # nothing to write in this thread
+
+        def histclim():
+            telemetry.resume(current, str(tmpdir))
+            with telemetry.stage('write'):
+                pass
+            telemetry.finish()
+        thread = threading.Thread(target=histclim)
+        thread.start()
+        thread.join()
+    finally:
+        telemetry.enabled = False
+        telemetry.process = telemetry.StageTelemetry()
+
+    with open(os.path.join(str(tmpdir), 'telemetry.json'), 'r') as fp:
+        result = json.load(fp)
+    assert sorted(record['stage'] for record in result['stages']) == ['apply', 'write']
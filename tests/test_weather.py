@@ -55,6 +55,9 @@ class StubWeatherReader():
     def get_regions(self):
         return self._regions
 
+    def load(self):
+        pass
+
 
 @pytest.fixture
 def weatherbundle_simple(monkeypatch):
@@ -96,6 +99,44 @@ def test_shuffled(temp2year, weatherbundle_simple):
     npt.assert_approx_equal(np.mean(np.abs(np.diff(years))), 9.028571428571428)
     npt.assert_array_less(years, 2006)
 
+def test_pastfuture_lazy_load():
+    """Bundles read reader metadata only when first used, once."""
+    class CountingReader(StubWeatherReader):
+        calls = 0
+        def get_years(self):
+            CountingReader.calls += 1
+            return super(CountingReader, self).get_years()
+
+    readers = [(CountingReader(), CountingReader()) for ii in range(3)]
+    bundles = [weather.PastFutureWeatherBundle([pastfuture], 'scenario', 'model') for pastfuture in readers]
+    assert CountingReader.calls == 0
+
+    assert bundles[0].futureyear1 == 1000
+    assert bundles[0].regions == ["a"]
+    assert CountingReader.calls == 1
+
+    weather.preload_bundles(bundles, 2)
+    assert CountingReader.calls == 3
+    assert bundles[2].units is None
+
+def test_pastfuture_lazy_readers():
+    """Readers are constructed when their bundle is loaded, by the preloading threads."""
+    from climate.reader import LazyWeatherReader
+    constructed = []
+    def lazy_stub():
+        def factory():
+            constructed.append(1)
+            return StubWeatherReader()
+        return LazyWeatherReader(factory, ["temp"])
+
+    bundles = [weather.PastFutureWeatherBundle([(lazy_stub(), lazy_stub())], 'scenario', 'model') for ii in range(3)]
+    assert len(constructed) == 0
+
+    weather.preload_bundles(bundles, 2)
+    assert len(constructed) == 6
+    assert bundles[1].regions == ["a"]
+    assert bundles[1].pastfuturereaders[0][0].get_years() == [1000, 1001, 1002]
+
 
 class TestRollingYearTransformer:
     """Basic tests for RollingYearTransformer
@@ -218,6 +259,30 @@ class TestRollingYearTransformer:
             np.array([[1.0], [2.0]])
         )
 
+    def test_push_buffer_refill(self):
+        """Test RollingYearTransformer.push() windows survive refilling its buffer
+        """
+        transformer = weather.RollingYearTransformer(rolling_years=2, buffer_years=3)
+
+        region_coord_da = xr.DataArray(np.array(["a"]), [np.array(["a"])], ("region",))
+        outputs = []
+        for y in range(1000, 1008):
+            d = fast_dataset.FastDataset(
+                {"temp": xr.Variable(["time", "region"], np.ones((1, 1)) * y)},
+                coords={
+                    "time": np.array([y]),
+                    "region": region_coord_da,
+                },
+            )
+            outputs.extend(transformer.push(y, d))
+
+        assert [year for year, _ in outputs] == list(range(1000, 1007))
+        for year, dataset_out in outputs:
+            npt.assert_allclose(
+                dataset_out._variables["temp"]._data,
+                np.array([[year], [year + 1]])
+            )
+
 
 class TestHistoricalWeatherBundle:
     """Unit tests for basic behavior of generate.weather.HistoricalWeatherBundle
@@ -326,6 +391,63 @@ class TestHistoricalWeatherBundle:
         )
         assert len(victim.pastyears) == 120
 
+    def test_yearbundles_cache(self):
+        """Test yearbundles() reads each past year once and keeps times separate
+        """
+        reader = StubWeatherReader()
+        reads = []
+        read_year = reader.read_year
+        reader.read_year = lambda y: reads.append(y) or read_year(y)
+
+        hwb = weather.HistoricalWeatherBundle(
+            pastreaders=[reader],
+            futureyear_end=1006,
+            seed=None,
+            scenario="rcp45",
+            model="CCSM4"
+        )
+        victim = list(hwb.yearbundles())
+
+        assert sorted(reads) == [1000, 1001, 1002]
+        assert [v.time.values.item() for _, v in victim] == list(range(1000, 1007))
+        out_values = [v._variables["temp"]._data.item() for _, v in victim]
+        assert out_values == [0, 1, 2, 1, 0, 1, 2]
+
+    def test_yearbundles_cache_shared(self):
+        """Test bundles over the same readers share decoded past years
+        """
+        weather.clear_pastyear_cache()
+        reader = StubWeatherReader()
+        reads = []
+        read_year = reader.read_year
+        reader.read_year = lambda y: reads.append(y) or read_year(y)
+
+        for seed in [None, 123]:
+            hwb = weather.HistoricalWeatherBundle(
+                pastreaders=[reader],
+                futureyear_end=1006,
+                seed=seed,
+                scenario="rcp45",
+                model="CCSM4"
+            )
+            list(hwb.yearbundles())
+
+        assert sorted(reads) == [1000, 1001, 1002]
+
+        # The cache is bounded by `cache_years` for each reader
+        weather.clear_pastyear_cache()
+        hwb = weather.HistoricalWeatherBundle(
+            pastreaders=[reader],
+            futureyear_end=1006,
+            seed=None,
+            scenario="rcp45",
+            model="CCSM4",
+            cache_years=1
+        )
+        list(hwb.yearbundles())
+        assert len(weather.pastyear_cache) == 1
+        weather.clear_pastyear_cache()
+
 
 class TestHistoricalRollingYearTransformer:
     """
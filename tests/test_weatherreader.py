@@ -67,6 +67,54 @@ class TestWeatherReader(unittest.TestCase):
                     testing.assert_almost_equal(float(days), var2days, decimal=-1)
             break # stop after 1981 for now
 
+def test_consolidated_shares_file(tmpdir):
+    """Readers of a consolidated file load it once and keep their own variables."""
+    import xarray as xr
+    values = np.arange(365 * 2, dtype=float).reshape((365, 2))
+    ds = xr.Dataset({'tas': (('time', 'hierid'), values),
+                     'tas-poly-2': (('time', 'hierid'), values ** 2)},
+                    coords={'time': 1981000 + np.arange(1, 366), 'hierid': ['A', 'B']},
+                    attrs={'version': '1.0'})
+    ds['tas'].attrs['units'] = 'C'
+    ds['tas-poly-2'].attrs['units'] = 'C^2'
+    ds.to_netcdf(str(tmpdir.mkdir("1981").join("1.0.nc4")))
+
+    template = str(tmpdir.join("%d", "%v.nc4"))
+    ConsolidatedDailyWeatherReader.shared_files.clear()
+    reader1 = ConsolidatedDailyWeatherReader(template, 1981, 'hierid', 'tas')
+    reader2 = ConsolidatedDailyWeatherReader(template, 1981, 'hierid', 'tas-poly-2')
+
+    ds1 = reader1.read_year(1981)
+    ds2 = reader2.read_year(1981)
+    assert list(ds1.data_vars) == ['tas']
+    assert list(ds2.data_vars) == ['tas-poly-2']
+    testing.assert_array_equal(ds2['tas-poly-2'].values, values ** 2)
+    assert len(ConsolidatedDailyWeatherReader.shared_files) == 1
+
+def test_consolidated_loads_requested(tmpdir):
+    """Consolidated files are loaded with the variables of all their readers, and no others."""
+    import xarray as xr
+    values = np.arange(365 * 2, dtype=float).reshape((365, 2))
+    ds = xr.Dataset({'tas': (('time', 'hierid'), values),
+                     'tas-poly-2': (('time', 'hierid'), values ** 2),
+                     'tas-poly-3': (('time', 'hierid'), values ** 3)},
+                    coords={'time': 1981000 + np.arange(1, 366), 'hierid': ['A', 'B']},
+                    attrs={'version': '1.0'})
+    ds.to_netcdf(str(tmpdir.mkdir("1981").join("1.0.nc4")))
+
+    template = str(tmpdir.join("%d", "%v.nc4"))
+    ConsolidatedDailyWeatherReader.shared_files.clear()
+    reader1 = ConsolidatedDailyWeatherReader(template, 1981, 'hierid', 'tas')
+    reader1.read_year(1981)
+    reader2 = ConsolidatedDailyWeatherReader(template, 1981, 'hierid', 'tas-poly-2')
+    ds2 = reader2.read_year(1981) # reloaded, since reader2 was constructed later
+    testing.assert_array_equal(ds2['tas-poly-2'].values, values ** 2)
+
+    shared = list(ConsolidatedDailyWeatherReader.shared_files.values())[0]
+    assert 'tas' in shared and 'tas-poly-2' in shared
+    assert 'tas-poly-3' not in shared
+    assert list(reader1.read_year(1981).data_vars) == ['tas']
+
 if __name__ == '__main__':
     unittest.main()
 